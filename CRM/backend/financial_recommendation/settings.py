@@ -22,6 +22,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # 放在最外层，记录的耗时覆盖其余中间件
+    'recommendation.middleware.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -52,13 +54,92 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'financial_recommendation.wsgi.application'
 
+# 数据库：默认使用调优后的 SQLite（WAL、忙等待、BEGIN IMMEDIATE），设置 DB_ENGINE=mysql 使用 MySQL。
+# 持久连接：每个连接最多复用 DB_CONN_MAX_AGE 秒（0 为每个请求重新连接），复用前检查连接是否可用。
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+
+
+def _database(host=None, port=None, name=None):
+    if DB_ENGINE == 'mysql':
+        return {
+            'ENGINE': 'django.db.backends.mysql',
+            'NAME': os.environ.get('DB_NAME', 'financial_recommendation'),
+            'USER': os.environ.get('DB_USER', 'root'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': host or os.environ.get('DB_HOST', '127.0.0.1'),
+            'PORT': port or os.environ.get('DB_PORT', '3306'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'charset': 'utf8mb4',
+                'isolation_level': 'read committed',
+                'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
+            },
+        }
+    return {
+        'ENGINE': 'recommendation.sqlite_backend',
+        'NAME': name or os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': float(os.environ.get('SQLITE_BUSY_TIMEOUT', '20')),  # 等待写锁的秒数
+        },
+    }
+
+
 DATABASES = {
+    'default': _database(),
+}
+
+# 只读副本：MySQL 设置 DB_REPLICA_HOST（及 DB_REPLICA_PORT），SQLite 设置 SQLITE_REPLICA_PATH
+# （本地由 sync_sqlite_replica 从主库复制）。配置后目录/行情读取走副本，交易与写操作走主库
+if DB_ENGINE == 'mysql' and os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = _database(os.environ['DB_REPLICA_HOST'], os.environ.get('DB_REPLICA_PORT'))
+elif DB_ENGINE != 'mysql' and os.environ.get('SQLITE_REPLICA_PATH'):
+    DATABASES['replica'] = _database(name=os.environ['SQLITE_REPLICA_PATH'])
+DATABASE_ROUTERS = ['recommendation.routers.PrimaryReplicaRouter']
+
+# 缓存：目录版本号需要在 Web 进程与导入命令之间共享，默认使用文件缓存，
+# 生产环境可替换为 Redis/Memcached 等共享后端
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'var' / 'cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    # 用户分群推荐结果缓存：本地内存后端按最近使用淘汰（LRU），多进程部署可换成Redis等共享后端
+    'recommendations': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'recommendations',
+        'TIMEOUT': 600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 2000,
+        },
+    },
+    # 关闭推荐结果缓存时使用（每次请求都重新计算）
+    'recommendations_disabled': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
 }
 
+# 推荐结果缓存使用的缓存别名；设置环境变量 RECOMMENDATION_CACHE=off 可关闭（便于压测对比）
+RECOMMENDATION_CACHE_ALIAS = (
+    'recommendations_disabled' if os.environ.get('RECOMMENDATION_CACHE') == 'off' else 'recommendations'
+)
+
+# 允许访问 /api/metrics/ 的客户端IP（逗号分隔，设为空字符串表示不限制）
+METRICS_ALLOWED_IPS = [ip for ip in os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip]
+
+# 离线训练的推荐模型（协同过滤等）存放目录
+RECOMMENDATION_MODEL_DIR = BASE_DIR / 'var' / 'models'
+
+# 异步推荐接口：单个推荐策略的超时秒数（超时的策略降级为热度推荐），以及并发执行策略的线程数
+RECOMMENDATION_STRATEGY_TIMEOUT = float(os.environ.get('RECOMMENDATION_STRATEGY_TIMEOUT', '2.0'))
+RECOMMENDATION_FANOUT_WORKERS = int(os.environ.get('RECOMMENDATION_FANOUT_WORKERS', '8'))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
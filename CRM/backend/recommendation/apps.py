@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class RecommendationConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'recommendation'
+    verbose_name = '金融推荐'
+
+    def ready(self):
+        # 注册目录索引失效等信号处理器
+        from . import signals  # noqa: F401
@@ -0,0 +1,227 @@
+"""基于 FP-Growth 的购买关联规则挖掘
+
+按用户把 PurchaseRecord 流式聚合成购物篮（产品键形如 "fund:12"），两遍扫描：
+第一遍统计单品支持度，第二遍把只含频繁单品的购物篮插入 FP 树。FP 树按前缀合并，
+内存只与不同前缀路径数有关；单个购物篮可用 max_basket_size 截断到最频繁的若干产品。
+挖掘阶段把每个频繁单品的条件模式基分发到多个进程分别构建条件 FP 树递归挖掘。
+
+输出的规则索引以前项（单个产品，或按键排序后用 "|" 连接的产品组合）为键，
+值为按置信度排序的后项列表，在线查询对每个持有产品是一次字典查找。
+"""
+import json
+import os
+import time
+from collections import defaultdict
+from itertools import combinations, groupby
+
+from .model_store import ModelFile
+from .models import PurchaseRecord
+from .process_pool import process_pool
+
+RULES_FILENAME = 'association_rules.json'
+
+
+def item_key(purchase_type, product_id):
+    return f"{purchase_type}:{product_id}"
+
+
+def iter_baskets(chunk_size=20000):
+    """按用户流式产出购物篮（产品键集合），不在内存中保留全部记录"""
+    rows = (
+        PurchaseRecord.objects.filter(status='completed')
+        .exclude(quantity__lt=0)  # 卖出记录（数量为负）不是购买
+        .order_by('user_id')
+        .values_list('user_id', 'purchase_type', 'product_id')
+        .iterator(chunk_size=chunk_size)
+    )
+    for _, user_rows in groupby(rows, key=lambda row: row[0]):
+        yield {item_key(purchase_type, product_id) for _, purchase_type, product_id in user_rows}
+
+
+class FPNode:
+    __slots__ = ('item', 'count', 'parent', 'children', 'link')
+
+    def __init__(self, item, parent):
+        self.item = item
+        self.count = 0
+        self.parent = parent
+        self.children = {}
+        self.link = None  # 同一产品的下一个节点
+
+
+class FPTree:
+    """FP 树，路径中的产品按全局频次降序（即产品编号升序）排列"""
+
+    def __init__(self):
+        self.root = FPNode(None, None)
+        self.heads = {}
+        self.counts = defaultdict(int)
+
+    def add(self, path, count=1):
+        node = self.root
+        for item in path:
+            child = node.children.get(item)
+            if child is None:
+                child = FPNode(item, node)
+                node.children[item] = child
+                child.link = self.heads.get(item)
+                self.heads[item] = child
+            child.count += count
+            self.counts[item] += count
+            node = child
+
+    def prefix_paths(self, item):
+        """产品的条件模式基：[(从根到该节点之前的路径, 计数), ...]"""
+        paths = []
+        node = self.heads.get(item)
+        while node is not None:
+            path = []
+            parent = node.parent
+            while parent.item is not None:
+                path.append(parent.item)
+                parent = parent.parent
+            if path:
+                paths.append((tuple(reversed(path)), node.count))
+            node = node.link
+        return paths
+
+
+def mine_pattern_base(suffix, pattern_base, min_count, max_length):
+    """对一个条件模式基构建条件 FP 树并递归挖掘，返回 [(频繁项集, 支持计数), ...]"""
+    counts = defaultdict(int)
+    for path, count in pattern_base:
+        for item in path:
+            counts[item] += count
+    frequent = {item for item, count in counts.items() if count >= min_count}
+    if not frequent:
+        return []
+
+    tree = FPTree()
+    for path, count in pattern_base:
+        filtered = [item for item in path if item in frequent]
+        if filtered:
+            tree.add(filtered, count)
+
+    itemsets = []
+    for item in sorted(frequent, reverse=True):
+        itemset = (item,) + suffix
+        itemsets.append((itemset, tree.counts[item]))
+        if len(itemset) < max_length:
+            itemsets.extend(mine_pattern_base(itemset, tree.prefix_paths(item), min_count, max_length))
+    return itemsets
+
+
+def _mine_item(args):
+    item, pattern_base, min_count, max_length = args
+    return mine_pattern_base((item,), pattern_base, min_count, max_length)
+
+
+def mine_frequent_itemsets(min_support=0.01, max_length=3, max_basket_size=50, workers=1, chunk_size=20000):
+    """两遍扫描购物篮并挖掘频繁项集，返回 (项集列表, 单品支持计数, 购物篮数, 产品编号→产品键)"""
+    # 第一遍：单品支持度
+    item_counts = defaultdict(int)
+    n_baskets = 0
+    for basket in iter_baskets(chunk_size):
+        n_baskets += 1
+        for key in basket:
+            item_counts[key] += 1
+    if not n_baskets:
+        return [], {}, 0, []
+
+    min_count = max(1, int(min_support * n_baskets + 0.999999))
+    frequent = sorted((key for key, count in item_counts.items() if count >= min_count),
+                      key=lambda key: (-item_counts[key], key))
+    rank = {key: i for i, key in enumerate(frequent)}
+
+    # 第二遍：构建 FP 树（产品按频次降序编号）
+    tree = FPTree()
+    for basket in iter_baskets(chunk_size):
+        path = sorted(rank[key] for key in basket if key in rank)[:max_basket_size]
+        if path:
+            tree.add(path)
+
+    # 挖掘：每个频繁单品的条件模式基独立挖掘，可并行
+    itemsets = [((item,), tree.counts[item]) for item in range(len(frequent))]
+    tasks = [(item, tree.prefix_paths(item), min_count, max_length) for item in range(len(frequent))]
+    if max_length > 1:
+        if workers > 1 and len(tasks) > 1:
+            with process_pool(workers) as pool:
+                for result in pool.imap_unordered(_mine_item, tasks, chunksize=max(1, len(tasks) // (workers * 4))):
+                    itemsets.extend(result)
+        else:
+            for task in tasks:
+                itemsets.extend(_mine_item(task))
+    return itemsets, item_counts, n_baskets, frequent
+
+
+def build_rule_index(itemsets, n_baskets, frequent, min_confidence=0.1, max_consequents=20):
+    """由频繁项集生成“前项 → 单个后项”规则索引"""
+    support = {tuple(sorted(itemset)): count for itemset, count in itemsets}
+    rules = defaultdict(list)
+    for itemset, count in support.items():
+        if len(itemset) < 2:
+            continue
+        for consequent in itemset:
+            antecedent = tuple(item for item in itemset if item != consequent)
+            antecedent_count = support.get(antecedent)
+            if not antecedent_count:
+                continue
+            confidence = count / antecedent_count
+            if confidence < min_confidence:
+                continue
+            lift = confidence / (support[(consequent,)] / n_baskets)
+            key = '|'.join(sorted(frequent[item] for item in antecedent))
+            rules[key].append((frequent[consequent], round(confidence, 6), round(lift, 6), count))
+
+    for key, consequents in rules.items():
+        consequents.sort(key=lambda rule: (-rule[1], -rule[2], rule[0]))
+        del consequents[max_consequents:]
+    return dict(rules)
+
+
+def save_rule_index(rules, path, **meta):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'generated_at': time.time(), **meta, 'rules': rules}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class RuleIndex:
+    """关联规则索引：前项 → [(后项, 置信度, 提升度, 支持计数), ...]"""
+
+    def __init__(self, rules, max_antecedent=1):
+        self.rules = rules
+        self.max_antecedent = max_antecedent
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['rules'], max(1, data.get('max_length', 2) - 1))
+
+    def recommend(self, held_keys, prefix=None, limit=5, max_held=20):
+        """根据持有产品查询规则，同一后项取最高置信度，返回 [(产品键, 置信度), ...]"""
+        held = sorted(set(held_keys))[:max_held]
+        best = {}
+        for size in range(1, self.max_antecedent + 1):
+            for antecedent in combinations(held, size):
+                for consequent, confidence, lift, _ in self.rules.get('|'.join(antecedent), ()):
+                    if consequent in held_keys or (prefix and not consequent.startswith(prefix)):
+                        continue
+                    if confidence > best.get(consequent, (0, 0))[0]:
+                        best[consequent] = (confidence, lift)
+        ranked = sorted(best.items(), key=lambda item: (-item[1][0], -item[1][1], item[0]))
+        return [(key, confidence) for key, (confidence, _) in ranked[:limit]]
+
+
+_rules_file = ModelFile(RULES_FILENAME, RuleIndex.load)
+
+
+def rules_path():
+    return _rules_file.path
+
+
+def get_rule_index():
+    """返回已生成的规则索引；尚未生成时返回 None"""
+    return _rules_file.get()
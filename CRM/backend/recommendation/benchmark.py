@@ -0,0 +1,220 @@
+"""推荐引擎基准测试
+
+在独立的 SQLite 数据库上生成指定规模的合成数据，依次测量：
+离线构建（近邻表、协同过滤、关联规则、行业统计）耗时，引擎各公开方法与推荐相关接口的
+冷启动（清空进程内缓存后首次调用）耗时、SQL 查询数与峰值内存，以及缓存命中后的延迟分布。
+结果写成 JSON 报告，可与其他提交的报告逐项对比。
+"""
+import datetime
+import io
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .catalog import catalog_index
+from .industry_stats import industry_stats_holder
+from .market_data import price_store_holder, quote_index_holder
+from .models import Fund, User
+from .portfolio import allocation_model
+from .segment_cache import segment_cache
+
+ENGINE_METHODS = (
+    'insurance_recommendation',
+    'fund_recommendation',
+    'fund_recommendation_clicked',
+    'stock_recommendation',
+    'get_mpt_suggestions',
+    'collaborative_recommendation',
+    'knn_insurance_recommendation_batch',
+)
+ENDPOINTS = (
+    ('fund_recommendations', '/api/funds/recommendations/'),
+    ('insurance_recommendations', '/api/insurance/recommendations/'),
+    ('stock_recommendations', '/api/stocks/recommendations/'),
+    ('mpt_suggestions', '/api/mpt-suggestions/'),
+    ('purchase_records', '/api/purchase/records/'),
+    ('fund_list', '/api/funds/'),
+)
+OFFLINE_COMMANDS = (
+    ('build_fund_neighbors', ['--workers', '1']),
+    ('train_collaborative_filtering', []),
+    ('mine_association_rules', []),
+    ('build_industry_stats', []),
+    ('export_market_snapshot', []),
+)
+
+
+def clear_process_caches():
+    """清空进程内快照与推荐结果缓存，模拟新启动的进程"""
+    catalog_index.clear()
+    price_store_holder.invalidate()
+    quote_index_holder.invalidate()
+    industry_stats_holder.invalidate()
+    allocation_model.reset()
+    caches['default'].clear()
+    segment_cache.clear()
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def latency_summary(seconds):
+    """延迟分布（毫秒）"""
+    ms = np.asarray(seconds) * 1000
+    return {
+        'calls': len(ms),
+        'mean_ms': round(float(ms.mean()), 3),
+        'p50_ms': round(float(np.percentile(ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(ms, 95)), 3),
+        'max_ms': round(float(ms.max()), 3),
+    }
+
+
+def measure(func):
+    """调用一次 func，返回 (耗时秒, SQL 查询数)"""
+    with CaptureQueriesContext(connection) as ctx:
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+    return elapsed, len(ctx.captured_queries)
+
+
+def peak_memory(func):
+    """调用一次 func 期间的 Python 峰值内存（KB）"""
+    tracemalloc.start()
+    try:
+        func()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def profile_call(calls, repeat=1):
+    """对一组调用测量冷启动（耗时、查询数、峰值内存）与缓存命中后的延迟分布"""
+    clear_process_caches()
+    cold_seconds, cold_queries = measure(calls[0])
+    clear_process_caches()
+    cold_peak_kb = peak_memory(calls[0])
+
+    warm_seconds, warm_queries = [], []
+    for _ in range(repeat):
+        for call in calls:
+            elapsed, queries = measure(call)
+            warm_seconds.append(elapsed)
+            warm_queries.append(queries)
+    return {
+        'cold_ms': round(cold_seconds * 1000, 3),
+        'cold_queries': cold_queries,
+        'cold_peak_kb': cold_peak_kb,
+        'warm': dict(latency_summary(warm_seconds), queries_mean=round(float(np.mean(warm_queries)), 2)),
+    }
+
+
+def engine_calls(engine, method, users, clicked_fund_ids):
+    """为每个样本用户构造一次方法调用"""
+    if method == 'fund_recommendation_clicked':
+        return [
+            (lambda user=user, fund_id=fund_id: engine.fund_recommendation(user, clicked_fund_id=fund_id))
+            for user, fund_id in zip(users, clicked_fund_ids)
+        ]
+    if method == 'get_mpt_suggestions':
+        return [(lambda user=user: engine.get_mpt_suggestions(user.id)) for user in users]
+    if method == 'knn_insurance_recommendation_batch':
+        return [lambda: engine.knn_insurance_recommendation_batch(users, 5)]
+    return [(lambda user=user: getattr(engine, method)(user)) for user in users]
+
+
+def run_offline_builds():
+    """运行离线构建命令并记录耗时"""
+    results = {}
+    for name, args in OFFLINE_COMMANDS:
+        started = time.perf_counter()
+        call_command(name, *args, stdout=io.StringIO())
+        results[name] = {'seconds': round(time.perf_counter() - started, 3)}
+    return results
+
+
+def run_engine_benchmarks(sample_users=50, repeat=3, seed=0):
+    """测量引擎方法与接口，返回 (方法结果, 接口结果)"""
+    from rest_framework.test import APIClient
+    from .recommendation_algorithms import RecommendationEngine
+
+    rng = np.random.default_rng(seed)
+    user_ids = np.array(User.objects.order_by('id').values_list('id', flat=True))
+    chosen = np.sort(rng.choice(user_ids, min(sample_users, len(user_ids)), replace=False)).tolist()
+    users = list(User.objects.filter(id__in=chosen).order_by('id'))
+    fund_ids = np.array(Fund.objects.order_by('id').values_list('id', flat=True))
+    clicked_fund_ids = rng.choice(fund_ids, len(users)).tolist() if len(fund_ids) else [None] * len(users)
+
+    engine = RecommendationEngine()
+    methods = {
+        method: profile_call(engine_calls(engine, method, users, clicked_fund_ids), repeat)
+        for method in ENGINE_METHODS
+    }
+
+    client = APIClient()
+    endpoints = {}
+    for name, url in ENDPOINTS:
+        def request(user, url=url):
+            client.force_authenticate(user)
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} returned {response.status_code}")
+        endpoints[name] = profile_call([(lambda user=user: request(user)) for user in users], repeat)
+    client.force_authenticate(None)
+    return methods, endpoints
+
+
+def build_report(scale, seed, counts, generation_seconds, offline, methods, endpoints):
+    return {
+        'meta': {
+            'revision': git_revision(),
+            'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'database': connection.vendor,
+            'cpu_count': os.cpu_count(),
+            'seed': seed,
+            'scale': scale,
+        },
+        'rows': counts,
+        'generation_seconds': generation_seconds,
+        'offline': offline,
+        'methods': methods,
+        'endpoints': endpoints,
+    }
+
+
+def compare_reports(current, baseline, threshold=1.2):
+    """逐项比较冷启动耗时、缓存命中 p50 延迟与查询数，返回 [(项目, 指标, 基线, 当前, 比值, 是否退化), ...]"""
+    rows = []
+    for section in ('methods', 'endpoints'):
+        for name, result in current.get(section, {}).items():
+            base = baseline.get(section, {}).get(name)
+            if not base:
+                continue
+            for metric, now, before in (
+                ('cold_ms', result['cold_ms'], base['cold_ms']),
+                ('warm_p50_ms', result['warm']['p50_ms'], base['warm']['p50_ms']),
+                ('cold_queries', result['cold_queries'], base['cold_queries']),
+            ):
+                ratio = now / before if before else (1.0 if not now else float('inf'))
+                regressed = ratio > threshold if metric != 'cold_queries' else now > before
+                rows.append((f"{section}.{name}", metric, before, now, round(ratio, 3), regressed))
+    return rows
@@ -0,0 +1,293 @@
+"""产品目录特征索引
+
+在进程内缓存基金/保险/股票目录：产品 id、接口返回所需字段以及稠密 NumPy 特征矩阵。
+索引带有目录版本号，产品增删改（post_save/post_delete 信号）或导入命令执行后版本号递增，
+下一次推荐请求时按新版本重建，避免每次请求都通过 ORM 全量加载目录。
+
+目录按列存放（每个字段一个数组），重建后发布为共享数组段（shared_arrays），
+同一版本的其他工作进程直接以只读内存映射挂载，不再各自经 ORM 构建一份，
+多个工作进程共享同一份物理内存。
+"""
+import threading
+
+import numpy as np
+from sklearn.neighbors import NearestNeighbors
+
+from .models import Fund, InsuranceProduct, StockInfo
+from .routers import read_from_primary
+from .scoring import normalize_rows
+from .shared_arrays import ColumnRows, SortedPositions, attach_segment, encode_rows, publish_segment
+from .versions import bump_version, get_version
+
+CATALOG_VERSION_KEY = 'recommendation:catalog_version'
+
+# 保险标签得分按年龄段区分，每个年龄段取一个代表年龄预先计算KNN特征
+INSURANCE_AGE_BUCKETS = {
+    'young': 25,   # < 30
+    'middle': 40,  # 30 ~ 50
+    'senior': 60,  # >= 50
+}
+
+
+def insurance_age_bucket(age):
+    """将用户年龄映射到保险特征所用的年龄段"""
+    if age is None:
+        age = 25
+    if age < 30:
+        return 'young'
+    if age < 50:
+        return 'middle'
+    return 'senior'
+
+
+def get_catalog_version():
+    """返回当前目录版本号"""
+    return get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """目录发生变化时递增版本号"""
+    return bump_version(CATALOG_VERSION_KEY)
+
+
+class FundCatalog:
+    """基金目录快照"""
+
+    fields = ('id', 'code', 'name', 'type', 'managers', 'company', 'star_count')
+    segment_kind = 'catalog-funds'
+
+    def __init__(self, version, arrays):
+        self.version = version
+        self.rows = ColumnRows(arrays, self.fields)  # 接口返回的基础字段
+        self.ids = arrays['id']  # 按 id 升序
+        self.features = arrays['features']  # (n, 3) 特征矩阵
+        self.normalized_features = arrays['normalized_features']  # 余弦相似度打分用
+        self.fund_types = arrays['type']
+        self.star_counts = arrays['star_counts']  # 无评级为 -1
+        self.positions = SortedPositions(self.ids)
+
+    @classmethod
+    def build_arrays(cls, rows, features):
+        arrays = encode_rows(rows, cls.fields)
+        arrays['features'] = features
+        arrays['normalized_features'] = normalize_rows(features)
+        arrays['star_counts'] = np.array(
+            [row['star_count'] if row['star_count'] is not None else -1 for row in rows],
+            dtype=np.int64,
+        )
+        return arrays
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class InsuranceCatalog:
+    """保险目录快照"""
+
+    fields = ('id', 'name', 'category', 'subcategory', 'coverage_summary', 'payout_limit', 'base_premium')
+    segment_kind = 'catalog-insurances'
+
+    def __init__(self, version, arrays):
+        self.version = version
+        self.rows = ColumnRows(arrays, self.fields)
+        self.ids = arrays['id']
+        self.vectors = arrays['vectors']  # (n, 5) 险种偏好向量
+        self.normalized_vectors = arrays['normalized_vectors']  # 余弦相似度打分用
+        self.knn_features = {bucket: arrays[f'knn_{bucket}'] for bucket in INSURANCE_AGE_BUCKETS}  # {年龄段: (n, 3)}
+        self.positions = SortedPositions(self.ids)
+        # 每个目录版本只拟合一次KNN索引，请求时只做查询（拟合后的索引可被多线程并发查询）
+        self.knn_indexes = {}
+        if len(self.rows) > 1:
+            for bucket, features in self.knn_features.items():
+                self.knn_indexes[bucket] = NearestNeighbors(metric='euclidean', algorithm='ball_tree').fit(features)
+
+    @classmethod
+    def build_arrays(cls, rows, vectors, knn_features):
+        arrays = encode_rows(rows, cls.fields)
+        arrays['vectors'] = vectors
+        arrays['normalized_vectors'] = normalize_rows(vectors)
+        for bucket, features in knn_features.items():
+            arrays[f'knn_{bucket}'] = features
+        return arrays
+
+    def __len__(self):
+        return len(self.rows)
+
+    def knn_query(self, bucket, user_features, k):
+        """批量查询最近邻，user_features 为 (m, 3) 矩阵，返回 (距离, 目录下标)，形状均为 (m, k)"""
+        knn = self.knn_indexes.get(bucket)
+        if knn is None:
+            empty = np.empty((len(user_features), 0))
+            return empty, empty.astype(np.intp)
+        return knn.kneighbors(np.asarray(user_features, dtype=np.float64), n_neighbors=min(k, len(self.rows)))
+
+
+class StockCatalog:
+    """股票目录快照（ts_code → 股票信息），替代逐只股票查询 StockInfo"""
+
+    fields = ('id', 'code', 'symbol', 'name', 'industry', 'area')
+    segment_kind = 'catalog-stocks'
+
+    def __init__(self, version, arrays):
+        self.version = version
+        self.rows = ColumnRows(arrays, self.fields)
+        self.ids = arrays['id']
+        self.codes = arrays['code']
+        self.industries = arrays['industry']
+        self.code_positions = SortedPositions(arrays['code_sorted'], arrays['code_order'])
+        self.positions = SortedPositions(self.ids)
+
+    @classmethod
+    def build_arrays(cls, rows):
+        arrays = encode_rows(rows, cls.fields)
+        order = np.argsort(arrays['code'], kind='stable')
+        arrays['code_order'] = order
+        arrays['code_sorted'] = arrays['code'][order]
+        return arrays
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get(self, ts_code):
+        pos = self.code_positions.get(ts_code)
+        return None if pos is None else self.rows[pos]
+
+
+class CatalogIndex:
+    """进程级目录索引，按版本号懒加载重建，线程安全"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._funds = None
+        self._insurances = None
+        self._stocks = None
+
+    def funds(self):
+        version = get_catalog_version()
+        snapshot = self._funds
+        if snapshot is None or snapshot.version != version:
+            with self._lock:
+                snapshot = self._funds
+                if snapshot is None or snapshot.version != version:
+                    snapshot = self._load(FundCatalog, version, self._build_funds)
+                    self._funds = snapshot
+        return snapshot
+
+    def insurances(self):
+        version = get_catalog_version()
+        snapshot = self._insurances
+        if snapshot is None or snapshot.version != version:
+            with self._lock:
+                snapshot = self._insurances
+                if snapshot is None or snapshot.version != version:
+                    snapshot = self._load(InsuranceCatalog, version, self._build_insurances)
+                    self._insurances = snapshot
+        return snapshot
+
+    def stocks(self):
+        version = get_catalog_version()
+        snapshot = self._stocks
+        if snapshot is None or snapshot.version != version:
+            with self._lock:
+                snapshot = self._stocks
+                if snapshot is None or snapshot.version != version:
+                    snapshot = self._load(StockCatalog, version, self._build_stocks)
+                    self._stocks = snapshot
+        return snapshot
+
+    def clear(self):
+        """只丢弃本进程快照（不影响其他进程）"""
+        with self._lock:
+            self._funds = None
+            self._insurances = None
+            self._stocks = None
+
+    def invalidate(self):
+        """丢弃本进程快照并递增全局版本号"""
+        self.clear()
+        return bump_catalog_version()
+
+    def _load(self, catalog_class, version, build):
+        """挂载同一目录版本的共享段；没有时从数据库构建并发布，供其他工作进程挂载"""
+        segment = attach_segment(catalog_class.segment_kind)
+        if segment is not None and segment.header.get('version') == version:
+            return catalog_class(version, segment.arrays)
+
+        with read_from_primary():  # 按版本缓存，不能读到落后的副本
+            arrays = build()
+        try:
+            name = publish_segment(catalog_class.segment_kind, arrays, version=version)
+        except OSError:
+            return catalog_class(version, arrays)  # 模型目录不可写时只在本进程使用
+        # 改用刚发布的内存映射副本，释放本进程构建的数组
+        segment = attach_segment(catalog_class.segment_kind, name)
+        return catalog_class(version, segment.arrays if segment is not None else arrays)
+
+    def _build_funds(self):
+        from .recommendation_algorithms import RecommendationEngine
+        engine = RecommendationEngine()
+
+        rows = []
+        features = []
+        for fund in Fund.objects.order_by('id').iterator(chunk_size=2000):
+            rows.append({
+                'id': fund.id,
+                'code': fund.code,
+                'name': fund.name,
+                'type': fund.fund_type,
+                'managers': fund.managers,
+                'company': fund.company,
+                'star_count': fund.star_count,
+            })
+            features.append(engine._build_fund_features(fund))
+        return FundCatalog.build_arrays(rows, np.array(features, dtype=np.float64).reshape(-1, 3))
+
+    def _build_insurances(self):
+        from .recommendation_algorithms import RecommendationEngine
+        engine = RecommendationEngine()
+
+        rows = []
+        vectors = []
+        knn_features = {bucket: [] for bucket in INSURANCE_AGE_BUCKETS}
+        for insurance in InsuranceProduct.objects.order_by('id').iterator(chunk_size=2000):
+            rows.append({
+                'id': insurance.id,
+                'name': insurance.name,
+                'category': insurance.category,
+                'subcategory': insurance.subcategory,
+                'coverage_summary': insurance.coverage_summary,
+                'payout_limit': insurance.payout_limit,
+                'base_premium': insurance.base_premium,
+            })
+            vectors.append(engine._build_insurance_vector(insurance))
+            for bucket, age in INSURANCE_AGE_BUCKETS.items():
+                knn_features[bucket].append(engine._build_insurance_features_for_age(insurance, age))
+        return InsuranceCatalog.build_arrays(
+            rows,
+            np.array(vectors, dtype=np.float64).reshape(-1, 5),
+            {bucket: np.array(values, dtype=np.float64).reshape(-1, 3) for bucket, values in knn_features.items()},
+        )
+
+    def _build_stocks(self):
+        rows = [
+            {
+                'id': stock_id,
+                'code': ts_code,
+                'symbol': symbol,
+                'name': name,
+                'industry': industry,
+                'area': area,
+            }
+            for stock_id, ts_code, symbol, name, industry, area in StockInfo.objects.order_by('id').values_list(
+                'id', 'ts_code', 'symbol', 'name', 'industry', 'area'
+            ).iterator(chunk_size=5000)
+        ]
+        return StockCatalog.build_arrays(rows)
+
+
+catalog_index = CatalogIndex()
+
+
+def invalidate_catalog():
+    """使目录索引失效（信号处理器和导入命令调用）"""
+    return catalog_index.invalidate()
@@ -0,0 +1,272 @@
+"""基于购买记录的物品-物品协同过滤
+
+从 PurchaseRecord 流式构建稀疏（CSR）用户×产品矩阵 X（基金/保险/股票统一编码为列），
+离线训练得到共现矩阵 C = XᵀX，保存为 .npz。在线打分对用户持有的产品做一次
+稀疏向量×稀疏矩阵乘法：
+
+    score_j = Σ_i x_i · C_ij / (sqrt(n_i) · sqrt(n_j)) / |x|    （n_i = C_ii，即与持有产品的平均余弦相似度）
+
+全程不构建稠密矩阵。新的购买记录通过 fold_in 增量并入：只对受影响用户计算
+ΔC = X_new[U]ᵀX_new[U] − X_old[U]ᵀX_old[U]。在线请求直接读取用户当前的持有产品，
+因此用户自己的新购买无需重新训练即可反映在推荐结果中。
+
+训练后另把打分所需的数组（产品编码与共现矩阵的 CSR 数组）发布为共享数组段，
+Web 工作进程以只读内存映射挂载，多个进程共用同一份共现矩阵，也不需要加载用户×产品矩阵。
+"""
+import os
+
+import numpy as np
+from scipy import sparse
+
+from .model_store import ModelFile
+from .models import PurchaseRecord
+from .scoring import top_k
+from .shared_arrays import POINTER, SortedPositions, attach_segment, publish_segment
+
+PURCHASE_TYPES = ('fund', 'insurance', 'stock')
+TYPE_CODES = {purchase_type: code for code, purchase_type in enumerate(PURCHASE_TYPES)}
+MODEL_FILENAME = 'item_cf.npz'
+SEGMENT_KIND = 'item_cf'
+
+
+def iter_purchase_chunks(min_record_id=0, chunk_size=100000):
+    """按主键顺序分块读取已完成的购买记录（不含卖出），返回 (块内最大记录id, 用户id数组, 类型编码数组, 产品id数组)
+
+    未知购买类型的行被丢弃，但块内最大记录id仍包含这些行，增量并入时不会反复读取它们。
+    """
+    queryset = (
+        PurchaseRecord.objects.filter(status='completed', id__gt=min_record_id)
+        .exclude(quantity__lt=0)  # 卖出记录（数量为负）不是购买
+        .order_by('id')
+        .values_list('id', 'user_id', 'purchase_type', 'product_id')
+    )
+    buffer = []
+    for row in queryset.iterator(chunk_size=chunk_size):
+        buffer.append(row)
+        if len(buffer) >= chunk_size:
+            yield _to_arrays(buffer)
+            buffer = []
+    if buffer:
+        yield _to_arrays(buffer)
+
+
+def _to_arrays(rows):
+    last_record_id = rows[-1][0]  # 按主键排序读取
+    user_ids = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+    type_codes = np.fromiter((TYPE_CODES.get(row[2], -1) for row in rows), dtype=np.int8, count=len(rows))
+    product_ids = np.fromiter((row[3] for row in rows), dtype=np.int64, count=len(rows))
+    valid = type_codes >= 0
+    return last_record_id, user_ids[valid], type_codes[valid], product_ids[valid]
+
+
+def _item_keys(item_types, item_ids):
+    """把 (类型编码, 产品id) 合并为单个 int64 键，便于在有序数组上查找"""
+    return (np.asarray(item_types, dtype=np.int64) << 40) | np.asarray(item_ids, dtype=np.int64)
+
+
+class ItemItemScorer:
+    """在线打分所需的只读部分：产品编码、共现矩阵与归一化系数"""
+
+    def __init__(self, item_types, item_ids, cooccurrence, inv_sqrt_counts, item_positions):
+        self.item_types = item_types
+        self.item_ids = item_ids
+        self.cooccurrence = cooccurrence
+        self.inv_sqrt_counts = inv_sqrt_counts
+        self.item_positions = item_positions  # (类型编码 << 40 | 产品id) → 列号
+
+    @classmethod
+    def attach(cls, name=None):
+        """挂载已发布的打分段；没有时返回 None"""
+        segment = attach_segment(SEGMENT_KIND, name)
+        if segment is None:
+            return None
+        cooccurrence = sparse.csr_matrix(
+            (segment['cooc_data'], segment['cooc_indices'], segment['cooc_indptr']),
+            shape=tuple(segment.header['cooc_shape']), copy=False,
+        )
+        return cls(
+            segment['item_types'], segment['item_ids'], cooccurrence, segment['inv_sqrt_counts'],
+            SortedPositions(segment['item_keys'], segment['item_order']),
+        )
+
+    def _item_position(self, type_code, product_id):
+        return self.item_positions.get(int(_item_keys(type_code, product_id)))
+
+    def score(self, held_items, purchase_type=None, limit=5):
+        """对用户持有的产品集合 [(类型, 产品id), ...] 打分，返回 [(类型, 产品id, 分数), ...]"""
+        held = [self._item_position(TYPE_CODES[t], pid) for t, pid in held_items if t in TYPE_CODES]
+        held = [pos for pos in held if pos is not None]
+        if not held:
+            return []
+
+        held = np.unique(held)
+        weights = sparse.csr_matrix(
+            (self.inv_sqrt_counts[held], (np.zeros(len(held), dtype=np.intp), held)),
+            shape=(1, len(self.item_ids)),
+        )
+        scores = (weights @ self.cooccurrence).toarray().ravel() * self.inv_sqrt_counts / len(held)
+
+        exclude = held
+        if purchase_type is not None:
+            exclude = np.union1d(held, np.flatnonzero(self.item_types != TYPE_CODES[purchase_type]))
+        scores[exclude] = 0.0
+        indices = top_k(scores, limit)
+        indices = indices[scores[indices] > 0]
+        return [
+            (PURCHASE_TYPES[self.item_types[idx]], int(self.item_ids[idx]), float(scores[idx]))
+            for idx in indices
+        ]
+
+    def popular(self, purchase_type, limit=5):
+        """购买人数最多的某类产品 [(类型, 产品id, 购买人数), ...]（共现矩阵对角线即购买人数）"""
+        counts = np.zeros(len(self.item_ids))
+        np.divide(1.0, np.square(self.inv_sqrt_counts), out=counts, where=self.inv_sqrt_counts > 0)
+        counts[self.item_types != TYPE_CODES[purchase_type]] = 0.0
+        indices = top_k(counts, limit)
+        indices = indices[counts[indices] > 0]
+        return [(purchase_type, int(self.item_ids[idx]), int(round(counts[idx]))) for idx in indices]
+
+
+class ItemItemModel(ItemItemScorer):
+    """物品-物品协同过滤模型"""
+
+    def __init__(self, user_ids, item_types, item_ids, user_items, cooccurrence, last_record_id):
+        self.user_ids = np.asarray(user_ids, dtype=np.int64)
+        self.item_types = np.asarray(item_types, dtype=np.int8)
+        self.item_ids = np.asarray(item_ids, dtype=np.int64)
+        self.user_items = user_items.tocsr()  # (用户数, 产品数) 0/1 矩阵
+        self.cooccurrence = cooccurrence.tocsr()  # (产品数, 产品数) 共现次数
+        self.last_record_id = int(last_record_id)
+        self.user_positions = {user_id: pos for pos, user_id in enumerate(self.user_ids.tolist())}
+        self.item_positions = {
+            key: pos for pos, key in enumerate(zip(self.item_types.tolist(), self.item_ids.tolist()))
+        }
+        self._refresh_counts()
+
+    def _refresh_counts(self):
+        counts = self.cooccurrence.diagonal().astype(np.float64)
+        self.inv_sqrt_counts = np.zeros_like(counts)
+        np.divide(1.0, np.sqrt(counts), out=self.inv_sqrt_counts, where=counts > 0)
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], [], sparse.csr_matrix((0, 0)), sparse.csr_matrix((0, 0)), 0)
+
+    def fold_in_records(self, chunk_size=100000):
+        """增量并入 last_record_id 之后的购买记录，返回并入的记录数"""
+        total = 0
+        for last_record_id, user_ids, type_codes, product_ids in iter_purchase_chunks(self.last_record_id, chunk_size):
+            self.fold_in(user_ids, type_codes, product_ids)
+            self.last_record_id = int(last_record_id)
+            total += len(user_ids)
+        return total
+
+    def fold_in(self, user_ids, type_codes, product_ids):
+        """并入一批 (用户, 产品) 购买，只重算受影响用户对共现矩阵的贡献"""
+        if not len(user_ids):
+            return
+
+        # 为新用户、新产品分配行列
+        user_index, new_users = _assign(self.user_positions, user_ids.tolist())
+        item_index, new_items = _assign(self.item_positions, list(zip(type_codes.tolist(), product_ids.tolist())))
+        if new_users:
+            self.user_ids = np.concatenate([self.user_ids, np.asarray(new_users, dtype=np.int64)])
+        if new_items:
+            self.item_types = np.concatenate([self.item_types, np.array([k[0] for k in new_items], dtype=np.int8)])
+            self.item_ids = np.concatenate([self.item_ids, np.array([k[1] for k in new_items], dtype=np.int64)])
+        n_users, n_items = len(self.user_ids), len(self.item_ids)
+        old_users = self.user_items
+        old_users.resize((n_users, n_items))
+        self.cooccurrence.resize((n_items, n_items))
+
+        affected = np.unique(user_index)
+        additions = sparse.csr_matrix(
+            (np.ones(len(user_index)), (user_index, item_index)), shape=(n_users, n_items)
+        )
+        new_users_matrix = old_users + additions
+        new_users_matrix.data = np.ones_like(new_users_matrix.data)  # 重复购买只计一次
+
+        before = old_users[affected]
+        after = new_users_matrix[affected]
+        delta = (after.T @ after) - (before.T @ before)
+        self.cooccurrence = (self.cooccurrence + delta).tocsr()
+        self.cooccurrence.eliminate_zeros()
+        self.user_items = new_users_matrix.tocsr()
+        self._refresh_counts()
+
+    def _item_position(self, type_code, product_id):
+        return self.item_positions.get((type_code, product_id))
+
+    def save(self, path=None):
+        path = path or model_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        users, cooc = self.user_items, self.cooccurrence
+        np.savez(
+            tmp_path,
+            user_ids=self.user_ids, item_types=self.item_types, item_ids=self.item_ids,
+            users_data=users.data, users_indices=users.indices, users_indptr=users.indptr,
+            users_shape=np.array(users.shape),
+            cooc_data=cooc.data, cooc_indices=cooc.indices, cooc_indptr=cooc.indptr,
+            cooc_shape=np.array(cooc.shape),
+            last_record_id=np.array(self.last_record_id),
+        )
+        os.replace(tmp_path, path)  # 原子替换，在线进程不会读到写了一半的文件
+
+    @classmethod
+    def load(cls, path=None):
+        with np.load(path or model_path()) as data:
+            user_items = sparse.csr_matrix(
+                (data['users_data'], data['users_indices'], data['users_indptr']), shape=tuple(data['users_shape'])
+            )
+            cooccurrence = sparse.csr_matrix(
+                (data['cooc_data'], data['cooc_indices'], data['cooc_indptr']), shape=tuple(data['cooc_shape'])
+            )
+            return cls(data['user_ids'], data['item_types'], data['item_ids'], user_items, cooccurrence,
+                       int(data['last_record_id']))
+
+    def publish(self):
+        """把打分所需的数组发布为共享数组段，返回段名"""
+        keys = _item_keys(self.item_types, self.item_ids)
+        order = np.argsort(keys, kind='stable')
+        cooc = self.cooccurrence
+        return publish_segment(
+            SEGMENT_KIND,
+            {
+                'item_types': self.item_types, 'item_ids': self.item_ids,
+                'item_keys': keys[order], 'item_order': order,
+                'cooc_data': cooc.data, 'cooc_indices': cooc.indices, 'cooc_indptr': cooc.indptr,
+                'inv_sqrt_counts': self.inv_sqrt_counts,
+            },
+            cooc_shape=list(cooc.shape),
+            last_record_id=self.last_record_id,
+        )
+
+
+def _assign(positions, keys):
+    """把 id（或 (类型, 产品id)）映射为行/列号，新出现的追加到末尾"""
+    index = np.empty(len(keys), dtype=np.intp)
+    new = []
+    base = len(positions)
+    for i, key in enumerate(keys):
+        pos = positions.get(key)
+        if pos is None:
+            pos = base + len(new)
+            positions[key] = pos
+            new.append(key)
+        index[i] = pos
+    return index, new
+
+
+_model_file = ModelFile(MODEL_FILENAME, ItemItemModel.load)
+# CURRENT 指针被替换（发布了新段）后重新挂载
+_scorer_file = ModelFile(os.path.join(SEGMENT_KIND, POINTER), lambda path: ItemItemScorer.attach())
+
+
+def model_path():
+    return _model_file.path
+
+
+def get_item_cf_model():
+    """返回已训练的模型（优先使用共享打分段）；尚未训练时返回 None"""
+    return _scorer_file.get() or _model_file.get()
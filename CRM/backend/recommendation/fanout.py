@@ -0,0 +1,79 @@
+"""推荐策略并发执行（异步推荐接口使用）
+
+同一类产品的各推荐策略相互独立，在共享线程池中并发运行（ORM 查询阻塞在 I/O 上，NumPy 计算释放 GIL），
+由 asyncio 统一等待：请求耗时取决于最慢的策略，而不是各策略耗时之和。
+超过时限或抛出异常的策略被放弃并记为降级，调用方改用热度推荐补足结果，请求不会因此失败；
+被放弃的策略仍在线程中运行完毕（Python 线程无法中断），其结果照常写入各级缓存。
+"""
+import asyncio
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """进程级线程池（首次使用时按 RECOMMENDATION_FANOUT_WORKERS 创建）"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.RECOMMENDATION_FANOUT_WORKERS, thread_name_prefix='recommendation',
+                )
+    return _executor
+
+
+def _call(func):
+    # 线程池线程不经过请求开始/结束信号，自行关闭出错或超过 CONN_MAX_AGE 的连接
+    close_old_connections()
+    try:
+        return func()
+    finally:
+        close_old_connections()
+
+
+def run_in_pool(func):
+    """在线程池中运行无参函数，返回可 await 的 future
+
+    函数在当前上下文的副本中执行（与 asyncio.to_thread 相同），请求的SQL统计等上下文变量随之传入。
+    """
+    context = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(get_executor(), context.run, _call, func)
+
+
+async def run_strategies(strategies, timeout=None):
+    """并发运行 [(策略名, 无参函数)]，返回 (按策略顺序合并的推荐列表, 降级的策略名列表)
+
+    所有策略同时开始，共用一个截止时间（默认 RECOMMENDATION_STRATEGY_TIMEOUT 秒）。
+    """
+    if timeout is None:
+        timeout = settings.RECOMMENDATION_STRATEGY_TIMEOUT
+    tasks = [asyncio.ensure_future(run_in_pool(func)) for _, func in strategies]
+    if tasks:
+        await asyncio.wait(tasks, timeout=timeout)
+
+    recommendations, degraded = [], []
+    for (name, _), task in zip(strategies, tasks):
+        if not task.done():
+            task.cancel()  # 只是不再等待；尚未开始的任务会被取消
+            reason = 'timeout'
+        elif task.exception() is not None:
+            logger.warning("recommendation strategy %s failed", name, exc_info=task.exception())
+            reason = 'error'
+        else:
+            recommendations.extend(task.result())
+            continue
+        degraded.append(name)
+        metrics.strategy_degraded.inc(name, reason)
+    return recommendations, degraded
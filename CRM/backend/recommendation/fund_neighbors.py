@@ -0,0 +1,116 @@
+"""基金相似近邻表的离线计算
+
+按行分块计算 归一化特征矩阵 × 归一化特征矩阵转置，每块只保留每行的Top-K，
+多个分块在线程池中并行（矩阵乘法与 argpartition 运行时释放GIL，可利用多核）。
+增量模式只重算受变更基金影响的行。
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Min
+
+from .catalog import catalog_index
+from .models import FundNeighbor
+
+DEFAULT_NEIGHBORS = 20
+
+
+def _top_k_block(block, row_positions, k):
+    """对一个相似度分块 (m, n) 取每行Top-K（排除自身），返回 (下标, 分数)"""
+    block[np.arange(len(row_positions)), row_positions] = -np.inf
+    if k < block.shape[1]:
+        candidates = np.argpartition(-block, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.tile(np.arange(block.shape[1]), (block.shape[0], 1))
+    scores = np.take_along_axis(block, candidates, axis=1)
+    # 分数降序，分数相同时下标小的在前
+    order = np.lexsort((candidates, -scores), axis=1)
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+
+def compute_neighbors(normalized, row_positions, k, chunk_size=256, workers=1):
+    """计算指定行的Top-K近邻，返回 (下标矩阵, 分数矩阵)，形状均为 (len(row_positions), k)"""
+    row_positions = np.asarray(row_positions, dtype=np.intp)
+    k = min(k, len(normalized) - 1)
+    if k <= 0 or not len(row_positions):
+        return np.empty((len(row_positions), 0), dtype=np.intp), np.empty((len(row_positions), 0))
+
+    def run(start):
+        rows = row_positions[start:start + chunk_size]
+        return _top_k_block(normalized[rows] @ normalized.T, rows, k)
+
+    starts = range(0, len(row_positions), chunk_size)
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            blocks = list(executor.map(run, starts))
+    else:
+        blocks = [run(start) for start in starts]
+    return np.vstack([b[0] for b in blocks]), np.vstack([b[1] for b in blocks])
+
+
+def affected_positions(catalog, changed_fund_ids, k):
+    """找出受变更基金影响、需要重算的行
+
+    包括：变更基金本身；近邻表中缺失或不满K条的基金（新增基金、近邻被删除）；
+    近邻中含有变更基金的基金；与变更基金的相似度已超过其当前第K名的基金。
+    """
+    k = min(k, len(catalog) - 1)
+    changed = [catalog.positions[fund_id] for fund_id in changed_fund_ids if fund_id in catalog.positions]
+    affected = np.zeros(len(catalog), dtype=bool)
+    affected[changed] = True
+
+    kth_scores = np.full(len(catalog), np.inf)
+    stored = FundNeighbor.objects.values('fund_id').annotate(kth_score=Min('score'), n=Count('id'))
+    for row in stored:
+        pos = catalog.positions.get(row['fund_id'])
+        if pos is not None and row['n'] >= k:
+            kth_scores[pos] = row['kth_score']
+    affected |= np.isinf(kth_scores)
+
+    referencing = FundNeighbor.objects.filter(neighbor_id__in=list(changed_fund_ids)).values_list('fund_id', flat=True)
+    affected[[catalog.positions[fund_id] for fund_id in referencing if fund_id in catalog.positions]] = True
+
+    if changed:
+        similarities = catalog.normalized_features @ catalog.normalized_features[changed].T
+        similarities[changed, np.arange(len(changed))] = -np.inf
+        affected |= similarities.max(axis=1) >= kth_scores
+    return np.flatnonzero(affected)
+
+
+def store_neighbors(catalog, row_positions, indices, scores, replace_all=False, batch_size=5000):
+    """用新结果替换这些基金在近邻表中的记录（replace_all 时整表替换）"""
+    fund_ids = catalog.ids[row_positions].tolist()
+    objs = []
+    for fund_id, neighbor_positions, neighbor_scores in zip(fund_ids, indices, scores):
+        for rank, (pos, score) in enumerate(zip(neighbor_positions, neighbor_scores)):
+            objs.append(FundNeighbor(fund_id=fund_id, neighbor_id=int(catalog.ids[pos]), rank=rank, score=float(score)))
+
+    with transaction.atomic():
+        if replace_all:
+            FundNeighbor.objects.all().delete()
+        else:
+            for start in range(0, len(fund_ids), batch_size):
+                FundNeighbor.objects.filter(fund_id__in=fund_ids[start:start + batch_size]).delete()
+        FundNeighbor.objects.bulk_create(objs, batch_size=batch_size)
+    return len(objs)
+
+
+def build_fund_neighbors(k=DEFAULT_NEIGHBORS, changed_fund_ids=None, chunk_size=256, workers=1):
+    """重建近邻表；传入 changed_fund_ids 时只重算受影响的行。返回 (重算行数, 写入记录数)"""
+    catalog = catalog_index.funds()
+    if len(catalog) < 2:
+        FundNeighbor.objects.all().delete()
+        return 0, 0
+
+    replace_all = changed_fund_ids is None
+    if replace_all:
+        row_positions = np.arange(len(catalog))
+    else:
+        row_positions = affected_positions(catalog, changed_fund_ids, k)
+
+    indices, scores = compute_neighbors(
+        catalog.normalized_features, row_positions, k, chunk_size=chunk_size, workers=workers
+    )
+    written = store_neighbors(catalog, row_positions, indices, scores, replace_all=replace_all)
+    return len(row_positions), written
@@ -0,0 +1,144 @@
+"""用户持仓维护
+
+每笔交易在写入 PurchaseRecord 的同一事务内更新 Holding（按 用户 × 产品类型 × 产品 唯一），
+资产配置（股票按最新报价估值）与卖出校验只需读取持仓表，不再汇总全部交易记录。
+卖出记录的数量记为负数，持仓成本按平均成本法扣减；rebuild_holdings 可从交易记录重建持仓。
+"""
+from collections import defaultdict
+from decimal import Decimal
+from itertools import groupby
+
+from django.db import transaction
+
+from .market_data import get_quote_index
+from .models import Holding, PurchaseRecord
+
+ZERO = Decimal('0')
+CENT = Decimal('0.01')
+
+
+class InsufficientHoldingError(Exception):
+    """卖出数量超过当前持仓"""
+
+    def __init__(self, held_quantity):
+        super().__init__(f"insufficient holding: {held_quantity}")
+        self.held_quantity = held_quantity
+
+
+def _apply(quantity, cost_basis, amount, trade_quantity):
+    """在 (持有数量, 持仓成本) 上应用一笔交易，trade_quantity 为负表示卖出"""
+    trade_quantity = trade_quantity or ZERO
+    if trade_quantity >= 0:
+        return quantity + trade_quantity, cost_basis + amount
+
+    sold = min(-trade_quantity, quantity)
+    remaining = quantity - sold
+    if remaining <= 0:
+        return ZERO, ZERO
+    # 平均成本法：按卖出比例扣减成本
+    return remaining, (cost_basis * remaining / quantity).quantize(CENT)
+
+
+def signed_quantity(quantity, direction):
+    """交易记录中保存的数量：卖出记为负数"""
+    if quantity is None:
+        return None
+    return -quantity if direction == 'sell' else quantity
+
+
+def apply_trade(user_id, product_type, product_id, amount, quantity=None):
+    """在当前事务内把一笔交易并入持仓，返回更新后的 Holding
+
+    quantity 为负表示卖出；卖出数量超过持仓时抛出 InsufficientHoldingError。
+    须在 transaction.atomic() 中调用，持仓行在事务内加锁，并发交易按顺序生效。
+    """
+    amount = Decimal(str(amount))
+    quantity = Decimal(str(quantity)) if quantity is not None else None
+    holding, _ = Holding.objects.select_for_update().get_or_create(
+        user_id=user_id, product_type=product_type, product_id=product_id
+    )
+    if quantity is not None and quantity < 0 and holding.quantity < -quantity:
+        raise InsufficientHoldingError(holding.quantity)
+
+    holding.quantity, holding.cost_basis = _apply(holding.quantity, holding.cost_basis, amount, quantity)
+    holding.save(update_fields=['quantity', 'cost_basis', 'updated_at'])
+    return holding
+
+
+def allocation_by_type(user_id):
+    """按产品类型汇总的持仓市值 {产品类型: 金额}
+
+    股票按最新收盘价估值（没有行情时按成本），基金、保险按持仓成本。
+    """
+    rows = Holding.objects.filter(user_id=user_id, cost_basis__gt=0).values_list(
+        'product_type', 'product_id', 'quantity', 'cost_basis'
+    )
+    allocation = defaultdict(float)
+    quotes = None
+    for product_type, product_id, quantity, cost_basis in rows:
+        value = float(cost_basis)
+        if product_type == 'stock':
+            if quotes is None:
+                quotes = get_quote_index()
+            price = quotes.price_for_stock(product_id)
+            if price is not None:
+                value = float(quantity) * price
+        allocation[product_type] += value
+    return dict(allocation)
+
+
+def _replay(records):
+    """按交易顺序重放 (产品类型, 产品id, 金额, 数量)，返回 {(产品类型, 产品id): (数量, 成本)}"""
+    positions = defaultdict(lambda: (ZERO, ZERO))
+    for product_type, product_id, amount, quantity in records:
+        key = (product_type, product_id)
+        positions[key] = _apply(*positions[key], amount, quantity)
+    return positions
+
+
+def rebuild_holdings(user_ids=None, chunk_size=20000, dry_run=False):
+    """从已完成的交易记录重建持仓，返回 (检查的用户数, 与现有持仓不一致的条数)"""
+    records = PurchaseRecord.objects.filter(status='completed')
+    holdings = Holding.objects.all()
+    if user_ids is not None:
+        records = records.filter(user_id__in=user_ids)
+        holdings = holdings.filter(user_id__in=user_ids)
+
+    with transaction.atomic():
+        # 先锁定持仓再读取交易记录：交易在同一事务内锁定持仓行（apply_trade），
+        # 此前已提交的交易都会被重放，之后的交易等待重建提交后再更新持仓，不会丢失
+        existing = {
+            (user_id, product_type, product_id): (quantity, cost_basis)
+            for user_id, product_type, product_id, quantity, cost_basis in holdings.select_for_update().values_list(
+                'user_id', 'product_type', 'product_id', 'quantity', 'cost_basis'
+            ).iterator(chunk_size=chunk_size)
+            if (quantity, cost_basis) != (ZERO, ZERO)
+        }
+
+        rows = (
+            records.order_by('user_id', 'id')
+            .values_list('user_id', 'purchase_type', 'product_id', 'amount', 'quantity')
+            .iterator(chunk_size=chunk_size)
+        )
+        rebuilt = {}
+        for user_id, user_rows in groupby(rows, key=lambda row: row[0]):
+            for (product_type, product_id), position in _replay(row[1:] for row in user_rows).items():
+                if position != (ZERO, ZERO):
+                    rebuilt[(user_id, product_type, product_id)] = position
+
+        mismatches = sum(
+            1 for key in rebuilt.keys() | existing.keys() if rebuilt.get(key) != existing.get(key)
+        )
+        if not dry_run and mismatches:
+            holdings.delete()
+            Holding.objects.bulk_create(
+                (
+                    Holding(user_id=user_id, product_type=product_type, product_id=product_id,
+                            quantity=quantity, cost_basis=cost_basis)
+                    for (user_id, product_type, product_id), (quantity, cost_basis) in rebuilt.items()
+                ),
+                batch_size=1000,
+            )
+
+    n_users = len({key[0] for key in rebuilt} | {key[0] for key in existing})
+    return n_users, mismatches
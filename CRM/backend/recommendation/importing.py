@@ -0,0 +1,434 @@
+"""流式 CSV 导入
+
+逐行解析 CSV（生成器，不把整个文件读入内存），按固定批量在各自的事务中写入数据库，
+每批提交后记录检查点（已处理到的字节偏移），中断后可以从检查点继续；
+无法解析的行连同原因写入拒绝文件，不影响其余数据。
+"""
+import csv
+import dataclasses
+import json
+import os
+import time
+from collections import deque
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, reset_queries, transaction
+
+from .process_pool import process_pool
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+class RowRejected(ValueError):
+    """该行数据无效，跳过并记录到拒绝文件"""
+
+
+@dataclasses.dataclass
+class ImportStats:
+    rows: int = 0  # 读取的数据行（本次运行）
+    written: int = 0  # 写入数据库的对象
+    skipped: int = 0  # parse_row 返回 None 的行（如增量导入时已有的交易日）
+    rejected: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    resumed_from: int = 0  # 继续导入时的起始字节偏移
+
+
+class CsvReader:
+    """逐条产出 (记录结束处的字节偏移, 字段列表)
+
+    以二进制方式读取并自行统计字节数，因此可以从任意记录边界（检查点）直接 seek 继续；
+    csv 模块按需逐行拉取，含换行的引号字段同样适用。
+    """
+
+    def __init__(self, file_path, offset=0):
+        self.file_path = file_path
+        self.offset = offset
+        with open(file_path, 'rb') as f:
+            self.header = next(csv.reader([f.readline().decode('utf-8-sig')]), [])
+            self.data_start = f.tell()
+
+    def __iter__(self):
+        if not self.header:
+            return
+        position = max(self.offset, self.data_start)
+        with open(self.file_path, 'rb') as f:
+            f.seek(position)
+
+            def lines():
+                nonlocal position
+                for raw in f:
+                    position += len(raw)
+                    yield raw.decode('utf-8')
+
+            for values in csv.reader(lines()):
+                if values:
+                    yield position, values
+
+
+def parse_number(value, cast=float, required=True):
+    """把 CSV 字段转换为数值，空值在 required=False 时返回 None"""
+    value = (value or '').strip()
+    if not value:
+        if required:
+            raise RowRejected("missing number")
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        raise RowRejected(f"invalid number {value!r}")
+
+
+class Checkpoint:
+    """导入检查点：记录在 <文件>.checkpoint 中，文件大小或修改时间变化后失效"""
+
+    def __init__(self, file_path):
+        self.path = f"{file_path}.checkpoint"
+        stat = os.stat(file_path)
+        self.fingerprint = {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def load(self):
+        """返回可继续的字节偏移，没有检查点时返回 0"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return 0
+        if {key: data.get(key) for key in self.fingerprint} != self.fingerprint:
+            raise CommandError(f"{self.path} was written for a different version of the file; delete it to start over")
+        return data['offset']
+
+    def save(self, offset):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(self.fingerprint, offset=offset), f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class RejectLog:
+    """把被拒绝的行及原因写入 CSV（首次拒绝时才创建文件）"""
+
+    def __init__(self, path, header, append=False):
+        self.path = path
+        self.header = header
+        self.append = append
+        self._file = None
+        self._writer = None
+
+    def write(self, rejected):
+        """写入一批 [(字段列表, 原因), ...]"""
+        if not rejected:
+            return
+        if self._writer is None:
+            exists = self.append and os.path.exists(self.path)
+            self._file = open(self.path, 'a' if exists else 'w', encoding='utf-8', newline='')
+            self._writer = csv.writer(self._file)
+            if not exists:
+                self._writer.writerow([*self.header, 'error'])
+        self._writer.writerows([*values, reason] for values, reason in rejected)
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def parse_records(parse_row, header, records):
+    """解析一批 (结束偏移, 字段列表)，返回 [(结束偏移, 对象或 None, 拒绝信息或 None), ...]"""
+    results = []
+    for end, values in records:
+        try:
+            if len(values) != len(header):
+                raise RowRejected(f"expected {len(header)} fields, got {len(values)}")
+            results.append((end, parse_row(dict(zip(header, values))), None))
+        except (RowRejected, KeyError, ValueError) as e:
+            results.append((end, None, (values, f"{type(e).__name__}: {e}")))
+    return results
+
+
+_worker_parser = {}
+
+
+def _init_parser(parse_row, header):
+    _worker_parser.update(parse_row=parse_row, header=header)
+
+
+def _parse_in_worker(records):
+    return parse_records(_worker_parser['parse_row'], _worker_parser['header'], records)
+
+
+def parsed_batches(reader, parse_row, batch_size, workers=1):
+    """按文件顺序产出解析后的批次；workers > 1 时在进程池中解析，由调用方单线程写库
+
+    最多同时提交 workers * 2 个批次，解析快于写库时内存不会持续增长。
+    parse_row 需要可以 pickle（模块级函数或 functools.partial）。
+    """
+    records = iter(reader)
+    raw_batches = iter(lambda: list(islice(records, batch_size)), [])
+    if workers <= 1:
+        for batch in raw_batches:
+            yield parse_records(parse_row, reader.header, batch)
+        return
+
+    connections.close_all()  # 子进程不使用继承的数据库连接
+    pending = deque()
+    with process_pool(workers, initializer=_init_parser, initargs=(parse_row, reader.header)) as pool:
+        for batch in raw_batches:
+            pending.append(pool.apply_async(_parse_in_worker, (batch,)))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def stream_import(file_path, parse_row, write_batch, batch_size=DEFAULT_BATCH_SIZE, resume=False,
+                  rejects_path=None, workers=1, log=None):
+    """流式导入一个 CSV 文件
+
+    parse_row(row) 返回模型对象（或 None 表示跳过），无效行抛出 RowRejected；
+    write_batch(objs) 在事务中写入一批对象并返回写入数量。
+    """
+    checkpoint = Checkpoint(file_path)
+    offset = checkpoint.load() if resume else 0
+    if not resume:
+        checkpoint.clear()
+    reader = CsvReader(file_path, offset)
+    rejects = RejectLog(rejects_path or f"{file_path}.rejected.csv", reader.header, append=bool(offset))
+    total_bytes = os.path.getsize(file_path) or 1
+    stats = ImportStats(resumed_from=offset)
+    started = time.perf_counter()
+
+    try:
+        for batch in parsed_batches(reader, parse_row, batch_size, workers):
+            objs = [obj for _, obj, _ in batch if obj is not None]
+            # 被拒绝的行在批次提交后才写出，避免中断后继续时重复记录
+            rejected = [reject for _, _, reject in batch if reject is not None]
+            with transaction.atomic():
+                stats.written += write_batch(objs) if objs else 0
+            stats.rows += len(batch)
+            stats.rejected += len(rejected)
+            stats.skipped += len(batch) - len(objs) - len(rejected)
+            stats.batches += 1
+            rejects.write(rejected)
+            checkpoint.save(batch[-1][0])
+            # DEBUG 模式下 Django 会保留每条 SQL，长时间导入需要定期清空
+            reset_queries()
+            if log:
+                elapsed = time.perf_counter() - started
+                log(f"{stats.rows} rows ({batch[-1][0] / total_bytes:.0%}), {stats.written} written, "
+                    f"{stats.skipped} skipped, {stats.rejected} rejected, "
+                    f"{stats.rows / elapsed if elapsed else 0:.0f} rows/s")
+    finally:
+        rejects.close()
+    checkpoint.clear()
+    stats.seconds = round(time.perf_counter() - started, 3)
+    return stats
+
+
+def upsert(model, objs, key_fields, batch_size=500):
+    """按自然键插入新行、更新有变化的行
+
+    返回 ({'inserted': n, 'updated': n, 'unchanged': n, 'duplicates': n}, 新增或更新行的主键列表)。
+    已有行保留原主键（目录缓存和购买记录中引用的 ID 不变）；同一批中重复的键以最后一行为准，
+    库中已存在重复键时只更新 ID 最小的一行。
+    """
+    update_fields = [
+        field.attname for field in model._meta.concrete_fields
+        if not field.primary_key and field.attname not in key_fields
+    ]
+
+    def natural_key(obj):
+        return tuple(getattr(obj, field) for field in key_fields)
+
+    incoming = {natural_key(obj): obj for obj in objs}
+    existing = {}
+    first_values = list({key[0] for key in incoming})
+    for start in range(0, len(first_values), batch_size):
+        rows = model.objects.filter(**{f"{key_fields[0]}__in": first_values[start:start + batch_size]}).order_by('pk')
+        for row in rows:
+            existing.setdefault(natural_key(row), row)
+
+    to_create, to_update, unchanged = [], [], 0
+    for key, obj in incoming.items():
+        current = existing.get(key)
+        if current is None:
+            to_create.append(obj)
+        elif any(getattr(current, field) != getattr(obj, field) for field in update_fields):
+            for field in update_fields:
+                setattr(current, field, getattr(obj, field))
+            to_update.append(current)
+        else:
+            unchanged += 1
+
+    if to_update:
+        model.objects.bulk_update(to_update, update_fields, batch_size=batch_size)
+    if to_create:
+        model.objects.bulk_create(to_create, batch_size=batch_size)
+
+    created_ids = [obj.pk for obj in to_create]
+    if None in created_ids:
+        # MySQL 的 bulk_create 不回填主键，按自然键查回新行的 ID
+        created_keys = {natural_key(obj) for obj in to_create}
+        created_values = list({key[0] for key in created_keys})
+        created_ids = []
+        for start in range(0, len(created_values), batch_size):
+            rows = model.objects.filter(
+                **{f"{key_fields[0]}__in": created_values[start:start + batch_size]}
+            ).values_list('pk', *key_fields)
+            created_ids.extend(pk for pk, *key in rows if tuple(key) in created_keys)
+
+    counts = {
+        'inserted': len(to_create),
+        'updated': len(to_update),
+        'unchanged': unchanged,
+        'duplicates': len(objs) - len(incoming),
+    }
+    return counts, created_ids + [row.pk for row in to_update]
+
+
+def insert_new(model, objs, key_fields, batch_size=500):
+    """只插入自然键在库中尚不存在的行，返回插入的行数（同一批中重复的键以第一行为准）
+
+    已有的键先按批查询排除，重复导入同一文件时返回 0；插入仍忽略唯一约束冲突，
+    与另一个导入进程并发写入同一批数据时不会失败。
+    """
+    def natural_key(obj):
+        return tuple(getattr(obj, field) for field in key_fields)
+
+    incoming = {}
+    for obj in objs:
+        incoming.setdefault(natural_key(obj), obj)
+
+    existing = set()
+    first_values = list({key[0] for key in incoming})
+    other_filters = {
+        f"{field}__in": list({key[i] for key in incoming}) for i, field in enumerate(key_fields) if i > 0
+    }
+    for start in range(0, len(first_values), batch_size):
+        existing.update(model.objects.filter(
+            **{f"{key_fields[0]}__in": first_values[start:start + batch_size]}, **other_filters
+        ).values_list(*key_fields))
+
+    to_create = [obj for key, obj in incoming.items() if key not in existing]
+    if to_create:
+        model.objects.bulk_create(to_create, batch_size=batch_size, ignore_conflicts=True)
+    return len(to_create)
+
+
+class CsvImportCommand(BaseCommand):
+    """CSV 导入命令基类：子类提供 model、default_file 和 parse_row，按需覆盖 write_batch / after_import"""
+
+    model = None
+    default_file = None
+    label = "rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file",
+            type=str,
+            default=self.default_file,
+            help=f"Path to the CSV file (default: {self.default_file})"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Rows committed per transaction (default: {DEFAULT_BATCH_SIZE})"
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue from the checkpoint left by an interrupted import of the same file"
+        )
+        parser.add_argument(
+            "--rejects",
+            type=str,
+            help="CSV file collecting rejected rows with the reason (default: <file>.rejected.csv)"
+        )
+
+    def parse_row(self, row):
+        raise NotImplementedError
+
+    def get_row_parser(self, options):
+        """返回逐行解析函数；支持 --workers 的子类需返回可 pickle 的函数"""
+        return self.parse_row
+
+    def get_files(self, options):
+        """要导入的文件列表"""
+        if not os.path.exists(options["file"]):
+            raise CommandError(f"{options['file']} not found")
+        return [options["file"]]
+
+    def write_batch(self, objs):
+        self.model.objects.bulk_create(objs, batch_size=500)
+        return len(objs)
+
+    def after_import(self, stats):
+        """导入完成后的处理（如使缓存失效）"""
+
+    def handle(self, *args, **options):
+        files = self.get_files(options)
+        parse_row = self.get_row_parser(options)
+        total = ImportStats()
+        for file_path in files:
+            self.stdout.write(self.style.NOTICE(f"Importing from {file_path}..."))
+            stats = stream_import(
+                file_path,
+                parse_row,
+                self.write_batch,
+                batch_size=options["batch_size"],
+                resume=options["resume"],
+                rejects_path=options["rejects"],
+                workers=options.get("workers", 1),
+                log=lambda line: self.stdout.write(f"  {line}"),
+            )
+            for field in ('rows', 'written', 'skipped', 'rejected', 'batches', 'seconds', 'resumed_from'):
+                setattr(total, field, getattr(total, field) + getattr(stats, field))
+            if stats.rejected:
+                self.stdout.write(self.style.WARNING(
+                    f"⚠️ Rejected {stats.rejected} rows, see {options['rejects'] or file_path + '.rejected.csv'}"
+                ))
+
+        if total.written or total.resumed_from:
+            self.after_import(total)
+
+        self.stdout.write(self.style.SUCCESS(self.summary(total)))
+
+    def summary(self, stats):
+        skipped = f", skipped {stats.skipped} existing rows" if stats.skipped else ""
+        return f"✅ Imported {stats.written} {self.label} in {stats.seconds:.2f}s{skipped}"
+
+
+class UpsertImportCommand(CsvImportCommand):
+    """按自然键（natural_key 字段）插入或更新的导入命令，重复导入同一文件不会产生重复数据"""
+
+    natural_key = ()
+
+    def handle(self, *args, **options):
+        self.counts = dict.fromkeys(('inserted', 'updated', 'unchanged', 'duplicates'), 0)
+        # 本次运行新增或更新的行（--resume 时不含中断前已写入的批次）
+        self.changed_ids = []
+        super().handle(*args, **options)
+
+    def write_batch(self, objs):
+        counts, changed_ids = upsert(self.model, objs, self.natural_key)
+        for name, count in counts.items():
+            self.counts[name] += count
+        self.changed_ids.extend(changed_ids)
+        # 只有新增或更新的行算作写入，全部未变化时不触发 after_import 的缓存失效
+        return counts['inserted'] + counts['updated']
+
+    def summary(self, stats):
+        counts = self.counts
+        duplicates = f", {counts['duplicates']} duplicate rows in the file" if counts['duplicates'] else ""
+        return (
+            f"✅ {self.label.capitalize()}: {counts['inserted']} inserted, {counts['updated']} updated, "
+            f"{counts['unchanged']} unchanged{duplicates} in {stats.seconds:.2f}s"
+        )
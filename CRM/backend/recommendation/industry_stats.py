@@ -0,0 +1,197 @@
+"""行业统计
+
+按交易日把全部股票的日线（StockDailyData）按 StockInfo.industry 分组，向量化计算
+行业区间涨幅、行业等权指数的日收益率波动率与日均成交额，写入 IndustryDailyStat。
+股票推荐读取最新交易日的行业统计为股票打分，不含随机因素，相同输入得到相同结果。
+"""
+import threading
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Subquery
+
+from .catalog import catalog_index
+from .market_data import _nanmean, _nanstd, get_market_version, get_price_store
+from .models import IndustryDailyStat
+from .routers import read_from_primary
+
+STATS_WINDOW = 20
+# 各风险等级对行业波动率的惩罚系数
+VOLATILITY_PENALTY = {'low': 2.0, 'medium': 1.0, 'high': 0.25}
+LIQUIDITY_WEIGHT = 0.3
+
+
+class IndustryStats:
+    """某交易日的行业统计，按行业名称升序排列"""
+
+    def __init__(self, trade_date, industries, stock_count, return_rate, volatility, liquidity, version=None):
+        self.version = version
+        self.trade_date = trade_date
+        self.industries = np.asarray(industries, dtype=str)
+        self.stock_count = np.asarray(stock_count, dtype=np.int64)
+        self.return_rate = np.asarray(return_rate, dtype=np.float64)
+        self.volatility = np.asarray(volatility, dtype=np.float64)
+        self.liquidity = np.asarray(liquidity, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.industries)
+
+    @classmethod
+    def empty(cls, version=None):
+        return cls(None, [], [], [], [], [], version)
+
+    @classmethod
+    def from_rows(cls, rows, version=None):
+        rows = sorted(rows, key=lambda row: row.industry)
+        if not rows:
+            return cls.empty(version)
+        return cls(
+            rows[0].trade_date,
+            [row.industry for row in rows],
+            [row.stock_count for row in rows],
+            [row.return_rate for row in rows],
+            [row.volatility for row in rows],
+            [row.liquidity for row in rows],
+            version,
+        )
+
+    def quality(self, risk_tolerance):
+        """各行业的质量分 [0, 1]：风险调整后涨幅与流动性的百分位排名加权"""
+        if not len(self):
+            return np.empty(0)
+        penalty = VOLATILITY_PENALTY.get(risk_tolerance, VOLATILITY_PENALTY['medium'])
+        risk_adjusted = np.nan_to_num(self.return_rate) - penalty * np.nan_to_num(self.volatility) * np.sqrt(STATS_WINDOW)
+        return (
+            (1 - LIQUIDITY_WEIGHT) * _percentile_rank(risk_adjusted)
+            + LIQUIDITY_WEIGHT * _percentile_rank(np.nan_to_num(self.liquidity))
+        )
+
+    def lookup(self, industries, values, default=0.0):
+        """把按行业排列的 values 映射到给定行业数组上，未知行业取 default"""
+        industries = np.asarray(industries, dtype=str)
+        if not len(self):
+            return np.full(len(industries), default)
+        pos = np.clip(np.searchsorted(self.industries, industries), 0, len(self) - 1)
+        return np.where(self.industries[pos] == industries, values[pos], default)
+
+
+def _percentile_rank(values):
+    """0~1 的百分位排名，并列取相同排名"""
+    if len(values) < 2:
+        return np.ones(len(values))
+    ranks = np.searchsorted(np.sort(values), values, side='left')
+    return ranks / (len(values) - 1)
+
+
+def compute_industry_stats(store, stocks, window=STATS_WINDOW):
+    """在列式行情存储上计算最新交易日的行业统计"""
+    if not len(store.dates):
+        return IndustryStats.empty()
+
+    industries = np.array([(stocks.get(code) or {}).get('industry') or '' for code in store.codes.tolist()], dtype=str)
+    members = np.flatnonzero(industries != '')
+    names, groups = np.unique(industries[members], return_inverse=True)
+    n_groups = len(names)
+    if not n_groups:
+        return IndustryStats.empty()
+
+    momentum = store.momentum(window)[members]
+    close = store._window(window + 1)[members]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = close[:, 1:] / close[:, :-1] - 1.0
+    with np.errstate(invalid='ignore'):
+        amount = _nanmean(store.arrays['amount'][members, -min(window, len(store.dates)):])
+
+    # 行业等权指数日收益率：同一行业、同一交易日有效收益率的平均
+    finite = np.isfinite(returns)
+    sums = np.zeros((n_groups, returns.shape[1]))
+    counts = np.zeros((n_groups, returns.shape[1]))
+    np.add.at(sums, groups, np.where(finite, returns, 0.0))
+    np.add.at(counts, groups, finite)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        index_returns = np.where(counts > 0, sums / counts, np.nan)
+
+    def group_mean(values):
+        valid = np.isfinite(values)
+        totals = np.bincount(groups[valid], weights=values[valid], minlength=n_groups)
+        sizes = np.bincount(groups[valid], minlength=n_groups)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(sizes > 0, totals / sizes, np.nan)
+
+    has_quote = np.isfinite(store.latest('close')[members])
+    return IndustryStats(
+        store.last_date.item(),
+        names,
+        np.bincount(groups[has_quote], minlength=n_groups),
+        group_mean(momentum),
+        _nanstd(index_returns),
+        group_mean(amount),
+    )
+
+
+def build_industry_stats(window=STATS_WINDOW):
+    """计算最新交易日的行业统计并写入 IndustryDailyStat（覆盖同一交易日的旧结果），返回 IndustryStats"""
+    stats = compute_industry_stats(get_price_store(), catalog_index.stocks(), window)
+    if not len(stats):
+        return stats
+
+    rows = [
+        IndustryDailyStat(
+            trade_date=stats.trade_date,
+            industry=industry,
+            stock_count=int(count),
+            return_rate=float(np.nan_to_num(return_rate)),
+            volatility=float(np.nan_to_num(volatility)),
+            liquidity=float(np.nan_to_num(liquidity)),
+        )
+        for industry, count, return_rate, volatility, liquidity in zip(
+            stats.industries.tolist(), stats.stock_count, stats.return_rate, stats.volatility, stats.liquidity
+        )
+    ]
+    with transaction.atomic():
+        IndustryDailyStat.objects.filter(trade_date=stats.trade_date).delete()
+        IndustryDailyStat.objects.bulk_create(rows, batch_size=500)
+    industry_stats_holder.invalidate()
+    return stats
+
+
+class IndustryStatsHolder:
+    """进程级行业统计，行情版本变化时重新读取最新交易日的统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = None
+
+    def get(self):
+        version = get_market_version()
+        stats = self._stats
+        if stats is None or stats.version != version:
+            with self._lock:
+                stats = self._stats
+                if stats is None or stats.version != version:
+                    with read_from_primary():
+                        stats = self._load(version)
+                    self._stats = stats
+        return stats
+
+    def _load(self, version):
+        latest_date = IndustryDailyStat.objects.order_by('-trade_date').values('trade_date')[:1]
+        rows = list(IndustryDailyStat.objects.filter(trade_date=Subquery(latest_date)))
+        if rows:
+            return IndustryStats.from_rows(rows, version)
+        # 统计表尚未生成时，在内存中由行情存储计算（不写库）
+        stats = compute_industry_stats(get_price_store(), catalog_index.stocks())
+        stats.version = version
+        return stats
+
+    def invalidate(self):
+        with self._lock:
+            self._stats = None
+
+
+industry_stats_holder = IndustryStatsHolder()
+
+
+def get_industry_stats():
+    """返回最新交易日的行业统计"""
+    return industry_stats_holder.get()
@@ -0,0 +1,191 @@
+"""HTTP 压力测试
+
+对本地启动的服务（runserver / gunicorn 等）发起并发请求：先通过 /api/auth/token/ 为每个
+测试账号登录，再由线程池按权重混合访问推荐、购买、列表与MPT接口，统计各接口的吞吐量、
+错误数与 p50/p95/p99 延迟。只依赖标准库，不需要外部服务。
+"""
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# 名称: (方法, 路径)；写接口的请求体由 build_payload 随机构造
+ENDPOINTS = {
+    'fund_recommendations': ('GET', '/api/funds/recommendations/'),
+    'insurance_recommendations': ('GET', '/api/insurance/recommendations/'),
+    'stock_recommendations': ('GET', '/api/stocks/recommendations/'),
+    # 异步接口需以 ASGI 方式部署（uvicorn financial_recommendation.asgi:application）
+    'async_fund_recommendations': ('GET', '/api/recommendations/async/funds/'),
+    'async_insurance_recommendations': ('GET', '/api/recommendations/async/insurance/'),
+    'async_stock_recommendations': ('GET', '/api/recommendations/async/stocks/'),
+    'mpt_suggestions': ('GET', '/api/mpt-suggestions/'),
+    'fund_list': ('GET', '/api/funds/'),
+    'stock_list': ('GET', '/api/stocks/'),
+    'purchase_records': ('GET', '/api/purchase/records/'),
+    'purchase_fund': ('POST', '/api/purchase/'),
+    'trade_stock': ('POST', '/api/purchase/stock/'),
+}
+DEFAULT_MIX = {
+    'fund_recommendations': 3,
+    'insurance_recommendations': 2,
+    'stock_recommendations': 2,
+    'mpt_suggestions': 1,
+    'fund_list': 2,
+    'stock_list': 1,
+    'purchase_records': 1,
+    'purchase_fund': 1,
+    'trade_stock': 1,
+}
+
+
+def parse_mix(text):
+    """解析 "fund_recommendations=3,mpt_suggestions=1" 形式的请求权重"""
+    mix = {}
+    for part in filter(None, (item.strip() for item in text.split(','))):
+        name, _, weight = part.partition('=')
+        if name not in ENDPOINTS:
+            raise ValueError(f"unknown endpoint {name!r}; choose from {', '.join(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("request mix is empty")
+    return mix
+
+
+class LoadTestClient:
+    """单个测试账号的HTTP客户端"""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.token = None
+
+    def request(self, method, path, payload=None):
+        """发送请求，返回 (状态码, 响应体)"""
+        data = json.dumps(payload).encode() if payload is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        req.add_header('Content-Type', 'application/json')
+        if self.token:
+            req.add_header('Authorization', f"Bearer {self.token}")
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def login(self, username, password):
+        status, body = self.request('POST', '/api/auth/token/', {'username': username, 'password': password})
+        if status != 200:
+            raise RuntimeError(f"login failed for {username}: HTTP {status}")
+        self.token = json.loads(body)['access']
+
+
+def build_payload(name, rng, fund_ids, stock_ids):
+    """为写接口构造请求体"""
+    if name == 'purchase_fund':
+        return {'product_type': 'fund', 'product_id': rng.choice(fund_ids), 'amount': round(rng.uniform(100, 10000), 2)}
+    if name == 'trade_stock':
+        return {'policyholder_name': 'load-test', 'quantity': 100, 'direction': 'buy', 'stock_id': rng.choice(stock_ids)}
+    return None
+
+
+def run_load(base_url, accounts, mix, concurrency=8, requests=None, duration=None, fund_ids=(), stock_ids=(),
+             seed=0, timeout=30, log=None):
+    """按请求权重并发压测，返回 (结果汇总, 墙钟耗时秒)
+
+    accounts: [(用户名, 密码), ...]，每个并发线程轮流使用其中一个账号。
+    requests 与 duration 至少指定一个，先达到者结束。
+    """
+    if not fund_ids and 'purchase_fund' in mix:
+        raise ValueError("purchase_fund needs fund ids")
+    if not stock_ids and 'trade_stock' in mix:
+        raise ValueError("trade_stock needs stock ids")
+
+    clients = []
+    for i in range(concurrency):
+        client = LoadTestClient(base_url, timeout)
+        client.login(*accounts[i % len(accounts)])
+        clients.append(client)
+    if log:
+        log(f"logged in {len(clients)} clients")
+
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    budget_lock = threading.Lock()
+    budget = {'remaining': requests}
+    samples = defaultdict(list)  # 名称 -> [(耗时秒, 状态码), ...]
+    samples_lock = threading.Lock()
+    deadline = time.perf_counter() + duration if duration else None
+
+    def take():
+        if deadline is not None and time.perf_counter() >= deadline:
+            return False
+        if budget['remaining'] is None:
+            return True
+        with budget_lock:
+            if budget['remaining'] <= 0:
+                return False
+            budget['remaining'] -= 1
+            return True
+
+    def worker(index):
+        client = clients[index]
+        rng = random.Random(seed * 1000003 + index)
+        local = defaultdict(list)
+        while take():
+            name = rng.choices(names, weights)[0]
+            method, path = ENDPOINTS[name]
+            payload = build_payload(name, rng, fund_ids, stock_ids)
+            started = time.perf_counter()
+            try:
+                status, _ = client.request(method, path, payload)
+            except OSError:
+                status = 0  # 连接失败或超时
+            local[name].append((time.perf_counter() - started, status))
+        with samples_lock:
+            for name, values in local.items():
+                samples[name].extend(values)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return summarize(samples, elapsed), elapsed
+
+
+def _percentiles(seconds):
+    ms = np.asarray(seconds) * 1000
+    return {
+        'mean_ms': round(float(ms.mean()), 2),
+        'p50_ms': round(float(np.percentile(ms, 50)), 2),
+        'p95_ms': round(float(np.percentile(ms, 95)), 2),
+        'p99_ms': round(float(np.percentile(ms, 99)), 2),
+        'max_ms': round(float(ms.max()), 2),
+    }
+
+
+def summarize(samples, elapsed):
+    """按接口汇总请求数、错误数、吞吐量与延迟分位数"""
+    endpoints = {}
+    all_seconds, all_errors = [], 0
+    for name, values in sorted(samples.items()):
+        seconds = [value[0] for value in values]
+        errors = sum(1 for _, status in values if not 200 <= status < 300)
+        all_seconds.extend(seconds)
+        all_errors += errors
+        endpoints[name] = dict(
+            requests=len(values),
+            errors=errors,
+            throughput_rps=round(len(values) / elapsed, 2) if elapsed else 0.0,
+            **_percentiles(seconds),
+        )
+    total = {'requests': len(all_seconds), 'errors': all_errors,
+             'throughput_rps': round(len(all_seconds) / elapsed, 2) if elapsed else 0.0}
+    if all_seconds:
+        total.update(_percentiles(all_seconds))
+    return {'total': total, 'endpoints': endpoints}
@@ -0,0 +1,170 @@
+import dataclasses
+import json
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from recommendation.benchmark import build_report, compare_reports, run_engine_benchmarks, run_offline_builds
+from recommendation.routers import read_from_primary
+from recommendation.synthetic_data import SCALES, populate
+
+
+def benchmark_caches():
+    """基准测试期间把每个缓存别名换成进程内缓存，避免与正在运行的服务共享版本号和推荐结果
+    （DummyCache 别名保持不变，RECOMMENDATION_CACHE=off 时仍不缓存）"""
+    return {
+        alias: config if config['BACKEND'].endswith('.DummyCache') else {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'benchmark-{alias}',
+        }
+        for alias, config in settings.CACHES.items()
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmark the recommendation engine and endpoints on synthetic data in an isolated SQLite database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            choices=sorted(SCALES),
+            default="small",
+            help="Synthetic data preset (default: small)"
+        )
+        for field in dataclasses.fields(SCALES["small"]):
+            parser.add_argument(
+                f"--{field.name.replace('_', '-')}",
+                type=int,
+                help=f"Override the preset's {field.name.replace('_', ' ')} count"
+            )
+        parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Processes generating synthetic rows (default: CPU count)"
+        )
+        parser.add_argument(
+            "--sample-users",
+            type=int,
+            default=50,
+            help="Users each method/endpoint is timed for (default: 50)"
+        )
+        parser.add_argument("--repeat", type=int, default=3, help="Warm passes over the sample users (default: 3)")
+        parser.add_argument(
+            "--db",
+            type=str,
+            help="SQLite file for the benchmark database (default: var/benchmark/<scale>-<seed>.sqlite3)"
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the benchmark database and reuse it when scale and seed match"
+        )
+        parser.add_argument("--skip-offline", action="store_true", help="Do not run offline model builds")
+        parser.add_argument("--output", type=str, help="Report path (default: var/benchmark/report-<revision>.json)")
+        parser.add_argument("--compare", type=str, help="Baseline report to compare against")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=1.2,
+            help="Slowdown ratio reported as a regression (default: 1.2)"
+        )
+        parser.add_argument(
+            "--fail-on-regression",
+            action="store_true",
+            help="Exit with an error when the comparison finds regressions"
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("The benchmark runs against an isolated SQLite database; configure SQLite settings")
+
+        scale = dataclasses.replace(SCALES[options["scale"]], **{
+            field.name: options[field.name] for field in dataclasses.fields(SCALES["small"])
+            if options[field.name] is not None
+        })
+        bench_dir = settings.BASE_DIR / "var" / "benchmark"
+        db_path = options["db"] or str(bench_dir / f"{options['scale']}-{options['seed']}.sqlite3")
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        marker_path = f"{db_path}.json"
+        marker = {"scale": dataclasses.asdict(scale), "seed": options["seed"]}
+        reuse = options["keepdb"] and os.path.exists(db_path) and _read_json(marker_path) == marker
+
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = db_path
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=reuse, serialize=False)
+        try:
+            # 基准库只替换了主库连接，读取不能路由到已配置的只读副本
+            with override_settings(CACHES=benchmark_caches(), RECOMMENDATION_MODEL_DIR=f"{db_path}.models"), \
+                    read_from_primary():
+                report = self._run(scale, options, reuse, marker_path, marker)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+
+        output = options["output"] or str(bench_dir / f"report-{report['meta']['revision'] or 'unknown'}.json")
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"✅ Report written to {output}"))
+
+        if options["compare"]:
+            self._compare(report, options)
+
+    def _run(self, scale, options, reuse, marker_path, marker):
+        if reuse:
+            self.stdout.write(self.style.NOTICE("Reusing existing benchmark database"))
+            counts, generation_seconds = _read_json(marker_path + ".rows") or {}, None
+        else:
+            self.stdout.write(self.style.NOTICE(f"Generating synthetic data: {dataclasses.asdict(scale)}"))
+            started = time.perf_counter()
+            counts = populate(scale, seed=options["seed"], workers=options["workers"],
+                              log=lambda line: self.stdout.write(f"  {line}"))
+            generation_seconds = round(time.perf_counter() - started, 3)
+            _write_json(marker_path, marker)
+            _write_json(marker_path + ".rows", counts)
+
+        offline = {}
+        if not options["skip_offline"]:
+            self.stdout.write(self.style.NOTICE("Running offline builds..."))
+            offline = run_offline_builds()
+
+        self.stdout.write(self.style.NOTICE("Timing engine methods and endpoints..."))
+        methods, endpoints = run_engine_benchmarks(options["sample_users"], options["repeat"], options["seed"])
+        for section, results in (("method", methods), ("endpoint", endpoints)):
+            for name, result in results.items():
+                self.stdout.write(
+                    f"  {section} {name}: cold {result['cold_ms']:.1f}ms / {result['cold_queries']} queries / "
+                    f"{result['cold_peak_kb']:.0f}KB, warm p50 {result['warm']['p50_ms']:.2f}ms "
+                    f"p95 {result['warm']['p95_ms']:.2f}ms"
+                )
+        return build_report(dataclasses.asdict(scale), options["seed"], counts, generation_seconds,
+                            offline, methods, endpoints)
+
+    def _compare(self, report, options):
+        baseline = _read_json(options["compare"])
+        if baseline is None:
+            raise CommandError(f"Baseline report {options['compare']} not found")
+        regressions = 0
+        for name, metric, before, now, ratio, regressed in compare_reports(report, baseline, options["threshold"]):
+            line = f"{name} {metric}: {before} -> {now} (x{ratio})"
+            if regressed:
+                regressions += 1
+                self.stdout.write(self.style.WARNING(f"⚠️ {line}"))
+            else:
+                self.stdout.write(f"  {line}")
+        if regressions and options["fail_on_regression"]:
+            raise CommandError(f"{regressions} regression(s) against {options['compare']}")
+        self.stdout.write(self.style.SUCCESS(f"✅ Compared with {options['compare']}: {regressions} regression(s)"))
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
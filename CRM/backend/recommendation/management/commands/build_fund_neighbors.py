@@ -0,0 +1,50 @@
+import os
+import time
+from django.core.management.base import BaseCommand
+from recommendation.fund_neighbors import DEFAULT_NEIGHBORS, build_fund_neighbors
+
+
+class Command(BaseCommand):
+    help = "Build the top-K similar fund table used by fund recommendations"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--neighbors",
+            type=int,
+            default=DEFAULT_NEIGHBORS,
+            help=f"Number of similar funds kept per fund (default: {DEFAULT_NEIGHBORS})"
+        )
+        parser.add_argument(
+            "--fund-ids",
+            type=int,
+            nargs="+",
+            help="Only recompute rows affected by these changed funds (incremental mode)"
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=256,
+            help="Rows per similarity block (default: 256)"
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Parallel workers for block computation (default: CPU count)"
+        )
+
+    def handle(self, *args, **options):
+        mode = "incremental" if options["fund_ids"] else "full"
+        self.stdout.write(self.style.NOTICE(f"Building fund neighbors ({mode})..."))
+
+        started = time.perf_counter()
+        rows, written = build_fund_neighbors(
+            k=options["neighbors"],
+            changed_fund_ids=options["fund_ids"],
+            chunk_size=options["chunk_size"],
+            workers=options["workers"],
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Recomputed {rows} funds, wrote {written} neighbor rows in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from recommendation.industry_stats import STATS_WINDOW, build_industry_stats
+
+
+class Command(BaseCommand):
+    help = "Precompute industry return/volatility/liquidity statistics for the latest trading day"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--window",
+            type=int,
+            default=STATS_WINDOW,
+            help=f"Trading days covered by the statistics (default: {STATS_WINDOW})"
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stats = build_industry_stats(window=options["window"])
+        elapsed = time.perf_counter() - started
+
+        if not len(stats):
+            self.stdout.write(self.style.WARNING("⚠️ No stock daily data, nothing to compute"))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Stored statistics for {len(stats)} industries on {stats.trade_date} in {elapsed:.2f}s"
+        ))
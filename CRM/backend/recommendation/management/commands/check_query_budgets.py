@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recommendation.catalog import catalog_index
+from recommendation.industry_stats import industry_stats_holder
+from recommendation.market_data import price_store_holder, quote_index_holder
+from recommendation.models import User
+from recommendation.query_checks import QUERY_BUDGETS
+from recommendation.recommendation_algorithms import RecommendationEngine
+from recommendation.segment_cache import segment_cache
+
+
+class Command(BaseCommand):
+    help = "Fail if recommendation engine methods exceed their SQL query budgets"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--username",
+            type=str,
+            help="Profile used for the checks (default: an unsaved medium-risk profile)"
+        )
+
+    def handle(self, *args, **options):
+        if options["username"]:
+            try:
+                user_profile = User.objects.get(username=options["username"])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['username']} does not exist")
+        else:
+            user_profile = User(username="query-budget", age=30, risk_tolerance="medium", total_assets=100000)
+
+        engine = RecommendationEngine()
+        failures = []
+        for method, budgets in QUERY_BUDGETS.items():
+            # 清空本进程缓存，测量冷启动；再次调用测量缓存命中
+            catalog_index.clear()
+            price_store_holder.invalidate()
+            quote_index_holder.invalidate()
+            industry_stats_holder.invalidate()
+            segment_cache.clear()
+            for phase in ('cold', 'warm'):
+                with CaptureQueriesContext(connection) as ctx:
+                    getattr(engine, method)(user_profile)
+                used, budget = len(ctx.captured_queries), budgets[phase]
+                line = f"{method} ({phase}): {used} queries, budget {budget}"
+                if used > budget:
+                    failures.append(line)
+                    self.stdout.write(self.style.ERROR(f"❌ {line}"))
+                    for query in ctx.captured_queries:
+                        self.stdout.write(f"    {query['sql'][:200]}")
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"✅ {line}"))
+
+        if failures:
+            raise CommandError(f"{len(failures)} query budget(s) exceeded")
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from recommendation.query_checks import hot_queries, plan_problems
+
+
+class Command(BaseCommand):
+    help = "Fail if a hot query's SQLite EXPLAIN QUERY PLAN shows a full table scan or a sort not served by an index"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verbose-plans",
+            action="store_true",
+            help="Print the full plan of every query, not only failing ones"
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(f"Query plan checks parse SQLite EXPLAIN QUERY PLAN output (database is {connection.vendor})")
+
+        failures = []
+        for name, (queryset, allowed) in hot_queries().items():
+            plan = queryset.explain()
+            problems = plan_problems(plan, allowed)
+            if problems:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"❌ {name}: {'; '.join(problems)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"✅ {name}"))
+            if problems or options["verbose_plans"]:
+                for line in plan.splitlines():
+                    self.stdout.write(f"    {line}")
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot query plan(s) regressed")
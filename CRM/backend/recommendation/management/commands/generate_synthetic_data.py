@@ -0,0 +1,79 @@
+import dataclasses
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from recommendation.models import User
+from recommendation.synthetic_data import (
+    CHUNK_SIZE, SCALES, SYNTHETIC_USER_PREFIX, clear_synthetic_data, populate,
+)
+
+
+class Command(BaseCommand):
+    help = "Generate reproducible synthetic funds, insurance, stocks, daily data, users and purchases"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            choices=sorted(SCALES),
+            default="small",
+            help="Size preset (default: small)"
+        )
+        for field in dataclasses.fields(SCALES["small"]):
+            parser.add_argument(
+                f"--{field.name.replace('_', '-')}",
+                type=int,
+                help=f"Override the preset's {field.name.replace('_', ' ')} count"
+            )
+        parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Processes generating rows in parallel (default: CPU count)"
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help=f"Rows generated per task (default: {CHUNK_SIZE})"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows per bulk_create INSERT (default: 1000)"
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete previously generated synthetic data first"
+        )
+
+    def handle(self, *args, **options):
+        scale = dataclasses.replace(SCALES[options["scale"]], **{
+            field.name: options[field.name] for field in dataclasses.fields(SCALES["small"])
+            if options[field.name] is not None
+        })
+
+        if options["clear"]:
+            deleted = clear_synthetic_data()
+            self.stdout.write(self.style.WARNING(f"🗑️ Deleted synthetic data: {deleted}"))
+        elif User.objects.filter(username__startswith=SYNTHETIC_USER_PREFIX).exists():
+            raise CommandError("Synthetic data already exists; rerun with --clear to replace it")
+
+        self.stdout.write(self.style.NOTICE(
+            f"Generating {dataclasses.asdict(scale)} with seed {options['seed']} on {options['workers']} workers..."
+        ))
+        started = time.perf_counter()
+        counts = populate(
+            scale,
+            seed=options["seed"],
+            chunk_size=options["chunk_size"],
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            log=lambda line: self.stdout.write(f"  {line}"),
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Generated {sum(counts.values())} rows in {elapsed:.2f}s"
+        ))
@@ -1,39 +1,35 @@
-import csv
-from django.core.management.base import BaseCommand
-from recommendation.models import Fund   
+from recommendation.catalog import invalidate_catalog
+from recommendation.fund_neighbors import build_fund_neighbors
+from recommendation.importing import UpsertImportCommand, parse_number
+from recommendation.models import Fund
 
-class Command(BaseCommand):
+
+class Command(UpsertImportCommand):
     help = "Import Fund data from Fund.csv into the database"
+    model = Fund
+    default_file = "Fund.csv"
+    natural_key = ("code",)
+    label = "funds"
 
-    def add_arguments(self, parser):
-        parser.add_argument(
-            "--file",
-            type=str,
-            default="Fund.csv",
-            help="Path to the CSV file (default: Fund.csv)"
+    def parse_row(self, row):
+        return Fund(
+            code=row["代码"],
+            name=row["简称"],
+            managers=row["基金经理"],
+            company=row["基金公司"],
+            star_count=parse_number(row["5星评级家数"], int, required=False),
+            rating_shanghai=parse_number(row["上海证券"], int, required=False),
+            rating_zhaoshang=parse_number(row["招商证券"], int, required=False),
+            rating_jianxin=parse_number(row["济安金信"], int, required=False),
+            rating_morningstar=parse_number(row["晨星评级"], int, required=False),
+            fee=parse_number(row["手续费"], required=False),
+            fund_type=row["类型"],
         )
 
-    def handle(self, *args, **options):
-        file_path = options["file"]
-        self.stdout.write(self.style.NOTICE(f"Importing from {file_path}..."))
-
-        objs = []
-        with open(file_path, "r", encoding="utf-8-sig") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                objs.append(Fund(
-                    code=row["代码"],
-                    name=row["简称"],
-                    managers=row["基金经理"],
-                    company=row["基金公司"],
-                    star_count=row["5星评级家数"] or None,
-                    rating_shanghai=row["上海证券"] or None,
-                    rating_zhaoshang=row["招商证券"] or None,
-                    rating_jianxin=row["济安金信"] or None,
-                    rating_morningstar=row["晨星评级"] or None,
-                    fee=row["手续费"] or None,
-                    fund_type=row["类型"],
-                ))
-
-        Fund.objects.bulk_create(objs, batch_size=500)
-        self.stdout.write(self.style.SUCCESS(f"✅ Imported {len(objs)} funds successfully!"))
+    def after_import(self, stats):
+        # bulk_create / bulk_update 不触发 post_save，需手动使目录索引失效
+        invalidate_catalog()
+        # 重算新增或更新基金涉及的近邻行；续导时中断前写入的基金未知，全量重建
+        changed_fund_ids = None if stats.resumed_from else self.changed_ids
+        rows, written = build_fund_neighbors(changed_fund_ids=changed_fund_ids)
+        self.stdout.write(f"  Recomputed neighbors of {rows} funds ({written} rows)")
@@ -1,53 +1,115 @@
-import csv
+import os
 from datetime import datetime
-from django.core.management.base import BaseCommand
+from functools import partial
+from django.core.management.base import CommandError
+from django.db.models import Max
+from recommendation.importing import CsvImportCommand, RowRejected, insert_new, parse_number
+from recommendation.industry_stats import build_industry_stats
+from recommendation.market_data import bump_market_version, export_market_snapshot
 from recommendation.models import StockDailyData
 
 
-class Command(BaseCommand):
+def parse_daily_row(row, latest_dates=None):
+    """解析一行日线数据；不晚于 latest_dates 中该股票最新交易日（YYYYMMDD 字符串）的行返回 None 跳过"""
+    if latest_dates:
+        # 同为 YYYYMMDD 格式时字符串顺序即日期顺序，已有的行无需解析日期
+        latest = latest_dates.get(row["ts_code"])
+        if latest is not None and row["trade_date"] <= latest:
+            return None
+
+    try:
+        trade_date = datetime.strptime(row["trade_date"], "%Y%m%d").date()
+    except ValueError:
+        raise RowRejected(f"invalid date format: {row['trade_date']}")
+
+    return StockDailyData(
+        ts_code=row["ts_code"],
+        trade_date=trade_date,
+        open=parse_number(row["open"]),
+        high=parse_number(row["high"]),
+        low=parse_number(row["low"]),
+        close=parse_number(row["close"]),
+        pre_close=parse_number(row["pre_close"]),
+        change=parse_number(row["change"]),
+        pct_chg=parse_number(row["pct_chg"]),
+        vol=parse_number(row["vol"]),
+        amount=parse_number(row["amount"]),
+    )
+
+
+def day_file_date(file_path):
+    """按交易日命名的文件（如 20251031.csv）对应的日期，其他文件名返回 None"""
+    try:
+        return datetime.strptime(os.path.splitext(os.path.basename(file_path))[0], "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+class Command(CsvImportCommand):
     help = "Import stock daily data from CSV into StockDailyData model"
+    model = StockDailyData
+    default_file = "stock_daily_data.csv"
+    label = "stock daily records"
 
     def add_arguments(self, parser):
+        super().add_arguments(parser)
         parser.add_argument(
-            "--file",
+            "--dir",
             type=str,
-            default="stock_daily_data.csv",
-            help="Path to the CSV file (default: stock_daily_data.csv)"
+            help="Import every *.csv in this directory in name order (e.g. one file per trade date) instead of --file"
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only ingest trade dates after each stock's latest stored trade date"
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes parsing batches while this process writes (default: 1)"
         )
 
-    def handle(self, *args, **options):
-        file_path = options["file"]
-        self.stdout.write(self.style.NOTICE(f"Importing from {file_path}..."))
-
-        objs = []
-        with open(file_path, "r", encoding="utf-8-sig") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                try:
-                    trade_date = datetime.strptime(row["trade_date"], "%Y%m%d").date()
-                except ValueError:
-                    self.stdout.write(self.style.ERROR(f"❌ Invalid date format: {row['trade_date']}"))
-                    continue
-
-                objs.append(StockDailyData(
-                    ts_code=row["ts_code"],
-                    trade_date=trade_date,
-                    open=float(row["open"]),
-                    high=float(row["high"]),
-                    low=float(row["low"]),
-                    close=float(row["close"]),
-                    pre_close=float(row["pre_close"]),
-                    change=float(row["change"]),
-                    pct_chg=float(row["pct_chg"]),
-                    vol=float(row["vol"]),
-                    amount=float(row["amount"]),
-                ))
-
-        # 批量插入，避免重复（unique_together）
-        StockDailyData.objects.bulk_create(
-            objs,
-            batch_size=500,
-            ignore_conflicts=True  # 遇到重复 (ts_code, trade_date) 时跳过
+    def latest_trade_dates(self):
+        """每只股票已入库的最新交易日 {ts_code: date}（一次分组查询）"""
+        return dict(
+            StockDailyData.objects.values('ts_code').annotate(latest=Max('trade_date')).values_list('ts_code', 'latest')
         )
 
-        self.stdout.write(self.style.SUCCESS(f"✅ Imported {len(objs)} stock daily records"))
+    def get_files(self, options):
+        self.latest_dates = self.latest_trade_dates() if options["incremental"] else {}
+        if not options["dir"]:
+            return super().get_files(options)
+        if options["rejects"]:
+            raise CommandError("--rejects cannot be combined with --dir; each file gets <file>.rejected.csv")
+        if not os.path.isdir(options["dir"]):
+            raise CommandError(f"{options['dir']} is not a directory")
+
+        files = sorted(
+            os.path.join(options["dir"], name) for name in os.listdir(options["dir"]) if name.endswith(".csv")
+        )
+        if self.latest_dates:
+            # 按日期命名的文件不晚于所有股票的最新交易日时，其中的行都已入库，无需读取
+            # （尚无任何日线的新股票请先做一次非增量导入）
+            oldest_latest = min(self.latest_dates.values())
+            kept = [path for path in files if not (day_file_date(path) and day_file_date(path) <= oldest_latest)]
+            if len(kept) < len(files):
+                self.stdout.write(f"  Skipping {len(files) - len(kept)} files up to {oldest_latest}")
+            files = kept
+        return files
+
+    def get_row_parser(self, options):
+        latest_dates = {code: latest.strftime("%Y%m%d") for code, latest in self.latest_dates.items()}
+        return partial(parse_daily_row, latest_dates=latest_dates)
+
+    def write_batch(self, objs):
+        # 只插入新的 (ts_code, trade_date)（unique_together，已有的交易日跳过），返回实际插入的行数
+        return insert_new(StockDailyData, objs, ("ts_code", "trade_date"))
+
+    def after_import(self, stats):
+        # 通知行情存储增量加载新交易日
+        bump_market_version()
+        # 导出列式快照，新启动的进程直接内存映射而无需经 ORM 读取全部日线
+        export_market_snapshot()
+        # 重新计算最新交易日的行业统计
+        build_industry_stats()
@@ -1,48 +1,34 @@
-import csv
 from datetime import datetime
-from django.core.management.base import BaseCommand
+from recommendation.catalog import invalidate_catalog
+from recommendation.importing import CsvImportCommand, RowRejected, insert_new
 from recommendation.models import StockInfo
 
 
-class Command(BaseCommand):
+class Command(CsvImportCommand):
     help = "Import stock info from CSV into StockInfo model"
-
-    def add_arguments(self, parser):
-        parser.add_argument(
-            "--file",
-            type=str,
-            default="stock_info.csv",
-            help="Path to the CSV file (default: stock_info.csv)"
+    model = StockInfo
+    default_file = "stock_info.csv"
+    label = "stock info records"
+
+    def parse_row(self, row):
+        try:
+            list_date = datetime.strptime(row["list_date"], "%Y%m%d").date()
+        except ValueError:
+            raise RowRejected(f"invalid date format: {row['list_date']}")
+
+        return StockInfo(
+            ts_code=row["ts_code"],
+            symbol=row["symbol"],
+            name=row["name"],
+            area=row["area"],
+            industry=row["industry"],
+            list_date=list_date,
         )
 
-    def handle(self, *args, **options):
-        file_path = options["file"]
-        self.stdout.write(self.style.NOTICE(f"Importing from {file_path}..."))
-
-        objs = []
-        with open(file_path, "r", encoding="utf-8-sig") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                try:
-                    list_date = datetime.strptime(row["list_date"], "%Y%m%d").date()
-                except ValueError:
-                    self.stdout.write(self.style.ERROR(f"❌ Invalid date format: {row['list_date']}"))
-                    continue
-
-                objs.append(StockInfo(
-                    ts_code=row["ts_code"],
-                    symbol=row["symbol"],
-                    name=row["name"],
-                    area=row["area"],
-                    industry=row["industry"],
-                    list_date=list_date,
-                ))
-
-        # 批量插入，避免重复 (unique=True on ts_code)
-        StockInfo.objects.bulk_create(
-            objs,
-            batch_size=500,
-            ignore_conflicts=True  # 遇到重复 ts_code 时跳过
-        )
+    def write_batch(self, objs):
+        # 只插入新的 ts_code（已有股票跳过），返回实际插入的行数
+        return insert_new(StockInfo, objs, ("ts_code",))
 
-        self.stdout.write(self.style.SUCCESS(f"✅ Imported {len(objs)} stock info records"))
+    def after_import(self, stats):
+        # bulk_create 不触发 post_save，需手动使目录索引失效
+        invalidate_catalog()
@@ -0,0 +1,125 @@
+import json
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from recommendation.load_test import DEFAULT_MIX, ENDPOINTS, parse_mix, run_load
+from recommendation.models import Fund, StockInfo, User
+
+LOAD_TEST_USER_PREFIX = 'loadtest_'
+
+
+class Command(BaseCommand):
+    help = "Drive a running server with concurrent authenticated requests and report latency percentiles"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--base-url",
+            type=str,
+            default="http://127.0.0.1:8000",
+            help="Server to test (default: http://127.0.0.1:8000)"
+        )
+        parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients (default: 8)")
+        parser.add_argument("--requests", type=int, help="Total requests to send (default: 500 unless --duration)")
+        parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+        parser.add_argument("--warmup", type=int, default=0, help="Untimed requests sent first (default: 0)")
+        parser.add_argument(
+            "--mix",
+            type=str,
+            default=",".join(f"{name}={weight}" for name, weight in DEFAULT_MIX.items()),
+            help=f"Weighted request mix, e.g. fund_recommendations=3,trade_stock=1 (endpoints: {', '.join(ENDPOINTS)})"
+        )
+        parser.add_argument(
+            "--create-users",
+            type=int,
+            default=0,
+            help=f"Create or reset N '{LOAD_TEST_USER_PREFIX}' accounts in the configured database and log in as them"
+        )
+        parser.add_argument("--username", type=str, help="Log in as an existing user instead")
+        parser.add_argument("--password", type=str, default="loadtest123", help="Password for the test accounts")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for the request mix (default: 0)")
+        parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds (default: 30)")
+        parser.add_argument("--label", type=str, help="Free-form label stored in the report, e.g. sqlite-uncached")
+        parser.add_argument("--output", type=str, help="Write the JSON report to this path")
+
+    def handle(self, *args, **options):
+        try:
+            mix = parse_mix(options["mix"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be at least 1")
+
+        if options["create_users"]:
+            accounts = self._create_users(options["create_users"], options["password"])
+        elif options["username"]:
+            accounts = [(options["username"], options["password"])]
+        else:
+            raise CommandError("Pass --create-users N or --username")
+
+        # 写接口所需的产品ID直接从服务使用的同一数据库读取
+        fund_ids = list(Fund.objects.values_list('id', flat=True)) if 'purchase_fund' in mix else []
+        stock_ids = list(StockInfo.objects.values_list('id', flat=True)) if 'trade_stock' in mix else []
+
+        requests = options["requests"] or (None if options["duration"] else 500)
+        common = dict(
+            base_url=options["base_url"], accounts=accounts, mix=mix, concurrency=options["concurrency"],
+            fund_ids=fund_ids, stock_ids=stock_ids, timeout=options["timeout"],
+        )
+        try:
+            if options["warmup"]:
+                self.stdout.write(self.style.NOTICE(f"Warming up with {options['warmup']} requests..."))
+                run_load(requests=options["warmup"], seed=options["seed"] + 1, **common)
+            limit = f" for up to {options['duration']}s" if options["duration"] else ""
+            self.stdout.write(self.style.NOTICE(
+                f"Sending {requests or 'unlimited'} requests{limit} "
+                f"with {options['concurrency']} clients to {options['base_url']}..."
+            ))
+            summary, elapsed = run_load(
+                requests=requests, duration=options["duration"], seed=options["seed"],
+                log=lambda line: self.stdout.write(f"  {line}"), **common
+            )
+        except (ValueError, RuntimeError, OSError) as e:
+            raise CommandError(str(e))
+
+        for name, result in summary["endpoints"].items():
+            self._write_row(name, result)
+        self._write_row("total", summary["total"])
+
+        if options["output"]:
+            report = {
+                "label": options["label"],
+                "base_url": options["base_url"],
+                "concurrency": options["concurrency"],
+                "mix": mix,
+                "seconds": round(elapsed, 3),
+                **summary,
+            }
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"✅ Report written to {options['output']}"))
+
+        total = summary["total"]
+        if total["errors"]:
+            self.stdout.write(self.style.WARNING(f"⚠️ {total['errors']} of {total['requests']} requests failed"))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {total['requests']} requests in {elapsed:.2f}s ({total['throughput_rps']} req/s)"
+        ))
+
+    def _create_users(self, count, password):
+        # 密码哈希只计算一次，所有测试账号共用
+        password_hash = make_password(password)
+        accounts = []
+        for i in range(count):
+            username = f"{LOAD_TEST_USER_PREFIX}{i:04d}"
+            User.objects.update_or_create(username=username, defaults={'password': password_hash})
+            accounts.append((username, password))
+        self.stdout.write(f"  {count} load-test accounts ready")
+        return accounts
+
+    def _write_row(self, name, result):
+        if not result.get("requests"):
+            return
+        self.stdout.write(
+            f"  {name:<26} {result['requests']:>6} req {result['errors']:>4} err "
+            f"{result['throughput_rps']:>8.2f} req/s  p50 {result['p50_ms']:.1f}ms "
+            f"p95 {result['p95_ms']:.1f}ms p99 {result['p99_ms']:.1f}ms"
+        )
@@ -0,0 +1,49 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from recommendation.holdings import rebuild_holdings
+from recommendation.models import User
+
+
+class Command(BaseCommand):
+    help = "Reconcile the holdings table against purchase history and rebuild it if they differ"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--username",
+            type=str,
+            help="Only reconcile this user's holdings"
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report mismatches without rewriting holdings"
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=20000,
+            help="Purchase records read per chunk (default: 20000)"
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options["username"]:
+            try:
+                user_ids = [User.objects.get(username=options["username"]).id]
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['username']} does not exist")
+
+        started = time.perf_counter()
+        n_users, mismatches = rebuild_holdings(
+            user_ids=user_ids,
+            chunk_size=options["chunk_size"],
+            dry_run=options["dry_run"],
+        )
+        elapsed = time.perf_counter() - started
+
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS(f"✅ Holdings of {n_users} users match purchase history ({elapsed:.2f}s)"))
+        elif options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"⚠️ {mismatches} holdings differ from purchase history across {n_users} users"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt holdings of {n_users} users, fixed {mismatches} mismatches ({elapsed:.2f}s)"))
@@ -0,0 +1,30 @@
+import sqlite3
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from recommendation.routers import REPLICA_ALIAS
+
+
+class Command(BaseCommand):
+    help = "Copy the primary SQLite database into the replica alias (local stand-in for replication)"
+
+    def handle(self, *args, **options):
+        if REPLICA_ALIAS not in connections.databases:
+            raise CommandError("No replica database configured (set SQLITE_REPLICA_PATH)")
+        primary, replica = connections["default"], connections[REPLICA_ALIAS]
+        if primary.vendor != "sqlite" or replica.vendor != "sqlite":
+            raise CommandError("sync_sqlite_replica only copies SQLite databases; use database replication otherwise")
+
+        started = time.perf_counter()
+        replica.close()
+        primary.ensure_connection()
+        # 在线备份：按页复制到副本文件，期间主库仍可读写，副本的读者不会读到复制了一半的数据
+        target = sqlite3.connect(replica.settings_dict["NAME"])
+        try:
+            primary.connection.backup(target)
+        finally:
+            target.close()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Copied {primary.settings_dict['NAME']} to {replica.settings_dict['NAME']} in {elapsed:.2f}s"
+        ))
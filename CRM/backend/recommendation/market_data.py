@@ -0,0 +1,342 @@
+"""列式行情存储
+
+从 StockDailyData 一次性加载全部日线，按 股票 × 交易日 存成 NumPy 二维数组
+（缺失的交易日为 NaN），并在全部股票上向量化计算动量、均线、波动率、回撤等指标。
+import_stock_daily 导入后递增行情版本号，存储只增量加载新交易日的数据。
+
+行情导入后可导出列式快照（shared_arrays 段，每个字段一个 .npy 文件），新进程以只读内存映射打开快照，
+无需经 ORM 读取全部日线，多个进程共享同一份页缓存；快照之后新增的交易日仍从数据库增量补齐。
+
+另维护一个轻量的最新报价索引（ts_code → 最新收盘价、交易日），一次按索引取值的查询构建，
+供交易定价、持仓估值与股票推荐共用，无需加载全部日线。
+"""
+import threading
+
+import numpy as np
+from django.db.models import OuterRef, Subquery
+
+from .catalog import get_catalog_version
+from .models import StockDailyData, StockInfo
+from .routers import read_from_primary
+from .shared_arrays import attach_segment, current_segment, fixed_width, publish_segment
+from .versions import bump_version, get_version
+
+MARKET_VERSION_KEY = 'recommendation:market_version'
+PRICE_FIELDS = ('open', 'high', 'low', 'close', 'pre_close', 'pct_chg', 'vol', 'amount')
+SNAPSHOT_KIND = 'market'
+
+
+def get_market_version():
+    """返回当前行情版本号"""
+    return get_version(MARKET_VERSION_KEY)
+
+
+def bump_market_version():
+    """行情数据导入后递增版本号"""
+    return bump_version(MARKET_VERSION_KEY)
+
+
+def _load_rows(queryset, chunk_size=50000):
+    """分块读取日线，返回 (代码列表, 日期数组, {字段: 数组})"""
+    codes, dates = [], []
+    values = {field: [] for field in PRICE_FIELDS}
+    rows = queryset.order_by().values_list('ts_code', 'trade_date', *PRICE_FIELDS).iterator(chunk_size=chunk_size)
+    for row in rows:
+        codes.append(row[0])
+        dates.append(row[1])
+        for field, value in zip(PRICE_FIELDS, row[2:]):
+            values[field].append(value)
+    return (
+        codes,
+        np.array(dates, dtype='datetime64[D]'),
+        {field: np.array(column, dtype=np.float64) for field, column in values.items()},
+    )
+
+
+class PriceStore:
+    """按股票 × 交易日组织的日线数组"""
+
+    def __init__(self, version, codes, dates, arrays, row_count, snapshot=None):
+        self.version = version
+        self.snapshot = snapshot  # 来源快照名（从数据库加载时为 None）
+        self.codes = np.asarray(codes, dtype=object)  # (n,) ts_code
+        self.dates = np.asarray(dates, dtype='datetime64[D]')  # (m,) 升序交易日
+        self.arrays = arrays  # {字段: (n, m) float64}
+        self.row_count = row_count
+        self.code_positions = {code: pos for pos, code in enumerate(self.codes.tolist())}
+
+    @classmethod
+    def empty(cls, version=None):
+        arrays = {field: np.empty((0, 0)) for field in PRICE_FIELDS}
+        return cls(version, [], np.empty(0, dtype='datetime64[D]'), arrays, 0)
+
+    @classmethod
+    def load(cls, version=None):
+        store = cls.empty(version)
+        store.extend(StockDailyData.objects.all())
+        return store
+
+    def save_snapshot(self):
+        """写出列式快照并原子切换，返回快照名"""
+        arrays = {field: self.arrays[field] for field in PRICE_FIELDS}
+        arrays.update(codes=fixed_width(self.codes.tolist()), dates=self.dates)
+        return publish_segment(
+            SNAPSHOT_KIND, arrays,
+            row_count=self.row_count,
+            last_date=str(self.last_date) if self.last_date is not None else None,
+        )
+
+    @classmethod
+    def open_snapshot(cls, version=None, name=None):
+        """以只读内存映射打开当前（或指定的）快照，没有快照时返回 None"""
+        segment = attach_segment(SNAPSHOT_KIND, name)
+        if segment is None:
+            return None
+        arrays = {field: segment[field] for field in PRICE_FIELDS}
+        return cls(version, segment['codes'].astype(object), segment['dates'], arrays,
+                   segment.header['row_count'], snapshot=segment.name)
+
+    @property
+    def close(self):
+        return self.arrays['close']
+
+    @property
+    def last_date(self):
+        return self.dates[-1] if len(self.dates) else None
+
+    def extend(self, queryset):
+        """把查询到的日线并入存储（新股票追加行，新交易日追加列），返回新增记录数"""
+        codes, dates, values = _load_rows(queryset)
+        if not codes:
+            return 0
+
+        new_codes = sorted(set(codes) - self.code_positions.keys())
+        all_codes = np.concatenate([self.codes, np.array(new_codes, dtype=object)])
+        all_dates = np.union1d(self.dates, dates)
+        code_positions = {code: pos for pos, code in enumerate(all_codes.tolist())}
+
+        rows = np.fromiter((code_positions[code] for code in codes), dtype=np.intp, count=len(codes))
+        cols = np.searchsorted(all_dates, dates)
+        old_cols = np.searchsorted(all_dates, self.dates)
+        n_old = len(self.codes)
+        for field in PRICE_FIELDS:
+            array = np.full((len(all_codes), len(all_dates)), np.nan)
+            array[:n_old, old_cols] = self.arrays[field]
+            array[rows, cols] = values[field]
+            self.arrays[field] = array
+
+        self.codes = all_codes
+        self.dates = all_dates
+        self.code_positions = code_positions
+        self.row_count += len(codes)
+        self.snapshot = None
+        return len(codes)
+
+    # ---- 向量化指标（对所有股票一次计算，返回 (n,) 数组） ----
+
+    def _window(self, window):
+        """最近 window 个交易日的收盘价，历史不足时使用全部历史"""
+        return self.close[:, -min(window, self.close.shape[1]):]
+
+    def daily_returns(self):
+        """日收益率矩阵 (n, m-1)"""
+        close = self.close
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return close[:, 1:] / close[:, :-1] - 1.0
+
+    def latest(self, field):
+        """每只股票在最新交易日的值（当日无数据为 NaN）"""
+        array = self.arrays[field]
+        if not array.shape[1]:
+            return np.full(len(self.codes), np.nan)
+        return array[:, -1]
+
+    def momentum(self, window=20):
+        """区间涨幅：最新收盘 / 区间内首个有效收盘 − 1"""
+        close = self._window(window + 1)
+        first_valid = np.argmax(~np.isnan(close), axis=1)
+        start = close[np.arange(len(close)), first_valid]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return close[:, -1] / start - 1.0
+
+    def moving_average(self, window=20):
+        with np.errstate(invalid='ignore'):
+            return _nanmean(self._window(window))
+
+    def volatility(self, window=20):
+        """区间日收益率标准差"""
+        close = self._window(window + 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = close[:, 1:] / close[:, :-1] - 1.0
+        return _nanstd(returns)
+
+    def max_drawdown(self, window=60):
+        """区间最大回撤（负数，例如 -0.12 表示回撤12%）"""
+        close = self._window(window)
+        filled = np.where(np.isnan(close), -np.inf, close)
+        running_max = np.maximum.accumulate(filled, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            drawdown = np.where(np.isnan(close), np.nan, close / running_max - 1.0)
+        return _nanmin(drawdown)
+
+
+def _nanmean(array):
+    counts = np.sum(~np.isnan(array), axis=1)
+    sums = np.nansum(array, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def _nanstd(array):
+    counts = np.sum(~np.isnan(array), axis=1)
+    mean = _nanmean(array)
+    squares = np.nansum((array - mean[:, None]) ** 2, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(counts > 1, np.sqrt(squares / np.maximum(counts - 1, 1)), np.nan)
+
+
+def _nanmin(array):
+    filled = np.where(np.isnan(array), np.inf, array)
+    result = filled.min(axis=1) if array.shape[1] else np.full(len(array), np.inf)
+    return np.where(np.isinf(result), np.nan, result)
+
+
+def export_market_snapshot():
+    """把当前行情导出为列式快照（在 import_stock_daily 之后运行），返回 (快照名, 行情存储)"""
+    store = price_store_holder.get()
+    return store.save_snapshot(), store
+
+
+class PriceStoreHolder:
+    """进程级行情存储，行情版本变化时增量加载新交易日"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._store = None
+
+    def get(self):
+        version = get_market_version()
+        store = self._store
+        if store is None or store.version != version:
+            with self._lock:
+                store = self._store
+                if store is None or store.version != version:
+                    with read_from_primary():
+                        store = self._refresh(store, version)
+                    self._store = store
+        return store
+
+    def _refresh(self, store, version):
+        # 有新导出的快照时从快照开始（内存映射，几乎不耗时），否则从已有存储开始
+        snapshot = current_segment(SNAPSHOT_KIND)
+        if snapshot is not None and (store is None or store.snapshot != snapshot):
+            store = PriceStore.open_snapshot(version, name=snapshot) or store
+        if store is None:
+            return PriceStore.load(version)
+
+        # 只加载比已有最新交易日更新的数据；若总行数对不上（补录了历史数据），整体重新加载
+        row_count = StockDailyData.objects.count()
+        refreshed = PriceStore(version, store.codes, store.dates, dict(store.arrays), store.row_count, store.snapshot)
+        if row_count == store.row_count:
+            return refreshed  # 没有新数据（如快照已是最新）
+        last_date = store.last_date
+        queryset = StockDailyData.objects.all()
+        if last_date is not None:
+            queryset = queryset.filter(trade_date__gt=last_date.item())
+        refreshed.extend(queryset)
+        if refreshed.row_count != row_count:
+            return PriceStore.load(version)
+        return refreshed
+
+    def invalidate(self):
+        with self._lock:
+            self._store = None
+
+
+price_store_holder = PriceStoreHolder()
+
+
+def get_price_store():
+    """返回当前行情存储"""
+    return price_store_holder.get()
+
+
+class QuoteIndex:
+    """最新报价索引：ts_code / StockInfo.id → (最新收盘价, 交易日)"""
+
+    def __init__(self, version, quotes, stock_codes):
+        self.version = version
+        self.quotes = quotes  # {ts_code: (close, trade_date)}
+        self.stock_codes = stock_codes  # {StockInfo.id: ts_code}
+
+    @staticmethod
+    def latest_rows():
+        """每只股票最新交易日的 (ts_code, 收盘价, 交易日, StockInfo.id)，没有日线的股票交易日为 None
+
+        以股票表驱动，每只股票两次按 (ts_code, trade_date) 唯一索引倒序取一行，不扫描日线表；
+        报价只按 StockInfo 中的股票查询，没有股票信息的日线无需索引。
+        """
+        latest = StockDailyData.objects.filter(ts_code=OuterRef('ts_code')).order_by('-trade_date')
+        return (
+            StockInfo.objects.annotate(
+                latest_close=Subquery(latest.values('close')[:1]),
+                latest_date=Subquery(latest.values('trade_date')[:1]),
+            )
+            .order_by()
+            .values_list('ts_code', 'latest_close', 'latest_date', 'id')
+        )
+
+    @classmethod
+    def load(cls, version=None):
+        rows = cls.latest_rows()
+        quotes, stock_codes = {}, {}
+        for ts_code, close, trade_date, stock_id in rows:
+            if trade_date is None:
+                continue
+            quotes[ts_code] = (close, trade_date)
+            stock_codes[stock_id] = ts_code
+        return cls(version, quotes, stock_codes)
+
+    def get(self, ts_code):
+        """返回 (最新收盘价, 交易日)，没有行情时返回 None"""
+        return self.quotes.get(ts_code)
+
+    def price(self, ts_code, default=None):
+        quote = self.quotes.get(ts_code)
+        return quote[0] if quote is not None else default
+
+    def price_for_stock(self, stock_id, default=None):
+        """按 StockInfo.id 取最新收盘价"""
+        return self.price(self.stock_codes.get(stock_id), default)
+
+
+class QuoteIndexHolder:
+    """进程级最新报价索引，行情或股票目录版本变化时重新构建"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+
+    def get(self):
+        version = (get_market_version(), get_catalog_version())
+        index = self._index
+        if index is None or index.version != version:
+            with self._lock:
+                index = self._index
+                if index is None or index.version != version:
+                    with read_from_primary():
+                        index = QuoteIndex.load(version)
+                    self._index = index
+        return index
+
+    def invalidate(self):
+        with self._lock:
+            self._index = None
+
+
+quote_index_holder = QuoteIndexHolder()
+
+
+def get_quote_index():
+    """返回当前最新报价索引"""
+    return quote_index_holder.get()
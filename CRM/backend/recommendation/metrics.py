@@ -0,0 +1,162 @@
+"""进程内性能指标
+
+请求中间件记录每个请求的耗时、SQL 查询数与 SQL 耗时，推荐引擎用 timed 装饰器记录各算法耗时，
+异步推荐接口记录超时/出错而降级的策略次数，统一汇总为直方图与计数器，由 /api/metrics/ 以 Prometheus 文本格式输出。
+每次记录只做一次二分查找和加锁累加，常驻开启的开销可以忽略；多进程部署时各进程分别统计。
+"""
+import functools
+import threading
+import time
+from bisect import bisect_left
+
+# 秒级耗时的分桶（与 Prometheus 客户端默认值一致）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in (*zip(names, values), *extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """按标签累加的计数器"""
+
+    type = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}' for labels, value in values]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """按标签分组的累积直方图"""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # 标签值 -> [各桶计数..., +Inf 桶计数, 总和]
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            snapshot = sorted((labels, list(series)) for labels, series in self._series.items())
+        lines = []
+        for labels, series in snapshot:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), series[:-1]):
+                cumulative += count
+                le = bound if bound == '+Inf' else _number(bound)
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, [("le", le)])} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+http_requests = Counter(
+    'http_requests_total', 'HTTP requests by view and status code', ('method', 'view', 'status'),
+)
+http_request_duration = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency', ('method', 'view'),
+)
+http_request_queries = Histogram(
+    'http_request_db_queries', 'SQL queries executed per HTTP request', ('method', 'view'), QUERY_COUNT_BUCKETS,
+)
+http_request_db_duration = Histogram(
+    'http_request_db_duration_seconds', 'Time spent in SQL per HTTP request', ('method', 'view'),
+)
+algorithm_duration = Histogram(
+    'recommendation_algorithm_duration_seconds', 'Recommendation algorithm latency', ('algorithm',),
+)
+strategy_degraded = Counter(
+    'recommendation_strategy_degraded_total', 'Strategies dropped by async endpoints', ('strategy', 'reason'),
+)
+
+METRICS = (
+    http_requests, http_request_duration, http_request_queries, http_request_db_duration, algorithm_duration,
+    strategy_degraded,
+)
+
+
+def timed(algorithm):
+    """装饰器：记录被装饰方法的耗时（异常时同样记录）"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                algorithm_duration.observe(time.perf_counter() - started, algorithm)
+        return wrapper
+    return decorator
+
+
+def _segment_cache_lines():
+    from .segment_cache import segment_cache
+
+    stats = segment_cache.stats()
+    return [
+        '# HELP recommendation_segment_cache_requests_total Segment cache lookups by result',
+        '# TYPE recommendation_segment_cache_requests_total counter',
+        f'recommendation_segment_cache_requests_total{{result="hit"}} {stats["hits"]}',
+        f'recommendation_segment_cache_requests_total{{result="miss"}} {stats["misses"]}',
+    ]
+
+
+def render():
+    """全部指标的 Prometheus 文本格式"""
+    lines = []
+    for metric in METRICS:
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        lines.extend(metric.samples())
+    lines.extend(_segment_cache_lines())
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    """清空全部指标"""
+    for metric in METRICS:
+        metric.reset()
@@ -0,0 +1,84 @@
+import contextvars
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import metrics
+
+# 当前请求的 SQL 统计；ASGI 下同步视图在 sync_to_async 线程中执行，上下文变量随之传入该线程
+_current_recorder = contextvars.ContextVar('query_recorder', default=None)
+
+
+class QueryRecorder:
+    """统计一个请求的查询次数与耗时（异步视图的并发策略可能在多个线程中同时记录）"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+
+
+def record_query(execute, sql, params, many, context):
+    """数据库执行包装器（由 signals 安装到每个连接），计入当前上下文的 QueryRecorder"""
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.add(time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """记录每个请求的耗时、SQL 查询数与 SQL 耗时
+
+    按视图名（而非原始路径）分组，避免路径中的ID导致标签无限增长。
+    同时支持同步与异步请求。连接属于执行查询的线程，因此不在本线程的连接上安装包装器，
+    而是通过上下文变量把统计对象传给实际执行查询的线程（sync_to_async 线程、推荐策略线程池）。
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        token = _current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        self._record(request, response, recorder, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        token = _current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        self._record(request, response, recorder, time.perf_counter() - started)
+        return response
+
+    def _record(self, request, response, recorder, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unmatched'
+        metrics.http_requests.inc(request.method, view, str(response.status_code))
+        metrics.http_request_duration.observe(elapsed, request.method, view)
+        metrics.http_request_queries.observe(recorder.count, request.method, view)
+        metrics.http_request_db_duration.observe(recorder.seconds, request.method, view)
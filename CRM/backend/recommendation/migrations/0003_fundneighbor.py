@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendation', '0002_purchaserecord'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FundNeighbor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('fund', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='recommendation.fund')),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recommendation.fund')),
+            ],
+            options={
+                'verbose_name': '相似基金',
+                'verbose_name_plural': '相似基金',
+                'ordering': ['fund', 'rank'],
+                'unique_together': {('fund', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendation', '0003_fundneighbor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Holding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_type', models.CharField(choices=[('fund', '基金'), ('insurance', '保险'), ('stock', '股票')], max_length=10)),
+                ('product_id', models.IntegerField()),
+                ('quantity', models.DecimalField(decimal_places=4, default=0, max_digits=15)),
+                ('cost_basis', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holdings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': '持仓',
+                'verbose_name_plural': '持仓',
+                'unique_together': {('user', 'product_type', 'product_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations
+
+
+def populate_holdings(apps, schema_editor):
+    """由已有的购买记录初始化持仓表（此前的记录均为买入）"""
+    PurchaseRecord = apps.get_model('recommendation', 'PurchaseRecord')
+    Holding = apps.get_model('recommendation', 'Holding')
+
+    positions = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+    rows = PurchaseRecord.objects.filter(status='completed').values_list(
+        'user_id', 'purchase_type', 'product_id', 'amount', 'quantity'
+    )
+    for user_id, purchase_type, product_id, amount, quantity in rows.iterator(chunk_size=20000):
+        position = positions[(user_id, purchase_type, product_id)]
+        position[0] += quantity or 0
+        position[1] += amount
+
+    Holding.objects.bulk_create(
+        (
+            Holding(user_id=user_id, product_type=product_type, product_id=product_id,
+                    quantity=quantity, cost_basis=cost_basis)
+            for (user_id, product_type, product_id), (quantity, cost_basis) in positions.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendation', '0004_holding'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_holdings, migrations.RunPython.noop),
+    ]
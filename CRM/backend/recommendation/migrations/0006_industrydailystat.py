@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendation', '0005_populate_holdings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndustryDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trade_date', models.DateField()),
+                ('industry', models.CharField(max_length=50)),
+                ('stock_count', models.IntegerField()),
+                ('return_rate', models.FloatField()),
+                ('volatility', models.FloatField()),
+                ('liquidity', models.FloatField()),
+            ],
+            options={
+                'verbose_name': '行业统计',
+                'verbose_name_plural': '行业统计',
+                'ordering': ['-trade_date', 'industry'],
+                'unique_together': {('trade_date', 'industry')},
+            },
+        ),
+    ]
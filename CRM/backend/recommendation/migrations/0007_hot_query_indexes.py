@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendation', '0006_industrydailystat'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fund',
+            index=models.Index(fields=['fund_type', '-star_count'], name='fund_type_star_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaserecord',
+            index=models.Index(fields=['user', '-purchase_date'], name='purchase_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockdailydata',
+            index=models.Index(fields=['trade_date'], name='stockdaily_trade_date_idx'),
+        ),
+    ]
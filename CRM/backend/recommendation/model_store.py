@@ -0,0 +1,37 @@
+"""离线模型文件的进程级缓存
+
+模型由管理命令离线生成并原子替换到 RECOMMENDATION_MODEL_DIR，
+在线进程按文件修改时间判断是否需要重新加载。
+"""
+import os
+import threading
+
+from django.conf import settings
+
+
+class ModelFile:
+    """按需加载并缓存一个模型文件，文件被替换后自动重新加载"""
+
+    def __init__(self, filename, loader):
+        self.filename = filename
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._model = None
+        self._mtime = None
+
+    @property
+    def path(self):
+        return os.path.join(settings.RECOMMENDATION_MODEL_DIR, self.filename)
+
+    def get(self):
+        """返回已加载的模型；模型文件不存在时返回 None"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if self._model is None or self._mtime != mtime:
+            with self._lock:
+                if self._model is None or self._mtime != mtime:
+                    self._model = self._loader(self.path)
+                    self._mtime = mtime
+        return self._model
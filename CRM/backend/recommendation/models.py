@@ -39,6 +39,13 @@ class Fund(models.Model):
 
     fee = models.FloatField(null=True, blank=True)  # 手续费
     fund_type = models.CharField(max_length=50)  # 类型
+
+    class Meta:
+        indexes = [
+            # 按类型筛选并按评级排序（接口/后台筛选），排序直接沿索引读取
+            models.Index(fields=['fund_type', '-star_count'], name='fund_type_star_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.code})"
 
@@ -74,6 +81,10 @@ class StockDailyData(models.Model):
 
     class Meta:
         unique_together = ('ts_code', 'trade_date')  # 避免重复记录
+        indexes = [
+            # 最新交易日、某日全部行情、增量加载新交易日只按 trade_date 过滤，无法使用以 ts_code 开头的唯一索引
+            models.Index(fields=['trade_date'], name='stockdaily_trade_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.ts_code} - {self.trade_date}"
@@ -108,8 +119,63 @@ class PurchaseRecord(models.Model):
     
     class Meta:
         ordering = ['-purchase_date']
+        indexes = [
+            # 用户购买记录按时间倒序列出，无需额外排序
+            models.Index(fields=['user', '-purchase_date'], name='purchase_user_date_idx'),
+        ]
         verbose_name = '购买记录'
         verbose_name_plural = '购买记录'
 
     def __str__(self):
         return f"{self.user.username} - {self.product_name} - {self.amount}"
+
+class FundNeighbor(models.Model):
+    """基金相似近邻表（离线计算的Top-K相似基金）"""
+    fund = models.ForeignKey(Fund, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey(Fund, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()  # 相似度排名（从0开始）
+    score = models.FloatField()  # 余弦相似度
+
+    class Meta:
+        unique_together = ('fund', 'rank')  # 按 (fund, rank) 索引，相似基金查询为一次索引读取
+        ordering = ['fund', 'rank']
+        verbose_name = '相似基金'
+        verbose_name_plural = '相似基金'
+
+    def __str__(self):
+        return f"{self.fund_id} -> {self.neighbor_id} ({self.score:.4f})"
+
+class Holding(models.Model):
+    """用户持仓（按产品汇总，随交易在同一事务内更新）"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='holdings')
+    product_type = models.CharField(max_length=10, choices=PurchaseRecord.PURCHASE_TYPES)
+    product_id = models.IntegerField()  # 对应基金、保险或股票的ID
+    quantity = models.DecimalField(max_digits=15, decimal_places=4, default=0)  # 持有数量（股票/基金份额）
+    cost_basis = models.DecimalField(max_digits=15, decimal_places=2, default=0)  # 持仓成本
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'product_type', 'product_id')  # 持仓查询为一次索引读取
+        verbose_name = '持仓'
+        verbose_name_plural = '持仓'
+
+    def __str__(self):
+        return f"{self.user.username} - {self.product_type}:{self.product_id} - {self.quantity}"
+
+class IndustryDailyStat(models.Model):
+    """行业日统计（每个交易日由日线数据预先计算）"""
+    trade_date = models.DateField()  # 交易日期
+    industry = models.CharField(max_length=50)  # 所属行业
+    stock_count = models.IntegerField()  # 有行情的股票数
+    return_rate = models.FloatField()  # 区间平均涨幅
+    volatility = models.FloatField()  # 行业等权指数日收益率波动率
+    liquidity = models.FloatField()  # 区间日均成交额（万元）
+
+    class Meta:
+        unique_together = ('trade_date', 'industry')
+        ordering = ['-trade_date', 'industry']
+        verbose_name = '行业统计'
+        verbose_name_plural = '行业统计'
+
+    def __str__(self):
+        return f"{self.trade_date} {self.industry}"
@@ -0,0 +1,194 @@
+"""基于现代投资组合理论（MPT）的资产配置
+
+股票类资产的收益与风险由 StockDailyData 估计：每个交易日取全部股票日收益率的等权平均作为
+股票指数收益，累计量（样本数、和、平方和）随新交易日增量更新，无需重算全部历史。
+基金、保险没有历史净值数据，使用年化收益/波动率及与股票的相关性假设。
+
+协方差矩阵得到后，在权重单纯形网格上一次性向量化计算所有组合的收益与波动（有效前沿），
+按各风险等级的风险厌恶系数取效用 μ − λσ²/2 最大的组合。结果按交易日缓存在Django缓存中，
+同一交易日内所有进程、所有用户共用同一份计算结果。
+"""
+import threading
+from itertools import product
+
+import numpy as np
+from django.core.cache import cache
+
+from .market_data import get_market_version, get_price_store
+
+ASSET_TYPES = ('fund', 'insurance', 'stock')
+TRADING_DAYS = 252
+
+# 基金、保险的年化收益/波动率假设，以及与股票指数的相关系数
+ASSET_ASSUMPTIONS = {
+    'fund': {'return': 0.05, 'volatility': 0.10, 'stock_correlation': 0.6},
+    'insurance': {'return': 0.025, 'volatility': 0.01, 'stock_correlation': 0.0},
+}
+# 股票样本收益向先验收益收缩，避免短样本下年化收益失真
+STOCK_PRIOR_RETURN = 0.08
+STOCK_PRIOR_VOLATILITY = 0.25
+PRIOR_DAYS = 250
+
+# 各风险等级的风险厌恶系数
+RISK_AVERSION = {'low': 12.0, 'medium': 5.0, 'high': 2.0}
+WEIGHT_BOUNDS = (0.10, 0.70)  # 每类资产的最低/最高权重
+GRID_STEP = 0.01
+
+# 没有行情数据时使用的默认配置比例
+DEFAULT_ALLOCATIONS = {
+    'low': {'fund': 50, 'insurance': 30, 'stock': 20},
+    'medium': {'fund': 40, 'insurance': 30, 'stock': 30},
+    'high': {'fund': 30, 'insurance': 20, 'stock': 50},
+}
+
+TARGETS_CACHE_KEY = 'recommendation:mpt_targets'
+
+
+class RunningMoments:
+    """股票指数日收益率的累计量，按交易日增量更新"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.last_date = None
+
+    def update(self, store):
+        """并入 last_date 之后的交易日，返回新增天数"""
+        if len(store.dates) < 2:
+            return 0
+        start = 1 if self.last_date is None else int(np.searchsorted(store.dates, self.last_date, side='right'))
+        start = max(start, 1)
+        if start >= len(store.dates):
+            return 0
+
+        close = store.close
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = close[:, start:] / close[:, start - 1:-1] - 1.0
+        # 每个交易日对有数据的股票取等权平均
+        valid = np.isfinite(returns)
+        counts = valid.sum(axis=0)
+        index_returns = np.where(valid, returns, 0.0).sum(axis=0)[counts > 0] / counts[counts > 0]
+
+        self.count += len(index_returns)
+        self.total += float(index_returns.sum())
+        self.total_sq += float((index_returns ** 2).sum())
+        self.last_date = store.dates[-1]
+        return len(index_returns)
+
+    def annualized(self):
+        """收缩后的年化 (收益, 波动率)"""
+        if self.count < 2:
+            return STOCK_PRIOR_RETURN, STOCK_PRIOR_VOLATILITY
+        mean = self.total / self.count
+        variance = max((self.total_sq - self.count * mean ** 2) / (self.count - 1), 0.0)
+        weight = self.count / (self.count + PRIOR_DAYS)
+        annual_return = weight * mean * TRADING_DAYS + (1 - weight) * STOCK_PRIOR_RETURN
+        annual_variance = weight * variance * TRADING_DAYS + (1 - weight) * STOCK_PRIOR_VOLATILITY ** 2
+        return annual_return, float(np.sqrt(annual_variance))
+
+
+def expected_returns_and_covariance(moments):
+    """返回按 ASSET_TYPES 顺序的年化期望收益向量与协方差矩阵"""
+    stock_return, stock_volatility = moments.annualized()
+    returns = np.array([
+        ASSET_ASSUMPTIONS['fund']['return'],
+        ASSET_ASSUMPTIONS['insurance']['return'],
+        stock_return,
+    ])
+    volatilities = np.array([
+        ASSET_ASSUMPTIONS['fund']['volatility'],
+        ASSET_ASSUMPTIONS['insurance']['volatility'],
+        stock_volatility,
+    ])
+    correlation = np.eye(3)
+    for i, asset_type in enumerate(('fund', 'insurance')):
+        correlation[i, 2] = correlation[2, i] = ASSET_ASSUMPTIONS[asset_type]['stock_correlation']
+    return returns, correlation * np.outer(volatilities, volatilities)
+
+
+def weight_grid(step=GRID_STEP, bounds=WEIGHT_BOUNDS):
+    """权重单纯形上满足上下限的所有网格点，形状 (p, 3)"""
+    units = int(round(1 / step))
+    low, high = int(round(bounds[0] * units)), int(round(bounds[1] * units))
+    points = [
+        (a, b, units - a - b)
+        for a, b in product(range(low, high + 1), repeat=2)
+        if low <= units - a - b <= high
+    ]
+    return np.array(points, dtype=np.float64) / units
+
+
+def efficient_frontier(returns, covariance, weights=None):
+    """向量化计算网格上所有组合的收益与波动率，并标记有效前沿上的组合
+
+    返回 (权重 (p, 3), 组合收益 (p,), 组合波动率 (p,), 是否在有效前沿 (p,))
+    """
+    if weights is None:
+        weights = weight_grid()
+    portfolio_returns = weights @ returns
+    portfolio_volatility = np.sqrt(np.einsum('pi,ij,pj->p', weights, covariance, weights))
+
+    # 按波动率升序扫描，收益创新高的组合位于有效前沿上
+    order = np.argsort(portfolio_volatility, kind='stable')
+    best_so_far = np.maximum.accumulate(portfolio_returns[order])
+    on_frontier = np.zeros(len(weights), dtype=bool)
+    on_frontier[order] = portfolio_returns[order] >= best_so_far
+    return weights, portfolio_returns, portfolio_volatility, on_frontier
+
+
+def optimal_allocations(returns, covariance):
+    """各风险等级效用最大的配置比例（百分比）"""
+    weights, portfolio_returns, portfolio_volatility, on_frontier = efficient_frontier(returns, covariance)
+    allocations = {}
+    for risk_tolerance, aversion in RISK_AVERSION.items():
+        utility = portfolio_returns - 0.5 * aversion * portfolio_volatility ** 2
+        utility[~on_frontier] = -np.inf
+        best = int(np.argmax(utility))
+        allocations[risk_tolerance] = {
+            asset_type: round(float(weights[best, i]) * 100, 1) for i, asset_type in enumerate(ASSET_TYPES)
+        }
+    return allocations
+
+
+class AllocationModel:
+    """进程级MPT模型：增量维护收益累计量，并按交易日缓存最优配置"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._moments = RunningMoments()
+
+    def target_allocations(self):
+        """返回 {风险等级: {资产类型: 百分比}}"""
+        version = get_market_version()
+        cached = cache.get(TARGETS_CACHE_KEY)
+        if cached is not None and cached['version'] == version:
+            return cached['allocations']
+
+        with self._lock:
+            store = get_price_store()
+            if not len(store.dates):
+                return DEFAULT_ALLOCATIONS
+            if self._moments.last_date is not None and store.last_date < self._moments.last_date:
+                self._moments = RunningMoments()  # 行情被回滚或重建，重新累计
+            self._moments.update(store)
+            allocations = optimal_allocations(*expected_returns_and_covariance(self._moments))
+
+        cache.set(TARGETS_CACHE_KEY, {
+            'version': version,
+            'trade_date': str(store.last_date),
+            'allocations': allocations,
+        }, timeout=None)
+        return allocations
+
+    def reset(self):
+        """丢弃已累计的收益数据（行情被整体替换时使用）"""
+        with self._lock:
+            self._moments = RunningMoments()
+
+
+allocation_model = AllocationModel()
+
+
+def get_target_allocations():
+    return allocation_model.target_allocations()
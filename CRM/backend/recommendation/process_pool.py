@@ -0,0 +1,26 @@
+"""管理命令使用的多进程池
+
+spawn 启动方式（Windows、macOS 默认）下子进程不继承父进程已加载的 Django 应用，
+在导入任何引用模型的模块之前必须先执行 django.setup()。本模块不导入模型，
+子进程先完成 setup，再反序列化并执行调用方的初始化函数；fork 方式下 setup 直接跳过。
+"""
+import pickle
+from multiprocessing import Pool
+
+
+def process_pool(processes, initializer=None, initargs=()):
+    """创建进程池，子进程在执行 initializer(*initargs) 和任务之前先初始化 Django"""
+    # 初始化函数及其参数可能引用模型所在模块，序列化为字节串，待子进程 setup 后再还原
+    payload = pickle.dumps((initializer, initargs))
+    return Pool(processes=processes, initializer=_setup_worker, initargs=(payload,))
+
+
+def _setup_worker(payload):
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+    initializer, initargs = pickle.loads(payload)
+    if initializer is not None:
+        initializer(*initargs)
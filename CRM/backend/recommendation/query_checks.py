@@ -0,0 +1,79 @@
+"""SQL 查询回归检查的共享定义
+
+由 manage.py test（recommendation/tests）在合成数据上强制执行，
+check_query_budgets、check_query_plans 管理命令在当前数据库的实际数据上复查同一组定义。
+"""
+import re
+from datetime import date
+
+from django.db.models import Max, Subquery
+
+from .market_data import QuoteIndex
+from .models import Fund, FundNeighbor, Holding, IndustryDailyStat, PurchaseRecord, StockDailyData, StockInfo
+
+# 每个推荐方法允许的SQL查询数：cold 为进程内缓存为空时的首次调用，warm 为缓存命中后的调用
+QUERY_BUDGETS = {
+    'insurance_recommendation': {'cold': 2, 'warm': 1},
+    'fund_recommendation': {'cold': 3, 'warm': 2},
+    'stock_recommendation': {'cold': 4, 'warm': 0},
+}
+
+# EXPLAIN QUERY PLAN 中的整表扫描：SCAN <表> 且未使用覆盖索引（SCAN ... USING INDEX 仍需逐行回表）
+FULL_SCAN = re.compile(r'\bSCAN (?!CONSTANT ROW)(\w+)\b(?! USING COVERING INDEX)')
+# 结果需要额外排序：ORDER BY 未能沿索引顺序读取
+TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+def hot_queries():
+    """热点查询：名称 → (查询集, 允许整表扫描的表)；与各模块中的查询保持一致，参数取值不影响执行计划"""
+    today = date.today()
+    latest_stat_date = IndustryDailyStat.objects.order_by('-trade_date').values('trade_date')[:1]
+    return {
+        # RecommendationEngine._get_held_items
+        'held_items': (Holding.objects.filter(user_id=1, cost_basis__gt=0).values_list('product_type', 'product_id'), ()),
+        # views.get_purchase_records
+        'user_purchases': (PurchaseRecord.objects.filter(user_id=1), ()),
+        # PriceStoreHolder._refresh：增量加载新交易日
+        'market_delta': (
+            StockDailyData.objects.filter(trade_date__gt=today).order_by()
+            .values_list('ts_code', 'trade_date', 'close'),
+            (),
+        ),
+        # 总行数 count() 与只读主键的计划相同
+        'market_row_count': (StockDailyData.objects.order_by().values('id'), ()),
+        'latest_trade_date': (StockDailyData.objects.order_by('-trade_date').values('trade_date')[:1], ()),
+        'trade_date_rows': (StockDailyData.objects.filter(trade_date=today), ()),
+        # import_stock_daily --incremental
+        'latest_trade_dates': (
+            StockDailyData.objects.values('ts_code').annotate(latest=Max('trade_date')).values_list('ts_code', 'latest'),
+            (),
+        ),
+        # QuoteIndex.load：需要每只股票各一行，股票表本身按设计整表读取
+        'quote_index': (QuoteIndex.latest_rows(), (StockInfo._meta.db_table,)),
+        'stock_by_code': (StockInfo.objects.filter(ts_code='000001.SZ'), ()),
+        'funds_by_type': (Fund.objects.filter(fund_type='混合型').order_by('-star_count')[:10], ()),
+        # RecommendationEngine 相似基金
+        'fund_neighbors': (
+            FundNeighbor.objects.filter(fund_id=1).order_by('rank').values_list('neighbor_id', 'score')[:5],
+            (),
+        ),
+        # holdings.allocation_by_type
+        'holdings': (
+            Holding.objects.filter(user_id=1, cost_basis__gt=0).values_list(
+                'product_type', 'product_id', 'quantity', 'cost_basis'
+            ),
+            (),
+        ),
+        # holdings.apply_trade
+        'holding_row': (Holding.objects.filter(user_id=1, product_type='stock', product_id=1), ()),
+        # IndustryStatsHolder：最新交易日的行业统计
+        'industry_stats': (IndustryDailyStat.objects.filter(trade_date=Subquery(latest_stat_date)), ()),
+    }
+
+
+def plan_problems(plan, allowed=()):
+    """执行计划中的问题列表：未允许的整表扫描、ORDER BY 需要额外排序"""
+    problems = [f"full scan of {table}" for table in sorted(set(FULL_SCAN.findall(plan))) if table not in allowed]
+    if TEMP_SORT in plan:
+        problems.append("ORDER BY needs a temporary sort")
+    return problems
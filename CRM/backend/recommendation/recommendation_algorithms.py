@@ -1,17 +1,46 @@
 import numpy as np
-from sklearn.neighbors import NearestNeighbors
-from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.preprocessing import StandardScaler
 from collections import defaultdict
 import math
-from .models import InsuranceProduct, Fund, StockInfo, StockDailyData, User, PurchaseRecord
+from .models import FundNeighbor, User, Holding
+from .catalog import catalog_index, insurance_age_bucket
+from .scoring import cosine_top_k, top_k
+from .market_data import get_price_store, get_quote_index
+from .portfolio import get_target_allocations
+from .holdings import allocation_by_type
+from .industry_stats import get_industry_stats
+from .segment_cache import profile_segment, representative_profile, segment_cache
+from .collaborative_filtering import get_item_cf_model
+from .association_rules import get_rule_index, item_key
+from .metrics import timed
+from .fanout import run_in_pool, run_strategies
+
+
+def unique_by(recommendations, field, limit):
+    """按 field 去重（保留先出现的），取前 limit 条"""
+    seen = set()
+    unique_recommendations = []
+    for rec in recommendations:
+        if rec[field] not in seen:
+            seen.add(rec[field])
+            unique_recommendations.append(rec)
+    return unique_recommendations[:limit]
+
 
 class RecommendationEngine:
     """推荐算法引擎"""
     
+    # 各风险偏好对应的推荐行业
+    RISK_INDUSTRY_MAPPING = {
+        'low': ['银行', '公用事业', '食品饮料'],
+        'medium': ['银行', '公用事业', '食品饮料', '医药生物', '电子'],
+        'high': ['计算机', '传媒', '通信', '电子', '医药生物']
+    }
+    
     def __init__(self):
         self.scaler = StandardScaler()
 
+    @timed('mpt')
     def get_mpt_suggestions(self, user_id):
         """
         根据Modern Portfolio Theory (MPT) 为用户提供资产配置建议。
@@ -60,22 +89,11 @@ class RecommendationEngine:
         return suggestions
 
     def _get_user_current_asset_allocation(self, user_id):
-        """计算用户当前的资产配置比例和总金额"""
-        purchase_records = PurchaseRecord.objects.filter(user_id=user_id)
-        
-        allocation = {
-            'fund': 0,
-            'insurance': 0,
-            'stock': 0,
-        }
-        total_amount = 0
+        """计算用户当前的资产配置比例和总金额（按持仓市值汇总）"""
+        allocation = {'fund': 0, 'insurance': 0, 'stock': 0}
+        allocation.update(allocation_by_type(user_id))
+        total_amount = sum(allocation.values())
 
-        for record in purchase_records:
-            if record.purchase_type in allocation:
-                amount = float(record.amount)
-                allocation[record.purchase_type] += amount
-                total_amount += amount
-        
         if total_amount == 0:
             return None
 
@@ -87,181 +105,266 @@ class RecommendationEngine:
         return {'total_amount': total_amount, 'percentages': percentages}
 
     def _get_scientific_asset_allocation(self, risk_tolerance):
-        """根据风险偏好返回科学的资产配置比例"""
-        allocation_percentages = {}
-        if risk_tolerance == 'low':
-            allocation_percentages = { 'fund': 50, 'insurance': 30, 'stock': 20 }
-        elif risk_tolerance == 'medium':
-            allocation_percentages = { 'fund': 40, 'insurance': 30, 'stock': 30 }
-        elif risk_tolerance == 'high':
-            allocation_percentages = { 'fund': 30, 'insurance': 20, 'stock': 50 }
-        else:
-            # Default for unknown risk tolerance
-            allocation_percentages = { 'fund': 40, 'insurance': 30, 'stock': 30 }
-        return allocation_percentages
+        """根据风险偏好返回科学的资产配置比例（MPT有效前沿上的最优配置，按交易日预先计算）"""
+        allocations = get_target_allocations()
+        # Default for unknown risk tolerance
+        return allocations.get(risk_tolerance, allocations['medium'])
 
     def insurance_recommendation(self, user_profile, limit=5):
         """保险推荐算法 - 使用KNN和余弦相似度"""
         recommendations = []
-        
-        # 方法1: KNN基于用户画像
-        knn_recommendations = self._knn_insurance_recommendation(user_profile, limit)
-        recommendations.extend(knn_recommendations)
-        
-        # 方法2: 余弦相似度基于保险特征
-        cosine_recommendations = self._cosine_insurance_recommendation(user_profile, limit)
-        recommendations.extend(cosine_recommendations)
+        for _, strategy in self._insurance_strategies(user_profile, limit):
+            recommendations.extend(strategy())
         
         # 去重并排序
-        seen = set()
-        unique_recommendations = []
-        for rec in recommendations:
-            if rec['id'] not in seen:
-                seen.add(rec['id'])
-                unique_recommendations.append(rec)
+        return unique_by(recommendations, 'id', limit)
+    
+    async def insurance_recommendation_async(self, user_profile, limit=5):
+        """保险推荐（异步）：各策略并发执行，有策略降级时用热度推荐补足"""
+        recommendations, degraded = await run_strategies(self._insurance_strategies(user_profile, limit))
+        if degraded:
+            recommendations.extend(await self._fallback(lambda: self._popular_insurance_recommendation(limit)))
+        return unique_by(recommendations, 'id', limit)
+    
+    def _insurance_strategies(self, user_profile, limit):
+        """保险推荐的独立策略 [(名称, 无参函数)]：同步接口依次执行，异步接口并发执行"""
+        return [
+            # 方法1: 基于购买记录的协同过滤（有购买历史的用户）
+            ('item_cf', lambda: self._purchase_based_insurance_recommendation(user_profile, limit)),
+            # 方法2、3: KNN与余弦相似度只依赖用户画像，同一分群共用一次计算
+            ('profile', lambda: segment_cache.get_or_compute(
+                'insurance', user_profile, limit,
+                lambda profile: self._profile_insurance_recommendation(profile, limit)
+            )),
+        ]
+    
+    async def _fallback(self, popularity):
+        """降级时的热度推荐；热度推荐同样超时或出错时返回空列表"""
+        recommendations, _ = await run_strategies([('popularity', popularity)])
+        return recommendations
+    
+    def _profile_insurance_recommendation(self, user_profile, limit):
+        """基于用户画像的保险推荐：KNN + 余弦相似度"""
+        # KNN基于用户画像
+        recommendations = self._knn_insurance_recommendation(user_profile, limit)
+        # 余弦相似度基于保险特征
+        recommendations.extend(self._cosine_insurance_recommendation(user_profile, limit))
+        return recommendations
+    
+    @timed('popularity')
+    def _popular_insurance_recommendation(self, limit):
+        """热度保险推荐：购买人数最多的保险，尚无协同过滤模型时按目录顺序补足"""
+        catalog = catalog_index.insurances()
+        model = get_item_cf_model()
+        positions = []
+        if model is not None:
+            positions = [catalog.positions.get(product_id) for _, product_id, _ in model.popular('insurance', limit)]
+        positions = [pos for pos in positions if pos is not None]
+        positions += [pos for pos in range(min(limit, len(catalog))) if pos not in positions]
         
-        return unique_recommendations[:limit]
+        recommendations = []
+        for pos in positions[:limit]:
+            recommendations.append(dict(
+                catalog.rows[pos],
+                score=0.7,  # 基础分数
+                algorithm='Popularity',
+            ))
+        return recommendations
     
-    def _knn_insurance_recommendation(self, user_profile, limit):
-        """KNN保险推荐"""
-        # 获取所有保险产品
-        all_insurances = list(InsuranceProduct.objects.all())
-        if not all_insurances:
+    @timed('item_cf')
+    def collaborative_recommendation(self, user_profile, purchase_type=None, limit=5):
+        """基于购买记录的物品-物品协同过滤，返回 [(产品类型, 产品id, 分数), ...]"""
+        model = get_item_cf_model()
+        if model is None:
             return []
         
-        # 构建用户特征向量
-        user_features = self._build_user_features(user_profile)
-        
-        # 构建保险特征矩阵
-        insurance_features = []
-        for insurance in all_insurances:
-            features = self._build_insurance_features(insurance, user_profile)
-            insurance_features.append(features)
-        
-        # 使用KNN找到最相似的保险
-        if len(insurance_features) > 1:
-            knn = NearestNeighbors(n_neighbors=min(limit, len(insurance_features)), metric='euclidean')
-            knn.fit(insurance_features)
-            distances, indices = knn.kneighbors([user_features])
-            
-            recommendations = []
-            for idx in indices[0]:
-                insurance = all_insurances[idx]
-                recommendations.append({
-                    'id': insurance.id,
-                    'name': insurance.name,
-                    'category': insurance.category,
-                    'subcategory': insurance.subcategory,
-                    'coverage_summary': insurance.coverage_summary,
-                    'payout_limit': insurance.payout_limit,
-                    'base_premium': insurance.base_premium,
-                    'score': 1.0 / (distances[0][idx] + 1e-6),
-                    'algorithm': 'KNN'
-                })
-            return recommendations
-        return []
+        # 直接读取用户当前持有的产品，新购买无需等待模型重新训练
+        return model.score(self._get_held_items(user_profile), purchase_type=purchase_type, limit=limit)
+    
+    def _get_held_items(self, user_profile):
+        """用户当前持有的产品 [(产品类型, 产品id), ...]（已全部卖出的产品持仓成本为0，不再计入）"""
+        return list(Holding.objects.filter(
+            user_id=user_profile.id, cost_basis__gt=0
+        ).values_list('product_type', 'product_id'))
+    
+    def _purchase_based_insurance_recommendation(self, user_profile, limit):
+        """基于购买记录协同过滤的保险推荐"""
+        catalog = catalog_index.insurances()
+        recommendations = []
+        for _, product_id, score in self.collaborative_recommendation(user_profile, 'insurance', limit):
+            pos = catalog.positions.get(product_id)
+            if pos is not None:
+                recommendations.append(dict(
+                    catalog.rows[pos],
+                    score=score,
+                    algorithm='Item-based CF',
+                ))
+        return recommendations
+    
+    def _knn_insurance_recommendation(self, user_profile, limit):
+        """KNN保险推荐"""
+        return self.knn_insurance_recommendation_batch([user_profile], limit)[0]
+    
+    @timed('knn')
+    def knn_insurance_recommendation_batch(self, user_profiles, limit):
+        """批量KNN保险推荐，按年龄段分组后一次查询多个用户，返回与 user_profiles 对应的推荐列表"""
+        catalog = catalog_index.insurances()
+        results = [[] for _ in user_profiles]
+        
+        # 按年龄段分组，同组用户共用同一个已拟合的KNN索引
+        groups = defaultdict(list)
+        for pos, user_profile in enumerate(user_profiles):
+            groups[insurance_age_bucket(user_profile.age)].append(pos)
+        
+        for bucket, positions in groups.items():
+            user_features = [self._build_user_features(user_profiles[pos]) for pos in positions]
+            distances, indices = catalog.knn_query(bucket, user_features, limit)
+            for row, pos in enumerate(positions):
+                # 距离与下标按结果位置一一对应
+                for distance, idx in zip(distances[row], indices[row]):
+                    results[pos].append(dict(
+                        catalog.rows[idx],
+                        score=1.0 / (float(distance) + 1e-6),
+                        algorithm='KNN',
+                    ))
+        return results
     
+    @timed('cosine')
     def _cosine_insurance_recommendation(self, user_profile, limit):
         """余弦相似度保险推荐"""
-        all_insurances = list(InsuranceProduct.objects.all())
-        if not all_insurances:
+        catalog = catalog_index.insurances()
+        if not len(catalog):
             return []
         
         # 构建用户偏好向量
         user_vector = self._build_user_preference_vector(user_profile)
         
-        # 计算每个保险的相似度
-        similarities = []
-        for insurance in all_insurances:
-            insurance_vector = self._build_insurance_vector(insurance)
-            similarity = cosine_similarity([user_vector], [insurance_vector])[0][0]
-            similarities.append((insurance, similarity))
-        
-        # 按相似度排序
-        similarities.sort(key=lambda x: x[1], reverse=True)
+        # 一次矩阵-向量乘法得到所有保险的相似度，取Top-K
+        indices, similarities = cosine_top_k(catalog.normalized_vectors, user_vector, limit)
         
         recommendations = []
-        for insurance, similarity in similarities[:limit]:
-            recommendations.append({
-                'id': insurance.id,
-                'name': insurance.name,
-                'category': insurance.category,
-                'subcategory': insurance.subcategory,
-                'coverage_summary': insurance.coverage_summary,
-                'payout_limit': insurance.payout_limit,
-                'base_premium': insurance.base_premium,
-                'score': similarity,
-                'algorithm': 'Cosine Similarity'
-            })
+        for idx, similarity in zip(indices, similarities):
+            recommendations.append(dict(
+                catalog.rows[idx],
+                score=float(similarity),
+                algorithm='Cosine Similarity',
+            ))
         
         return recommendations
     
     def fund_recommendation(self, user_profile, clicked_fund_id=None, limit=5):
         """基金推荐算法 - 使用协同过滤和FP-Growth思想"""
         recommendations = []
+        for _, strategy in self._fund_strategies(user_profile, clicked_fund_id, limit):
+            recommendations.extend(strategy())
         
-        # 方法1: 基于点击历史的协同过滤
-        if clicked_fund_id:
-            cf_recommendations = self._collaborative_filtering_fund(user_profile, clicked_fund_id, limit)
-            recommendations.extend(cf_recommendations)
-        
-        # 方法2: 基于用户风险偏好的推荐
-        risk_recommendations = self._risk_based_fund_recommendation(user_profile, limit)
-        recommendations.extend(risk_recommendations)
-        
-        # 方法3: 热度推荐（新用户）
+        # 方法5: 热度推荐（新用户）
         if not recommendations:
             popularity_recommendations = self._popular_fund_recommendation(limit)
             recommendations.extend(popularity_recommendations)
         
         # 去重并排序
-        seen = set()
-        unique_recommendations = []
-        for rec in recommendations:
-            if rec['id'] not in seen:
-                seen.add(rec['id'])
-                unique_recommendations.append(rec)
-        
-        return unique_recommendations[:limit]
+        return unique_by(recommendations, 'id', limit)
+    
+    async def fund_recommendation_async(self, user_profile, clicked_fund_id=None, limit=5):
+        """基金推荐（异步）：各策略并发执行，新用户或有策略降级时用热度推荐补足"""
+        recommendations, degraded = await run_strategies(self._fund_strategies(user_profile, clicked_fund_id, limit))
+        if degraded or not recommendations:
+            recommendations.extend(await self._fallback(lambda: self._popular_fund_recommendation(limit)))
+        return unique_by(recommendations, 'id', limit)
+    
+    def _fund_strategies(self, user_profile, clicked_fund_id, limit):
+        """基金推荐的独立策略 [(名称, 无参函数)]"""
+        strategies = []
+        # 方法1: 基于点击历史的协同过滤
+        if clicked_fund_id:
+            strategies.append(
+                ('click_cf', lambda: self._collaborative_filtering_fund(user_profile, clicked_fund_id, limit))
+            )
+        strategies += [
+            # 方法2: 基于购买记录的协同过滤
+            ('item_cf', lambda: self._purchase_based_fund_recommendation(user_profile, limit)),
+            # 方法3: FP-Growth关联规则（购买了A的用户也购买了B）
+            ('association', lambda: self._association_fund_recommendation(user_profile, limit)),
+            # 方法4: 基于用户风险偏好的推荐（同一分群共用一次计算）
+            ('risk_based', lambda: segment_cache.get_or_compute(
+                'fund', user_profile, limit,
+                lambda profile: self._risk_based_fund_recommendation(profile, limit)
+            )),
+        ]
+        return strategies
     
+    @timed('click_cf')
     def _collaborative_filtering_fund(self, user_profile, clicked_fund_id, limit):
         """基于协同过滤的基金推荐"""
-        try:
-            clicked_fund = Fund.objects.get(id=clicked_fund_id)
-        except Fund.DoesNotExist:
+        catalog = catalog_index.funds()
+        clicked_pos = catalog.positions.get(clicked_fund_id)
+        if clicked_pos is None:
             return []
         
-        # 获取所有基金
-        all_funds = list(Fund.objects.exclude(id=clicked_fund_id))
-        
-        # 基于基金特征的相似度计算
-        clicked_features = self._build_fund_features(clicked_fund)
+        # 优先读取离线计算的近邻表（一次索引读取）
+        neighbors = FundNeighbor.objects.filter(fund_id=clicked_fund_id).order_by('rank').values_list('neighbor_id', 'score')[:limit]
+        recommendations = []
+        for neighbor_id, similarity in neighbors:
+            pos = catalog.positions.get(neighbor_id)
+            if pos is not None:
+                recommendations.append(dict(
+                    catalog.rows[pos],
+                    score=similarity,
+                    algorithm='Collaborative Filtering',
+                ))
+        if recommendations:
+            return recommendations
         
-        similarities = []
-        for fund in all_funds:
-            fund_features = self._build_fund_features(fund)
-            similarity = cosine_similarity([clicked_features], [fund_features])[0][0]
-            similarities.append((fund, similarity))
+        # 近邻表尚未构建时，基于基金特征实时计算相似度（排除被点击的基金）
+        indices, similarities = cosine_top_k(
+            catalog.normalized_features, catalog.features[clicked_pos], limit, exclude=clicked_pos
+        )
         
-        # 按相似度排序
-        similarities.sort(key=lambda x: x[1], reverse=True)
+        for idx, similarity in zip(indices, similarities):
+            recommendations.append(dict(
+                catalog.rows[idx],
+                score=float(similarity),
+                algorithm='Collaborative Filtering',
+            ))
         
+        return recommendations
+    
+    def _purchase_based_fund_recommendation(self, user_profile, limit):
+        """基于购买记录协同过滤的基金推荐"""
+        catalog = catalog_index.funds()
         recommendations = []
-        for fund, similarity in similarities[:limit]:
-            recommendations.append({
-                'id': fund.id,
-                'code': fund.code,
-                'name': fund.name,
-                'type': fund.fund_type,
-                'managers': fund.managers,
-                'company': fund.company,
-                'star_count': fund.star_count,
-                'score': similarity,
-                'algorithm': 'Collaborative Filtering'
-            })
+        for _, fund_id, score in self.collaborative_recommendation(user_profile, 'fund', limit):
+            pos = catalog.positions.get(fund_id)
+            if pos is not None:
+                recommendations.append(dict(
+                    catalog.rows[pos],
+                    score=score,
+                    algorithm='Item-based CF',
+                ))
+        return recommendations
+    
+    @timed('association')
+    def _association_fund_recommendation(self, user_profile, limit):
+        """基于FP-Growth关联规则的基金推荐"""
+        rule_index = get_rule_index()
+        if rule_index is None:
+            return []
         
+        held_keys = {item_key(purchase_type, product_id) for purchase_type, product_id in self._get_held_items(user_profile)}
+        catalog = catalog_index.funds()
+        recommendations = []
+        for key, confidence in rule_index.recommend(held_keys, prefix='fund:', limit=limit):
+            pos = catalog.positions.get(int(key.split(':', 1)[1]))
+            if pos is not None:
+                recommendations.append(dict(
+                    catalog.rows[pos],
+                    score=confidence,
+                    algorithm='FP-Growth',
+                ))
         return recommendations
     
+    @timed('risk_based')
     def _risk_based_fund_recommendation(self, user_profile, limit):
         """基于风险偏好的基金推荐"""
         # 根据风险偏好映射到基金类型
@@ -272,145 +375,189 @@ class RecommendationEngine:
         }
         
         allowed_fund_types = risk_mapping.get(user_profile.risk_tolerance, ['货币型', '债券型'])
-        suitable_funds = Fund.objects.filter(fund_type__in=allowed_fund_types)
+        catalog = catalog_index.funds()
+        suitable = np.flatnonzero(np.isin(catalog.fund_types, allowed_fund_types))
         
         # 按星级排序
-        sorted_funds = sorted(suitable_funds, 
-                            key=lambda x: x.star_count if x.star_count else 0, 
-                            reverse=True)
+        stars = np.maximum(catalog.star_counts[suitable], 0)
+        sorted_funds = suitable[np.argsort(-stars, kind='stable')]
         
         recommendations = []
-        for fund in sorted_funds[:limit]:
-            recommendations.append({
-                'id': fund.id,
-                'code': fund.code,
-                'name': fund.name,
-                'type': fund.fund_type,
-                'managers': fund.managers,
-                'company': fund.company,
-                'star_count': fund.star_count,
-                'score': 0.8,  # 基础分数
-                'algorithm': 'Risk-Based'
-            })
+        for idx in sorted_funds[:limit]:
+            recommendations.append(dict(
+                catalog.rows[idx],
+                score=0.8,  # 基础分数
+                algorithm='Risk-Based',
+            ))
         
         return recommendations
     
+    @timed('popularity')
     def _popular_fund_recommendation(self, limit):
         """热度基金推荐"""
-        # 按星级排序
-        popular_funds = Fund.objects.all().order_by('-star_count')[:limit]
+        # 按星级排序（无星级的排在最后）
+        catalog = catalog_index.funds()
+        popular_funds = np.argsort(-catalog.star_counts, kind='stable')[:limit]
         
         recommendations = []
-        for fund in popular_funds:
-            recommendations.append({
-                'id': fund.id,
-                'code': fund.code,
-                'name': fund.name,
-                'type': fund.fund_type,
-                'managers': fund.managers,
-                'company': fund.company,
-                'star_count': fund.star_count,
-                'score': 0.7,  # 基础分数
-                'algorithm': 'Popularity'
-            })
+        for idx in popular_funds:
+            recommendations.append(dict(
+                catalog.rows[idx],
+                score=0.7,  # 基础分数
+                algorithm='Popularity',
+            ))
         
         return recommendations
     
     def stock_recommendation(self, user_profile, limit=5):
-        """股票推荐算法 - 使用行业相关性和趋势分析"""
+        """股票推荐算法 - 使用行业相关性和趋势分析（只依赖用户画像，按分群缓存）"""
+        return segment_cache.get_or_compute(
+            'stock', user_profile, limit,
+            lambda profile: self._profile_stock_recommendation(profile, limit)
+        )
+    
+    async def stock_recommendation_async(self, user_profile, limit=5):
+        """股票推荐（异步）：分群缓存未命中时各策略并发执行；降级结果用热度推荐补足且不写入缓存"""
+        cached = await run_in_pool(lambda: segment_cache.get('stock', user_profile, limit))
+        if cached is not None:
+            return cached
+        
+        profile = representative_profile(profile_segment(user_profile))
+        recommendations, degraded = await run_strategies(self._stock_strategies(profile, limit))
+        if degraded:
+            recommendations.extend(await self._fallback(lambda: self._popular_stock_recommendation(limit)))
+            return unique_by(recommendations, 'code', limit)
+        
+        recommendations = unique_by(recommendations, 'code', limit)
+        await run_in_pool(lambda: segment_cache.set('stock', user_profile, limit, recommendations))
+        return recommendations
+    
+    def _profile_stock_recommendation(self, user_profile, limit):
+        """基于用户画像的股票推荐"""
         recommendations = []
-        
-        # 方法1: 行业相关性推荐
-        industry_recommendations = self._industry_based_stock_recommendation(user_profile, limit)
-        recommendations.extend(industry_recommendations)
-        
-        # 方法2: 趋势分析推荐
-        trend_recommendations = self._trend_based_stock_recommendation(limit)
-        recommendations.extend(trend_recommendations)
+        for _, strategy in self._stock_strategies(user_profile, limit):
+            recommendations.extend(strategy())
         
         # 去重并排序
-        seen = set()
-        unique_recommendations = []
-        for rec in recommendations:
-            if rec['code'] not in seen:
-                seen.add(rec['code'])
-                unique_recommendations.append(rec)
-        
-        return unique_recommendations[:limit]
+        return unique_by(recommendations, 'code', limit)
+    
+    def _stock_strategies(self, user_profile, limit):
+        """股票推荐的独立策略 [(名称, 无参函数)]"""
+        return [
+            # 方法1: 行业相关性推荐
+            ('industry', lambda: self._industry_based_stock_recommendation(user_profile, limit)),
+            # 方法2: 趋势分析推荐
+            ('trend', lambda: self._trend_based_stock_recommendation(limit)),
+        ]
     
-    def _industry_based_stock_recommendation(self, user_profile, limit):
-        """基于行业相关性的股票推荐"""
-        # 获取所有股票
-        all_stocks = list(StockInfo.objects.all())
+    @timed('industry')
+    def _industry_based_stock_recommendation(self, user_profile, limit, exploration=0.0, seed=0):
+        """基于行业相关性的股票推荐
+
+        分数 = 风险偏好行业匹配 * 0.6 + 行业质量分（最新交易日的行业统计）* 0.4，对全部股票向量化计算。
+        exploration > 0 时加入按 (seed, 交易日) 确定的随机探索项，相同输入结果仍然相同。
+        """
+        stocks = catalog_index.stocks()
+        if not len(stocks):
+            return []
+        stats = get_industry_stats()
+        quotes = get_quote_index()
+        
+        # 基于风险偏好选择行业
+        preferred_industries = self.RISK_INDUSTRY_MAPPING.get(user_profile.risk_tolerance, ['银行', '公用事业'])
+        industry_scores = np.where(np.isin(stocks.industries, preferred_industries), 1.0, 0.3)
+        quality_scores = 0.5 + 0.4 * stats.lookup(stocks.industries, stats.quality(user_profile.risk_tolerance))
+        total_scores = industry_scores * 0.6 + quality_scores * 0.4
+        if exploration:
+            day = stats.trade_date.toordinal() if stats.trade_date else 0
+            total_scores = total_scores + exploration * np.random.default_rng([seed, day]).random(len(stocks))
         
         recommendations = []
-        for stock in all_stocks:
-            # 基于风险偏好选择行业
-            risk_industry_mapping = {
-                'low': ['银行', '公用事业', '食品饮料'],
-                'medium': ['银行', '公用事业', '食品饮料', '医药生物', '电子'],
-                'high': ['计算机', '传媒', '通信', '电子', '医药生物']
-            }
-            
-            preferred_industries = risk_industry_mapping.get(user_profile.risk_tolerance, ['银行', '公用事业'])
-            industry_score = 1.0 if stock.industry in preferred_industries else 0.3
-            
-            # 综合分数（行业相关性 + 随机因素）
-            import random
-            random_score = random.uniform(0.5, 0.9)
-            total_score = industry_score * 0.6 + random_score * 0.4
-            
+        for idx in top_k(total_scores, limit):
+            stock = stocks.rows[idx]
             recommendations.append({
-                'code': stock.ts_code,
-                'symbol': stock.symbol,
-                'name': stock.name,
-                'industry': stock.industry,
-                'area': stock.area,
-                'score': total_score,
+                'code': stock['code'],
+                'symbol': stock['symbol'],
+                'name': stock['name'],
+                'industry': stock['industry'],
+                'area': stock['area'],
+                'current_price': quotes.price(stock['code']),
+                'score': float(total_scores[idx]),
                 'algorithm': 'Industry Correlation'
             })
+        return recommendations
+    
+    @timed('trend')
+    def _trend_based_stock_recommendation(self, limit, window=20):
+        """基于趋势分析的股票推荐（在列式行情存储上对全部股票向量化计算）"""
+        store = get_price_store()
+        if not len(store.dates):
+            return []
         
-        # 按分数排序
-        recommendations.sort(key=lambda x: x['score'], reverse=True)
-        return recommendations[:limit]
-    
-    def _trend_based_stock_recommendation(self, limit):
-        """基于趋势分析的股票推荐"""
-        # 获取最新的股票数据（按交易日期排序）
-        from django.db.models import Max
-        latest_date = StockDailyData.objects.aggregate(Max('trade_date'))['trade_date__max']
-        
-        if latest_date:
-            # 获取最新日期的股票数据
-            latest_stocks = StockDailyData.objects.filter(trade_date=latest_date)
-            
-            recommendations = []
-            for stock_data in latest_stocks:
-                try:
-                    stock_info = StockInfo.objects.get(ts_code=stock_data.ts_code)
-                    
-                    # 计算趋势分数（基于涨跌幅）
-                    pct_chg_value = stock_data.pct_chg if stock_data.pct_chg is not None else 0.0
-                    trend_score = min(1.0, max(0.1, abs(pct_chg_value) / 10.0 + 0.5))
-                    
-                    recommendations.append({
-                        'code': stock_info.ts_code,
-                        'symbol': stock_info.symbol,
-                        'name': stock_info.name,
-                        'industry': stock_info.industry,
-                        'current_price': stock_data.close,
-                        'change_rate': stock_data.pct_chg,
-                        'score': trend_score,
-                        'algorithm': 'Trend Analysis'
-                    })
-                except StockInfo.DoesNotExist:
-                    continue
-            
-            # 按分数排序
-            recommendations.sort(key=lambda x: x['score'], reverse=True)
-            return recommendations[:limit]
+        # 风险调整后的区间动量：区间涨幅 / (日波动率 * sqrt(区间长度))
+        latest_close = store.latest('close')
+        momentum = store.momentum(window)
+        volatility = store.volatility(window)
+        n_days = min(window, len(store.dates) - 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            risk_adjusted = momentum / (volatility * math.sqrt(max(n_days, 1)) + 1e-6)
+        trend_scores = np.clip(0.5 + 0.5 * np.tanh(np.nan_to_num(risk_adjusted) / 2.0), 0.1, 1.0)
+        # 只推荐最新交易日有行情的股票
+        trend_scores[np.isnan(latest_close)] = -np.inf
+        candidates = top_k(trend_scores, np.count_nonzero(np.isfinite(trend_scores)))
+        
+        latest_pct_chg = store.latest('pct_chg')
+        stocks = catalog_index.stocks()
+        recommendations = []
+        for idx in candidates:
+            stock_info = stocks.get(store.codes[idx])
+            if stock_info is None:
+                continue
+            recommendations.append({
+                'code': stock_info['code'],
+                'symbol': stock_info['symbol'],
+                'name': stock_info['name'],
+                'industry': stock_info['industry'],
+                'current_price': float(latest_close[idx]),
+                'change_rate': float(latest_pct_chg[idx]),
+                'score': float(trend_scores[idx]),
+                'algorithm': 'Trend Analysis'
+            })
+            if len(recommendations) >= limit:
+                break
         
-        return []
+        return recommendations
+    
+    @timed('popularity')
+    def _popular_stock_recommendation(self, limit):
+        """热度股票推荐：最新交易日成交额最高的股票"""
+        store = get_price_store()
+        if not len(store.dates):
+            return []
+        
+        latest_close = store.latest('close')
+        latest_pct_chg = store.latest('pct_chg')
+        amounts = np.nan_to_num(store.latest('amount'), nan=-np.inf)
+        stocks = catalog_index.stocks()
+        recommendations = []
+        for idx in top_k(amounts, np.count_nonzero(np.isfinite(amounts))):
+            stock_info = stocks.get(store.codes[idx])
+            if stock_info is None:
+                continue
+            recommendations.append({
+                'code': stock_info['code'],
+                'symbol': stock_info['symbol'],
+                'name': stock_info['name'],
+                'industry': stock_info['industry'],
+                'current_price': float(latest_close[idx]),
+                'change_rate': float(latest_pct_chg[idx]),
+                'score': 0.7,  # 基础分数
+                'algorithm': 'Popularity'
+            })
+            if len(recommendations) >= limit:
+                break
+        
+        return recommendations
     
     def _build_user_features(self, user_profile):
         """构建用户特征向量"""
@@ -430,6 +577,12 @@ class RecommendationEngine:
     
     def _build_insurance_features(self, insurance, user_profile):
         """构建保险特征向量"""
+        # Handle user_profile.age being None
+        user_age = user_profile.age if user_profile.age is not None else 25 
+        return self._build_insurance_features_for_age(insurance, user_age)
+    
+    def _build_insurance_features_for_age(self, insurance, user_age):
+        """按用户年龄构建保险特征向量"""
         # 保费估算（从base_premium中提取数字）
         import re
         premium_match = re.search(r'(\d+)', insurance.base_premium)
@@ -447,9 +600,6 @@ class RecommendationEngine:
         tags = insurance.tags.lower() if insurance.tags else ''
         tag_score = 0.5
         
-        # Handle user_profile.age being None
-        user_age = user_profile.age if user_profile.age is not None else 25 
-
         if user_age < 30 and '年轻人' in tags:
             tag_score = 0.9
         elif user_age >= 30 and user_age < 50 and '家庭' in tags:
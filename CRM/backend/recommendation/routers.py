@@ -0,0 +1,48 @@
+"""读写分离数据库路由
+
+配置了 replica 数据库别名时，产品目录、行情与离线计算结果（可容忍短暂复制延迟的只读数据）
+从只读副本读取；用户、交易、持仓的读写以及所有写操作都走主库。
+事务内的读取、以及 read_from_primary() 范围内的读取也走主库：
+进程内的目录/行情等索引按版本号缓存，重建时若读到落后的副本，会一直缓存旧数据直到下一次版本递增。
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = 'replica'
+REPLICA_MODELS = {'fund', 'insuranceproduct', 'stockinfo', 'stockdailydata', 'fundneighbor', 'industrydailystat'}
+
+_local = threading.local()
+
+
+@contextmanager
+def read_from_primary():
+    """范围内（当前线程）的查询都从主库读取"""
+    depth = getattr(_local, 'primary', 0)
+    _local.primary = depth + 1
+    try:
+        yield
+    finally:
+        _local.primary = depth
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != 'recommendation' or model._meta.model_name not in REPLICA_MODELS:
+            return None
+        if REPLICA_ALIAS not in settings.DATABASES or getattr(_local, 'primary', 0):
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None  # 事务内读取本事务可能刚写入的数据
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # 副本与主库是同一份数据
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS  # 副本的结构随复制（或 sync_sqlite_replica）从主库同步
@@ -0,0 +1,46 @@
+"""向量化相似度打分
+
+所有基于相似度的推荐共用同一条打分路径：目录矩阵按行预先L2归一化，
+请求时只做一次矩阵-向量乘法，再用 argpartition 取 Top-K，避免逐个产品调用
+cosine_similarity 并对整个目录排序。
+"""
+import numpy as np
+
+
+def normalize_rows(matrix):
+    """按行L2归一化，零向量保持为零（与 cosine_similarity 的约定一致）"""
+    matrix = np.asarray(matrix, dtype=np.float64)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores, k, exclude=None):
+    """返回分数最高的 k 个下标（按分数降序，分数相同时下标小的在前）"""
+    scores = np.asarray(scores, dtype=np.float64)
+    if exclude is not None:
+        scores = scores.copy()
+        scores[exclude] = -np.inf
+        n_valid = scores.size - np.size(np.unique(exclude))
+    else:
+        n_valid = scores.size
+    k = min(k, n_valid)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    if k < scores.size:
+        # 先取出分数不低于第 k 名的候选，保证并列时结果与完整排序一致
+        kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        candidates = np.flatnonzero(scores >= kth)
+    else:
+        candidates = np.arange(scores.size)
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order[:k]]
+
+
+def cosine_top_k(normalized_matrix, vector, k, exclude=None):
+    """用一次矩阵-向量乘法计算余弦相似度并返回 (Top-K下标, 对应分数)"""
+    query = normalize_rows(np.asarray(vector, dtype=np.float64).reshape(1, -1))[0]
+    scores = normalized_matrix @ query
+    indices = top_k(scores, k, exclude=exclude)
+    return indices, scores[indices]
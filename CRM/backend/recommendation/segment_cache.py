@@ -0,0 +1,135 @@
+"""用户分群推荐结果缓存
+
+非个性化部分的推荐（KNN/余弦保险、风险偏好基金、股票）只依赖风险偏好、年龄和资产，
+按 (风险等级, 年龄段, 资产档位) 把用户分群，同一分群用代表画像计算一次，结果以
+分群指纹 + 目录/行情版本号为键写入 Django 缓存（RECOMMENDATION_CACHE_ALIAS），
+由缓存后端负责过期（TTL）与容量淘汰（本地内存后端为LRU）。
+同一进程内对同一键的并发未命中只计算一次。
+"""
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .catalog import INSURANCE_AGE_BUCKETS, get_catalog_version, insurance_age_bucket
+from .market_data import get_market_version
+from .models import User
+
+# 资产档位：(上限, 名称, 代表资产)
+ASSET_BUCKETS = (
+    (50000, 'lt50k', 20000),
+    (200000, 'lt200k', 100000),
+    (1000000, 'lt1m', 500000),
+    (5000000, 'lt5m', 2000000),
+    (None, 'gte5m', 10000000),
+)
+DEFAULT_TOTAL_ASSETS = 100000
+RISK_LEVELS = {level for level, _ in User.RISK_CHOICES}
+KEY_PREFIX = 'recommendation:segment'
+
+
+def asset_bucket(total_assets):
+    total_assets = float(total_assets) if total_assets is not None else DEFAULT_TOTAL_ASSETS
+    for upper, name, _ in ASSET_BUCKETS:
+        if upper is None or total_assets < upper:
+            return name
+
+
+def profile_segment(user_profile):
+    """用户分群指纹 (风险等级, 年龄段, 资产档位)"""
+    risk_tolerance = user_profile.risk_tolerance if user_profile.risk_tolerance in RISK_LEVELS else 'medium'
+    return risk_tolerance, insurance_age_bucket(user_profile.age), asset_bucket(user_profile.total_assets)
+
+
+def representative_profile(segment):
+    """分群的代表画像（未保存的用户对象）"""
+    risk_tolerance, age_bucket, assets_bucket = segment
+    total_assets = next(assets for _, name, assets in ASSET_BUCKETS if name == assets_bucket)
+    return User(
+        username=f"segment-{risk_tolerance}-{age_bucket}-{assets_bucket}",
+        risk_tolerance=risk_tolerance,
+        age=INSURANCE_AGE_BUCKETS[age_bucket],
+        total_assets=total_assets,
+    )
+
+
+class SegmentCache:
+    """按用户分群缓存推荐结果，并统计命中/未命中次数"""
+
+    def __init__(self, alias=None):
+        self._alias = alias
+        self._lock = threading.Lock()
+        self._key_locks = defaultdict(threading.Lock)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[self._alias or settings.RECOMMENDATION_CACHE_ALIAS]
+
+    def key(self, kind, segment, limit):
+        return ':'.join([
+            KEY_PREFIX, kind, str(limit), *segment,
+            str(get_catalog_version()), str(get_market_version()),
+        ])
+
+    def get_or_compute(self, kind, user_profile, limit, compute):
+        """返回该用户所在分群的缓存结果，未命中时用代表画像调用 compute(profile) 计算"""
+        segment = profile_segment(user_profile)
+        key = self.key(kind, segment, limit)
+        result = self.cache.get(key)
+        if result is not None:
+            self._count(hit=True)
+            return result
+
+        with self._lock:
+            key_lock = self._key_locks[key]
+        with key_lock:
+            # 等待锁期间可能已由其他线程算好
+            result = self.cache.get(key)
+            if result is not None:
+                self._count(hit=True)
+                return result
+            self._count(hit=False)
+            result = compute(representative_profile(segment))
+            self.cache.set(key, result)
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return result
+
+    def get(self, kind, user_profile, limit):
+        """只查缓存：返回该用户所在分群的缓存结果，未命中返回 None（异步接口自行计算后调用 set）"""
+        result = self.cache.get(self.key(kind, profile_segment(user_profile), limit))
+        self._count(hit=result is not None)
+        return result
+
+    def set(self, kind, user_profile, limit, result):
+        self.cache.set(self.key(kind, profile_segment(user_profile), limit), result)
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        """本进程的命中/未命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+    def clear(self):
+        """清空缓存与统计"""
+        self.cache.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+segment_cache = SegmentCache()
@@ -61,7 +61,7 @@ class PurchaseRequestSerializer(serializers.Serializer):
     product_type = serializers.ChoiceField(choices=['fund', 'insurance', 'stock'])
     product_id = serializers.IntegerField()
     amount = serializers.DecimalField(max_digits=15, decimal_places=2, min_value=0.01)
-    quantity = serializers.IntegerField(required=False, allow_null=True)
+    quantity = serializers.IntegerField(required=False, allow_null=True, min_value=1)  # 卖出只能走股票交易接口
 
 class StockPurchaseRequestSerializer(serializers.Serializer):
     """股票购买请求序列化器"""
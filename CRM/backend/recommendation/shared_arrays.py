@@ -0,0 +1,179 @@
+"""进程间共享的只读数组段
+
+把一组 NumPy 数组发布为版本化的段目录（每个数组一个 .npy 文件 + header.json），
+写完后通过 CURRENT 指针原子切换；各 Web 工作进程以只读内存映射方式挂载，
+同一份物理页由操作系统页缓存在所有进程间共享，增加工作进程不会成倍增加内存。
+
+段按类别存放在 RECOMMENDATION_MODEL_DIR/<类别>/<段名>/，header 中记录数据版本，
+挂载方据此判断段是否对应当前数据。
+"""
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+from django.conf import settings
+
+POINTER = 'CURRENT'
+HEADER = 'header.json'
+KEEP = 2  # 每个类别保留的段数，刚切换时仍有进程映射着上一份
+
+
+class ArraySegment:
+    """已挂载的段：header 字典与 {名称: 只读数组}"""
+
+    def __init__(self, name, header, arrays):
+        self.name = name
+        self.header = header
+        self.arrays = arrays
+
+    def __getitem__(self, key):
+        return self.arrays[key]
+
+
+def segment_root(kind):
+    return os.path.join(settings.RECOMMENDATION_MODEL_DIR, kind)
+
+
+def current_segment(kind):
+    """CURRENT 指向的段名，没有已发布的段时返回 None"""
+    try:
+        with open(os.path.join(segment_root(kind), POINTER), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def pointer_path(kind):
+    """CURRENT 指针文件路径（其修改时间可用于判断是否发布了新段）"""
+    return os.path.join(segment_root(kind), POINTER)
+
+
+def publish_segment(kind, arrays, **header):
+    """写出一个新段并原子切换 CURRENT，返回段名
+
+    字符串数组需为定长 Unicode（object 数组无法内存映射）。
+    """
+    root = segment_root(kind)
+    name = str(time.time_ns())
+    path = os.path.join(root, name)
+    tmp_path = f"{path}.tmp"
+    os.makedirs(tmp_path)
+    for key, array in arrays.items():
+        np.save(os.path.join(tmp_path, f'{key}.npy'), np.ascontiguousarray(array), allow_pickle=False)
+    with open(os.path.join(tmp_path, HEADER), 'w', encoding='utf-8') as f:
+        json.dump(dict(header, arrays=sorted(arrays)), f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+    pointer = pointer_path(kind)
+    with open(f"{pointer}.tmp", 'w', encoding='utf-8') as f:
+        f.write(name)
+    os.replace(f"{pointer}.tmp", pointer)
+    _prune(root)
+    return name
+
+
+def attach_segment(kind, name=None):
+    """以只读内存映射挂载当前（或指定的）段；没有段或段已被清理时返回 None"""
+    name = name or current_segment(kind)
+    if name is None:
+        return None
+    path = os.path.join(segment_root(kind), name)
+    try:
+        with open(os.path.join(path, HEADER), encoding='utf-8') as f:
+            header = json.load(f)
+        arrays = {
+            key: np.load(os.path.join(path, f'{key}.npy'), mmap_mode='r', allow_pickle=False)
+            for key in header['arrays']
+        }
+    except FileNotFoundError:
+        return None
+    return ArraySegment(name, header, arrays)
+
+
+def _prune(root, keep=KEEP):
+    """删除较旧的段（已映射这些文件的进程在 POSIX 系统上不受影响）"""
+    names = sorted((name for name in os.listdir(root) if name.isdigit()), key=int)
+    for name in names[:-keep]:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def fixed_width(values):
+    """把字符串序列转换为可内存映射的定长 Unicode 数组（None 记为空字符串）"""
+    values = ['' if value is None else str(value) for value in values]
+    width = max((len(value) for value in values), default=0)
+    return np.array(values, dtype=f'<U{max(width, 1)}')
+
+
+def encode_rows(rows, fields):
+    """把字典行按列编码为可内存映射的数组：数值列为 int64/float64，其余为定长 Unicode，
+    含 None 的列另存 <字段>__null 布尔掩码"""
+    arrays = {}
+    for field in fields:
+        values = [row[field] for row in rows]
+        present = [value for value in values if value is not None]
+        if not values:
+            column = np.empty(0, dtype=np.int64)  # 空目录：保证 id 列仍可按整数查找
+        elif present and all(isinstance(value, int) and not isinstance(value, bool) for value in present):
+            column = np.array([0 if value is None else value for value in values], dtype=np.int64)
+        elif present and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+            column = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        else:
+            column = fixed_width(values)
+        arrays[field] = column
+        if len(present) < len(values):
+            arrays[f'{field}__null'] = np.array([value is None for value in values], dtype=bool)
+    return arrays
+
+
+class ColumnRows:
+    """按列存储的只读行序列，按下标访问时才组装成字典（值为 Python 原生类型）"""
+
+    def __init__(self, arrays, fields):
+        self.columns = [(field, arrays[field], arrays.get(f'{field}__null')) for field in fields]
+        self._length = len(arrays[fields[0]])
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, pos):
+        return {
+            field: None if nulls is not None and nulls[pos] else column[pos].item()
+            for field, column, nulls in self.columns
+        }
+
+    def __iter__(self):
+        return (self[pos] for pos in range(self._length))
+
+
+class SortedPositions:
+    """键 → 下标的只读映射，在有序键数组上二分查找，可直接建立在内存映射的段上
+
+    keys 为升序键数组；positions 给出时，keys[i] 对应的下标为 positions[i]（keys 本身不是行顺序时使用）。
+    """
+
+    def __init__(self, keys, positions=None):
+        self.keys = keys
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.keys)
+
+    def get(self, key, default=None):
+        try:
+            idx = int(np.searchsorted(self.keys, key))
+        except (TypeError, ValueError):
+            return default
+        if idx >= len(self.keys) or self.keys[idx] != key:
+            return default
+        return idx if self.positions is None else int(self.positions[idx])
+
+    def __getitem__(self, key):
+        pos = self.get(key)
+        if pos is None:
+            raise KeyError(key)
+        return pos
+
+    def __contains__(self, key):
+        return self.get(key) is not None
@@ -0,0 +1,23 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import invalidate_catalog
+from .middleware import record_query
+from .models import Fund, InsuranceProduct, StockInfo
+
+
+@receiver([post_save, post_delete], sender=Fund)
+@receiver([post_save, post_delete], sender=InsuranceProduct)
+@receiver([post_save, post_delete], sender=StockInfo)
+def invalidate_catalog_on_change(sender, **kwargs):
+    """基金/保险/股票信息变化后使目录索引失效"""
+    invalidate_catalog()
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """在每个数据库连接上安装一次请求SQL统计包装器（重连时不重复安装）"""
+    if record_query not in connection.execute_wrappers:
+        # 放在最外层：execute_wrapper() 退出时弹出的是列表末尾的包装器
+        connection.execute_wrappers.insert(0, record_query)
@@ -0,0 +1,28 @@
+"""调优后的 SQLite 数据库后端（本地/单机部署使用，ENGINE = 'recommendation.sqlite_backend'）
+
+- 每个新连接开启 WAL 日志：读不阻塞写、写不阻塞读，Web 请求读取时导入命令仍可写入；
+- OPTIONS['timeout'] 作为忙等待时间，拿不到写锁时等待而不是立即报 "database is locked"；
+- 事务以 BEGIN IMMEDIATE 开始，在事务开头就取得写锁。默认的 BEGIN 先读后写，
+  写锁被其他连接占用并提交后，升级写锁会直接失败而不等待忙等待时间，并发交易因此报错；
+  改为开头取锁后，并发写事务只是排队执行。
+"""
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',  # WAL 下每次提交不再 fsync 主库文件，断电最多丢失最近的事务
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA cache_size = -16000',  # 每个连接约 16MB 页缓存
+    'PRAGMA mmap_size = 268435456',  # 以内存映射读取数据库文件（256MB）
+)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,385 @@
+"""合成数据生成
+
+按表分块生成基金、保险、股票、日线、用户与购买记录，每块使用由 (种子, 表名, 块序号)
+派生的独立随机数生成器，结果只取决于种子与规模，与生成顺序无关。
+分布参考 data/ 下的真实样本：基金类型与公司、保险险种、股票行业与地区；
+日线为带市场与行业因子的几何布朗运动；购买记录的产品热度服从幂律分布，用户活跃度服从对数正态分布。
+生成（CPU密集）可分发到多个进程，写库在主进程中按块 bulk_create。
+合成数据带有可识别的标记（基金代码 S 开头、股票代码 .SYN 结尾、保险与用户名前缀），可单独清除。
+"""
+import datetime
+from dataclasses import dataclass
+from functools import partial
+
+import numpy as np
+from django.db import connections, transaction
+
+from .catalog import invalidate_catalog
+from .holdings import rebuild_holdings
+from .market_data import bump_market_version
+from .models import Fund, InsuranceProduct, PurchaseRecord, StockDailyData, StockInfo, User
+from .process_pool import process_pool
+
+FUND_TYPES = [
+    '货币型-普通货币', '股票型', '混合型-绝对收益', '混合型-灵活', '混合型-平衡', '混合型-偏股', '混合型-偏债',
+    '指数型-股票', '指数型-海外股票', '指数型-固收', '指数型-其他', '债券型-长债', '债券型-混合二级',
+    '债券型-混合一级', '债券型-中短债', 'QDII-纯债', 'QDII-混合偏股', 'QDII-普通股票', 'FOF-进取型',
+    'FOF-稳健型', 'FOF-均衡型', 'QDII-商品', 'QDII-混合灵活', 'QDII-混合债', 'QDII-REITs',
+]
+FUND_COMPANIES = ['华夏', '嘉实', '广发', '汇添富', '工银', '易方达', '南方', '国泰', '博时', '富国', '招商', '中欧', '长信']
+FUND_THEMES = ['稳健', '成长', '价值', '红利', '消费', '医疗', '科技', '新能源', '养老', '均衡', '优选', '量化']
+SURNAMES = list('王李张刘陈杨黄赵吴周徐孙马朱胡郭何林罗高')
+GIVEN_NAMES = list('伟芳娜敏静丽强磊军洋勇艳杰涛明超秀霞平刚')
+
+INSURANCE_TYPES = [
+    ('寿险', '定期寿险'), ('寿险', '终身寿险'), ('寿险', '两全保险'), ('寿险', '年金险'),
+    ('健康险', '百万医疗'), ('健康险', '一年期重疾险'), ('健康险', '长期重疾险'), ('健康险', '失能收入险'),
+    ('意外险', '综合意外险'), ('意外险', '高风险运动意外险'), ('财产险', '家庭财产险'), ('财产险', '机动车损失险'),
+    ('责任险', '公众责任险'), ('责任险', '雇主责任险'), ('信用保证险', '履约保证险'),
+]
+INSURERS = ['平安人寿', '中国人寿', '太平洋保险', '泰康人寿', '新华保险', '华贵寿险', '众安保险']
+INSURANCE_TAGS = ['年轻人', '家庭', '养老', '高杠杆', '储蓄', '保障型', '财富传承', '企业']
+
+INDUSTRIES = [
+    '银行', '公用事业', '食品饮料', '医药生物', '电子', '计算机', '传媒', '通信', '全国地产', '元器件',
+    '区域地产', '软件服务', '火力发电', '汽车配件', '建筑工程', '家用电器', '通信设备', '电气设备',
+    '新型电力', '多元金融', '中成药', '食品', '百货',
+]
+AREAS = ['深圳', '广东', '山东', '江苏', '四川', '湖南', '北京', '安徽', '上海', '浙江']
+
+SEED_STREAMS = {'fund': 1, 'insurance': 2, 'stock': 3, 'daily': 4, 'user': 5, 'purchase': 6, 'market': 7}
+CHUNK_SIZE = 5000
+SYNTHETIC_USER_PREFIX = 'synthetic_'
+SYNTHETIC_FUND_PREFIX = 'S'
+SYNTHETIC_STOCK_SUFFIX = '.SYN'
+SYNTHETIC_INSURANCE_PREFIX = '合成'
+
+
+@dataclass
+class SyntheticScale:
+    """各表生成数量"""
+    funds: int = 100
+    insurance_products: int = 20
+    stocks: int = 200
+    trading_days: int = 60
+    users: int = 1000
+    purchases: int = 10000
+
+
+SCALES = {
+    'small': SyntheticScale(),
+    'medium': SyntheticScale(funds=10000, insurance_products=200, stocks=2000, trading_days=250,
+                             users=10000, purchases=100000),
+    'large': SyntheticScale(funds=100000, insurance_products=1000, stocks=5000, trading_days=500,
+                            users=100000, purchases=1000000),
+}
+
+
+def chunk_rng(seed, table, chunk):
+    """每个 (种子, 表, 块) 独立的随机数生成器"""
+    return np.random.default_rng([seed, SEED_STREAMS[table], chunk])
+
+
+def trading_dates(n_days, end=datetime.date(2025, 10, 31)):
+    """截止到 end 的最近 n_days 个工作日（升序）"""
+    dates = []
+    day = end
+    while len(dates) < n_days:
+        if day.weekday() < 5:
+            dates.append(day)
+        day -= datetime.timedelta(days=1)
+    return dates[::-1]
+
+
+def _person_names(rng, count):
+    surnames = rng.choice(SURNAMES, count)
+    given = rng.choice(GIVEN_NAMES, (count, 2))
+    return [s + ''.join(g) for s, g in zip(surnames, given)]
+
+
+def _optional_ratings(rng, count, missing=0.4):
+    ratings = rng.integers(1, 6, count)
+    return [None if m else int(r) for r, m in zip(ratings, rng.random(count) < missing)]
+
+
+def fund_rows(seed, chunk, start, count):
+    rng = chunk_rng(seed, 'fund', chunk)
+    companies = rng.choice(FUND_COMPANIES, count)
+    themes = rng.choice(FUND_THEMES, count)
+    types = rng.choice(FUND_TYPES, count)
+    n_managers = rng.integers(1, 3, count)
+    ratings = {name: _optional_ratings(rng, count) for name in (
+        'star_count', 'rating_shanghai', 'rating_zhaoshang', 'rating_jianxin', 'rating_morningstar')}
+    fees = np.round(rng.uniform(0, 0.015, count), 4)
+    rows = []
+    for i in range(count):
+        rows.append(Fund(
+            code=f"{SYNTHETIC_FUND_PREFIX}{start + i:07d}",
+            name=f"{companies[i]}{themes[i]}{types[i].split('-')[-1]}{'AC'[i % 2]}",
+            managers=','.join(_person_names(rng, n_managers[i])),
+            company=companies[i],
+            fund_type=types[i],
+            fee=float(fees[i]),
+            **{name: values[i] for name, values in ratings.items()},
+        ))
+    return rows
+
+
+def insurance_rows(seed, chunk, start, count):
+    rng = chunk_rng(seed, 'insurance', chunk)
+    types = rng.integers(0, len(INSURANCE_TYPES), count)
+    insurers = rng.choice(INSURERS, count)
+    premiums = np.round(rng.lognormal(np.log(1500), 1.0, (count, 2))).astype(int)
+    coverage = rng.choice([10, 50, 100, 200, 500], count)
+    rows = []
+    for i in range(count):
+        category, subcategory = INSURANCE_TYPES[types[i]]
+        rows.append(InsuranceProduct(
+            category=category,
+            subcategory=subcategory,
+            name=f"{SYNTHETIC_INSURANCE_PREFIX}{subcategory}{start + i + 1}号（{insurers[i]}）",
+            coverage_summary=f"{subcategory}保障，最高{coverage[i]}万",
+            payout_limit=f"{coverage[i]}万",
+            deductible_and_ratio='0免赔，100%给付',
+            base_premium=f"{coverage[i]}万保额：男性{premiums[i, 0]}元；女性{premiums[i, 1]}元",
+            tags='、'.join(rng.choice(INSURANCE_TAGS, 2, replace=False)),
+        ))
+    return rows
+
+
+def stock_code(index):
+    return f"{index:06d}{SYNTHETIC_STOCK_SUFFIX}"
+
+
+def stock_industry(seed, index):
+    """股票所属行业（日线生成时需要同一结果，按股票序号确定）"""
+    return INDUSTRIES[int(np.random.default_rng([seed, SEED_STREAMS['stock'], index]).integers(len(INDUSTRIES)))]
+
+
+def stock_rows(seed, chunk, start, count):
+    rng = chunk_rng(seed, 'stock', chunk)
+    areas = rng.choice(AREAS, count)
+    list_days = rng.integers(0, 30 * 365, count)
+    rows = []
+    for i in range(count):
+        code = stock_code(start + i)
+        rows.append(StockInfo(
+            ts_code=code,
+            symbol=code[:6],
+            name=f"合成{start + i:05d}",
+            area=areas[i],
+            industry=stock_industry(seed, start + i),
+            list_date=datetime.date(1991, 1, 1) + datetime.timedelta(days=int(list_days[i])),
+        ))
+    return rows
+
+
+def market_factors(seed, n_days):
+    """市场与各行业的日收益率因子，形状 (n_days,) 与 (行业数, n_days)"""
+    rng = np.random.default_rng([seed, SEED_STREAMS['market']])
+    market = rng.normal(0.0003, 0.012, n_days)
+    industry = rng.normal(0.0, 0.008, (len(INDUSTRIES), n_days))
+    return market, industry
+
+
+def daily_rows(seed, chunk, start, count, n_days):
+    """第 start ~ start+count 只股票的全部日线"""
+    rng = chunk_rng(seed, 'daily', chunk)
+    dates = trading_dates(n_days)
+    market, industry = market_factors(seed, n_days)
+    industry_pos = {name: i for i, name in enumerate(INDUSTRIES)}
+
+    beta = rng.uniform(0.6, 1.4, (count, 1))
+    idio = rng.normal(0, 1, (count, n_days)) * rng.uniform(0.008, 0.025, (count, 1))
+    factors = np.array([industry[industry_pos[stock_industry(seed, start + i)]] for i in range(count)])
+    returns = np.clip(beta * market + factors + idio, -0.1, 0.1)  # 涨跌停限制
+    first_close = rng.lognormal(np.log(15), 0.8, (count, 1))
+    close = np.round(first_close * np.cumprod(1 + returns, axis=1), 2)
+    close = np.maximum(close, 0.01)
+    pre_close = np.concatenate([np.round(first_close, 2), close[:, :-1]], axis=1)
+    spread = np.abs(rng.normal(0, 0.01, (count, n_days, 2)))
+    open_ = np.round(pre_close * (1 + rng.normal(0, 0.005, (count, n_days))), 2)
+    high = np.round(np.maximum(open_, close) * (1 + spread[..., 0]), 2)
+    low = np.round(np.minimum(open_, close) * (1 - spread[..., 1]), 2)
+    vol = np.round(rng.lognormal(np.log(2e5), 0.7, (count, 1)) * rng.lognormal(0, 0.3, (count, n_days)), 2)
+    amount = np.round(vol * (high + low) / 2 / 10, 3)
+
+    rows = []
+    for i in range(count):
+        code = stock_code(start + i)
+        for d, trade_date in enumerate(dates):
+            rows.append(StockDailyData(
+                ts_code=code,
+                trade_date=trade_date,
+                open=float(open_[i, d]),
+                high=float(high[i, d]),
+                low=float(low[i, d]),
+                close=float(close[i, d]),
+                pre_close=float(pre_close[i, d]),
+                change=round(float(close[i, d] - pre_close[i, d]), 2),
+                pct_chg=round(float((close[i, d] / pre_close[i, d] - 1) * 100), 4),
+                vol=float(vol[i, d]),
+                amount=float(amount[i, d]),
+            ))
+    return rows
+
+
+def user_rows(seed, chunk, start, count):
+    rng = chunk_rng(seed, 'user', chunk)
+    ages = np.clip(np.round(rng.normal(38, 12, count)), 18, 80).astype(int)
+    risks = rng.choice(['low', 'medium', 'high'], count, p=[0.3, 0.5, 0.2])
+    assets = np.round(rng.lognormal(np.log(200000), 1.0, count), 2)
+    return [
+        User(
+            username=f"{SYNTHETIC_USER_PREFIX}{start + i:07d}",
+            password='!',  # 不可登录的密码
+            age=int(ages[i]),
+            risk_tolerance=risks[i],
+            total_assets=float(assets[i]),
+        )
+        for i in range(count)
+    ]
+
+
+def _popularity(n_products, exponent=0.9):
+    """按热度排名的幂律抽样概率"""
+    weights = 1.0 / np.arange(1, n_products + 1) ** exponent
+    return weights / weights.sum()
+
+
+def purchase_rows(seed, chunk, start, count, user_ids, product_ids, product_names):
+    """product_ids / product_names: {产品类型: 数组}"""
+    rng = chunk_rng(seed, 'purchase', chunk)
+    available = [t for t in ('fund', 'insurance', 'stock') if len(product_ids.get(t, ()))]
+    if not available or not len(user_ids):
+        return []
+    type_weights = np.array([{'fund': 0.5, 'insurance': 0.2, 'stock': 0.3}[t] for t in available])
+    types = rng.choice(available, count, p=type_weights / type_weights.sum())
+    # 用户活跃度（所有块共用同一组权重）：少数用户贡献大部分交易
+    activity = np.random.default_rng([seed, SEED_STREAMS['purchase'], len(user_ids), 1]).lognormal(0, 1, len(user_ids))
+    users = rng.choice(user_ids, count, p=activity / activity.sum())
+    amounts = np.round(rng.lognormal(np.log(5000), 1.0, count), 2)
+
+    rows = []
+    for product_type in available:
+        mask = np.flatnonzero(types == product_type)
+        ids = product_ids[product_type]
+        # 热度排名由种子打乱，与产品id无关
+        order = np.random.default_rng([seed, SEED_STREAMS['purchase'], len(ids)]).permutation(len(ids))
+        picks = order[rng.choice(len(ids), len(mask), p=_popularity(len(ids)))]
+        for pos, pick in zip(mask, picks):
+            if product_type == 'stock':
+                quantity = int(rng.integers(1, 20)) * 100
+            elif product_type == 'fund':
+                quantity = int(amounts[pos])
+            else:
+                quantity = int(rng.choice([1, 10, 20, 30]))
+            rows.append(PurchaseRecord(
+                user_id=int(users[pos]),
+                purchase_type=product_type,
+                product_id=int(ids[pick]),
+                product_name=product_names[product_type][pick],
+                amount=float(amounts[pos]),
+                quantity=quantity,
+                status='completed',
+            ))
+    return rows
+
+
+def _chunks(total, chunk_size):
+    for chunk, start in enumerate(range(0, total, chunk_size)):
+        yield chunk, start, min(chunk_size, total - start)
+
+
+_worker_context = {}
+
+
+def _init_worker(context):
+    _worker_context.update(context)
+
+
+def _generate(func, task):
+    return func(*task, **_worker_context)
+
+
+def generate_chunks(func, tasks, workers=1, context=None):
+    """按任务顺序产出 func(*task, **context) 的结果；workers > 1 时在进程池中生成
+
+    每次只向进程池提交 workers * 2 个任务，避免生成速度超过写库速度时占用过多内存。
+    """
+    context = context or {}
+    tasks = list(tasks)
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield func(*task, **context)
+        return
+
+    connections.close_all()  # 子进程不使用继承的数据库连接
+    window = workers * 2
+    with process_pool(workers, initializer=_init_worker, initargs=(context,)) as pool:
+        for i in range(0, len(tasks), window):
+            yield from pool.map(partial(_generate, func), tasks[i:i + window])
+
+
+def clear_synthetic_data():
+    """删除之前生成的合成数据（按标记识别），返回 {模型: 删除行数}"""
+    deleted = {}
+    with transaction.atomic():
+        stock_codes = StockInfo.objects.filter(ts_code__endswith=SYNTHETIC_STOCK_SUFFIX).values('ts_code')
+        for queryset in (
+            StockDailyData.objects.filter(ts_code__in=stock_codes),
+            User.objects.filter(username__startswith=SYNTHETIC_USER_PREFIX),  # 级联删除购买记录与持仓
+            StockInfo.objects.filter(ts_code__endswith=SYNTHETIC_STOCK_SUFFIX),
+            Fund.objects.filter(code__startswith=SYNTHETIC_FUND_PREFIX),
+            InsuranceProduct.objects.filter(name__startswith=SYNTHETIC_INSURANCE_PREFIX),
+        ):
+            for label, count in queryset.delete()[1].items():
+                deleted[label] = deleted.get(label, 0) + count
+    invalidate_catalog()
+    bump_market_version()
+    return deleted
+
+
+def populate(scale, seed=42, chunk_size=CHUNK_SIZE, batch_size=1000, workers=1, log=None):
+    """按规模生成全部合成数据并写入当前数据库，返回 {表: 行数}"""
+    counts = {}
+
+    def write(name, model, func, total, per_chunk, context=None):
+        written = 0
+        for rows in generate_chunks(partial(func, seed), _chunks(total, per_chunk), workers, context):
+            with transaction.atomic():
+                model.objects.bulk_create(rows, batch_size=batch_size)
+            written += len(rows)
+        counts[name] = written
+        if log:
+            log(f"{name}: {written}")
+
+    write('funds', Fund, fund_rows, scale.funds, chunk_size)
+    write('insurance_products', InsuranceProduct, insurance_rows, scale.insurance_products, chunk_size)
+    write('stocks', StockInfo, stock_rows, scale.stocks, chunk_size)
+    # 日线按股票分块，每块约 chunk_size 行
+    stocks_per_chunk = max(1, chunk_size // max(scale.trading_days, 1))
+    write('stock_daily', StockDailyData, daily_rows, scale.stocks, stocks_per_chunk,
+          {'n_days': scale.trading_days})
+    write('users', User, user_rows, scale.users, chunk_size)
+
+    user_ids = np.array(User.objects.filter(username__startswith=SYNTHETIC_USER_PREFIX)
+                        .order_by('id').values_list('id', flat=True))
+    product_ids, product_names = {}, {}
+    for product_type, queryset, label in (
+        ('fund', Fund.objects.order_by('id').values_list('id', 'name', 'code'), lambda r: f"{r[1]} ({r[2]})"),
+        ('insurance', InsuranceProduct.objects.order_by('id').values_list('id', 'name'), lambda r: r[1]),
+        ('stock', StockInfo.objects.order_by('id').values_list('id', 'name', 'symbol'), lambda r: f"{r[1]} ({r[2]})"),
+    ):
+        rows = list(queryset)
+        product_ids[product_type] = np.array([row[0] for row in rows], dtype=np.int64)
+        product_names[product_type] = [label(row) for row in rows]
+    write('purchases', PurchaseRecord, purchase_rows, scale.purchases, chunk_size, {
+        'user_ids': user_ids, 'product_ids': product_ids, 'product_names': product_names,
+    })
+
+    # 批量写入不经过交易视图与信号：重建持仓并通知目录、行情缓存
+    rebuild_holdings()
+    invalidate_catalog()
+    bump_market_version()
+    return counts
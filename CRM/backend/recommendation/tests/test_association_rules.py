@@ -0,0 +1,67 @@
+import random
+from itertools import combinations
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from recommendation.association_rules import RuleIndex, build_rule_index, mine_frequent_itemsets
+
+BASKETS = [
+    {'fund:1', 'fund:2'},
+    {'fund:1', 'fund:2', 'stock:3'},
+    {'fund:1', 'stock:3'},
+    {'fund:1', 'fund:2'},
+    {'insurance:4'},
+]
+
+
+def mine(baskets, **kwargs):
+    with mock.patch('recommendation.association_rules.iter_baskets', lambda chunk_size: iter(baskets)):
+        return mine_frequent_itemsets(**kwargs)
+
+
+def named_itemsets(itemsets, frequent):
+    return {frozenset(frequent[item] for item in itemset): count for itemset, count in itemsets}
+
+
+class FPGrowthTests(SimpleTestCase):
+    """FP-Growth 频繁项集与关联规则"""
+
+    def test_frequent_itemsets(self):
+        itemsets, item_counts, n_baskets, frequent = mine(BASKETS, min_support=0.4)
+        self.assertEqual(n_baskets, 5)
+        self.assertEqual(item_counts['insurance:4'], 1)
+        self.assertEqual(named_itemsets(itemsets, frequent), {
+            frozenset({'fund:1'}): 4,
+            frozenset({'fund:2'}): 3,
+            frozenset({'stock:3'}): 2,
+            frozenset({'fund:1', 'fund:2'}): 3,
+            frozenset({'fund:1', 'stock:3'}): 2,
+        })
+
+    def test_matches_brute_force_counts(self):
+        rng = random.Random(7)
+        baskets = [set(rng.sample([f'fund:{i}' for i in range(8)], rng.randint(1, 5))) for _ in range(60)]
+        itemsets, _, _, frequent = mine(baskets, min_support=0.1, max_length=3)
+
+        expected = {}
+        for size in (1, 2, 3):
+            for itemset in combinations(sorted(set().union(*baskets)), size):
+                count = sum(1 for basket in baskets if basket.issuperset(itemset))
+                if count >= 6:
+                    expected[frozenset(itemset)] = count
+        self.assertEqual(named_itemsets(itemsets, frequent), expected)
+
+    def test_rule_index(self):
+        itemsets, _, n_baskets, frequent = mine(BASKETS, min_support=0.4)
+        rules = build_rule_index(itemsets, n_baskets, frequent, min_confidence=0.5)
+        self.assertEqual(rules, {
+            'fund:1': [('fund:2', 0.75, 1.25, 3), ('stock:3', 0.5, 1.25, 2)],
+            'fund:2': [('fund:1', 1.0, 1.25, 3)],
+            'stock:3': [('fund:1', 1.0, 1.25, 2)],
+        })
+
+        index = RuleIndex(rules)
+        self.assertEqual(index.recommend(['fund:1']), [('fund:2', 0.75), ('stock:3', 0.5)])
+        self.assertEqual(index.recommend(['fund:1'], prefix='stock:'), [('stock:3', 0.5)])
+        self.assertEqual(index.recommend(['fund:1', 'fund:2']), [('stock:3', 0.5)])
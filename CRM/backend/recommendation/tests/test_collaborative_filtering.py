@@ -0,0 +1,63 @@
+import math
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from recommendation.collaborative_filtering import TYPE_CODES, ItemItemModel
+
+FUND, STOCK = TYPE_CODES['fund'], TYPE_CODES['stock']
+
+# (用户, 类型编码, 产品id)：基金 1 被三人购买，其中两人同时买了基金 2
+PURCHASES = [
+    (1, FUND, 1), (1, FUND, 2),
+    (2, FUND, 1), (2, FUND, 2), (2, FUND, 3),
+    (3, FUND, 1), (3, STOCK, 7),
+    (3, FUND, 1),  # 重复购买
+]
+
+
+def fold(model, purchases):
+    user_ids, type_codes, product_ids = (np.array(column) for column in zip(*purchases))
+    model.fold_in(user_ids, type_codes.astype(np.int8), product_ids)
+
+
+def dense_cooccurrence(model):
+    """按 (类型, 产品id) 排列的稠密共现矩阵，便于比较列顺序不同的两个模型"""
+    order = np.lexsort((model.item_ids, model.item_types))
+    return model.cooccurrence.toarray()[np.ix_(order, order)]
+
+
+class ItemItemModelTests(SimpleTestCase):
+    """共现矩阵的增量并入与物品-物品打分"""
+
+    def setUp(self):
+        self.model = ItemItemModel.empty()
+        fold(self.model, PURCHASES)
+
+    def test_fold_in_counts_repeat_purchases_once(self):
+        position = self.model.item_positions[(FUND, 1)]
+        self.assertEqual(self.model.cooccurrence[position, position], 3)
+        self.assertEqual(self.model.cooccurrence[position, self.model.item_positions[(FUND, 2)]], 2)
+
+    def test_fold_in_in_chunks_matches_single_build(self):
+        chunked = ItemItemModel.empty()
+        for start in range(0, len(PURCHASES), 3):
+            fold(chunked, PURCHASES[start:start + 3])
+        np.testing.assert_array_equal(dense_cooccurrence(chunked), dense_cooccurrence(self.model))
+
+    def test_score_is_mean_cosine_with_held_items(self):
+        results = self.model.score([('fund', 1)], limit=5)
+        self.assertEqual([(t, pid) for t, pid, _ in results], [('fund', 2), ('fund', 3), ('stock', 7)])
+        self.assertAlmostEqual(results[0][2], 2 / math.sqrt(3 * 2))
+        self.assertAlmostEqual(results[1][2], 1 / math.sqrt(3 * 1))
+
+        # 两个持有产品的相似度取平均
+        scores = {pid: score for _, pid, score in self.model.score([('fund', 1), ('fund', 2)])}
+        self.assertAlmostEqual(scores[3], (1 / math.sqrt(3) + 1 / math.sqrt(2)) / 2)
+
+    def test_score_filters_purchase_type_and_unknown_items(self):
+        self.assertEqual([pid for _, pid, _ in self.model.score([('fund', 1)], purchase_type='stock')], [7])
+        self.assertEqual(self.model.score([('fund', 99), ('bond', 1)]), [])
+
+    def test_popular_counts_buyers(self):
+        self.assertEqual(self.model.popular('fund'), [('fund', 1, 3), ('fund', 2, 2), ('fund', 3, 1)])
@@ -0,0 +1,46 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.test import TestCase
+
+from recommendation.holdings import InsufficientHoldingError, apply_trade
+from recommendation.models import Holding, User
+
+
+class ApplyTradeTests(TestCase):
+    """交易并入持仓：买入累加成本，卖出按平均成本扣减，超卖被拒绝"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='holder', password='secret')
+
+    def trade(self, amount, quantity):
+        with transaction.atomic():
+            return apply_trade(self.user.id, 'stock', 1, amount, quantity)
+
+    def assertHolding(self, quantity, cost_basis):
+        holding = Holding.objects.get(user=self.user, product_type='stock', product_id=1)
+        self.assertEqual((holding.quantity, holding.cost_basis), (Decimal(quantity), Decimal(cost_basis)))
+
+    def test_average_cost(self):
+        self.trade(1000, 100)
+        self.trade(3000, 100)
+        self.assertHolding('200', '4000')
+
+        # 卖出四分之一，成本按平均成本 20 扣减
+        self.trade(1500, -50)
+        self.assertHolding('150', '3000')
+
+        self.trade(3000, -150)
+        self.assertHolding('0', '0')
+
+    def test_oversell_is_rejected(self):
+        self.trade(1000, 100)
+        with self.assertRaises(InsufficientHoldingError) as raised:
+            self.trade(1500, -101)
+        self.assertEqual(raised.exception.held_quantity, Decimal('100'))
+        self.assertHolding('100', '1000')
+
+    def test_sell_without_holding_is_rejected(self):
+        with self.assertRaises(InsufficientHoldingError):
+            self.trade(100, -1)
@@ -0,0 +1,113 @@
+import os
+import tempfile
+from datetime import date
+
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from recommendation.importing import Checkpoint, RowRejected, insert_new, parse_number, stream_import, upsert
+from recommendation.models import Fund, StockInfo
+
+ROWS = [('a', '1'), ('b', '2'), ('c', 'x'), ('d', '4'), ('e', '5')]
+
+
+class Interrupted(Exception):
+    pass
+
+
+def parse_row(row):
+    return (row['name'], parse_number(row['value'], int))
+
+
+class StreamImportTests(TestCase):
+    """分批提交、拒绝无效行，以及中断后从检查点继续"""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, 'rows.csv')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('name,value\n' + ''.join(f'{name},{value}\n' for name, value in ROWS))
+
+    def test_resume_continues_after_last_committed_batch(self):
+        written = []
+
+        def fail_on_second_batch(objs):
+            if written:
+                raise Interrupted
+            written.append(objs)
+            return len(objs)
+
+        with self.assertRaises(Interrupted):
+            stream_import(self.path, parse_row, fail_on_second_batch, batch_size=2)
+        self.assertTrue(os.path.exists(f'{self.path}.checkpoint'))
+
+        resumed = []
+        stats = stream_import(self.path, parse_row, lambda objs: resumed.append(objs) or len(objs),
+                              batch_size=2, resume=True)
+        self.assertEqual(written, [[('a', 1), ('b', 2)]])
+        self.assertEqual(resumed, [[('d', 4)], [('e', 5)]])
+        self.assertEqual((stats.rows, stats.written, stats.rejected), (3, 2, 1))
+        self.assertEqual(stats.resumed_from, len('name,value\na,1\nb,2\n'))
+        self.assertFalse(os.path.exists(f'{self.path}.checkpoint'))
+
+        with open(f'{self.path}.rejected.csv', encoding='utf-8') as f:
+            self.assertEqual(f.read().splitlines()[1:], ["c,x,RowRejected: invalid number 'x'"])
+
+    def test_checkpoint_of_changed_file_is_refused(self):
+        Checkpoint(self.path).save(len('name,value\na,1\n'))
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('f,6\n')
+        with self.assertRaises(CommandError):
+            stream_import(self.path, parse_row, len, resume=True)
+
+    def test_rejected_rows_do_not_stop_import(self):
+        with self.assertRaises(RowRejected):
+            parse_row({'name': 'c', 'value': ''})
+        stats = stream_import(self.path, parse_row, len, batch_size=10)
+        self.assertEqual((stats.rows, stats.written, stats.rejected, stats.batches), (5, 4, 1, 1))
+
+
+class InsertNewTests(TestCase):
+    """只插入自然键尚不存在的行，返回实际插入的行数"""
+
+    def stock(self, ts_code, name):
+        return StockInfo(ts_code=ts_code, symbol=ts_code[:6], name=name, area='深圳', industry='银行',
+                         list_date=date(2000, 1, 1))
+
+    def test_existing_and_repeated_keys_are_not_counted(self):
+        self.assertEqual(insert_new(StockInfo, [self.stock('000001.SZ', '平安银行')], ('ts_code',)), 1)
+
+        objs = [self.stock('000001.SZ', '改名'), self.stock('000002.SZ', '万科A'), self.stock('000002.SZ', '重复')]
+        self.assertEqual(insert_new(StockInfo, objs, ('ts_code',)), 1)
+        self.assertEqual(insert_new(StockInfo, objs, ('ts_code',)), 0)
+        self.assertEqual(
+            dict(StockInfo.objects.values_list('ts_code', 'name')),
+            {'000001.SZ': '平安银行', '000002.SZ': '万科A'},
+        )
+
+
+class UpsertTests(TestCase):
+    """按自然键插入或更新，已有行保留主键"""
+
+    def fund(self, code, fee):
+        return Fund(code=code, name=f'基金{code}', managers='张三', company='某基金', fee=fee, fund_type='股票型')
+
+    def test_counts_and_changed_ids(self):
+        counts, changed_ids = upsert(Fund, [self.fund('000001', 1.5), self.fund('000002', 1.0)], ('code',))
+        self.assertEqual(counts, {'inserted': 2, 'updated': 0, 'unchanged': 0, 'duplicates': 0})
+        ids = dict(Fund.objects.values_list('code', 'id'))
+        self.assertCountEqual(changed_ids, ids.values())
+
+        counts, changed_ids = upsert(
+            Fund,
+            [self.fund('000001', 1.2), self.fund('000002', 1.0), self.fund('000003', 0.5), self.fund('000003', 0.6)],
+            ('code',),
+        )
+        self.assertEqual(counts, {'inserted': 1, 'updated': 1, 'unchanged': 1, 'duplicates': 1})
+        self.assertCountEqual(changed_ids, [ids['000001'], Fund.objects.get(code='000003').id])
+        self.assertEqual(dict(Fund.objects.values_list('code', 'fee')), {'000001': 1.2, '000002': 1.0, '000003': 0.6})
+        self.assertEqual(Fund.objects.get(code='000001').id, ids['000001'])
+
+        counts, changed_ids = upsert(Fund, [self.fund('000002', 1.0)], ('code',))
+        self.assertEqual((counts['unchanged'], changed_ids), (1, []))
@@ -0,0 +1,54 @@
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from recommendation.benchmark import clear_process_caches, run_offline_builds
+from recommendation.models import User
+from recommendation.query_checks import QUERY_BUDGETS
+from recommendation.recommendation_algorithms import RecommendationEngine
+from recommendation.synthetic_data import SyntheticScale, populate
+
+# 使用进程内缓存，避免与开发环境共享版本号和推荐结果
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-default'},
+    'recommendations': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-recommendations'},
+    'recommendations_disabled': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+@override_settings(CACHES=TEST_CACHES, RECOMMENDATION_CACHE_ALIAS='recommendations')
+class QueryBudgetTests(TestCase):
+    """推荐方法超出SQL查询预算（如出现 N+1 查询或进程内缓存失效）时失败"""
+
+    @classmethod
+    def setUpClass(cls):
+        # 离线模型与共享段写到临时目录，不读取 var/models 下已发布的数据
+        model_dir = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(model_dir.cleanup)
+        cls.enterClassContext(override_settings(RECOMMENDATION_MODEL_DIR=model_dir.name))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        populate(SyntheticScale(funds=40, insurance_products=10, stocks=30, trading_days=30, users=20, purchases=300))
+        run_offline_builds()
+        cls.user = User.objects.order_by('id').first()
+
+    def setUp(self):
+        self.engine = RecommendationEngine()
+        clear_process_caches()
+        self.addCleanup(clear_process_caches)
+
+    def assertWithinBudget(self, method):
+        for phase in ('cold', 'warm'):
+            with self.subTest(phase=phase), self.assertNumQueries(QUERY_BUDGETS[method][phase]):
+                getattr(self.engine, method)(self.user)
+
+    def test_insurance_recommendation(self):
+        self.assertWithinBudget('insurance_recommendation')
+
+    def test_fund_recommendation(self):
+        self.assertWithinBudget('fund_recommendation')
+
+    def test_stock_recommendation(self):
+        self.assertWithinBudget('stock_recommendation')
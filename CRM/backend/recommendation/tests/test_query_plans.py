@@ -0,0 +1,17 @@
+import unittest
+
+from django.db import connection
+from django.test import TestCase
+
+from recommendation.query_checks import hot_queries, plan_problems
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "query plan checks parse SQLite EXPLAIN QUERY PLAN output")
+class HotQueryPlanTests(TestCase):
+    """热点查询重新出现整表扫描或无法沿索引排序时失败"""
+
+    def test_hot_queries_use_indexes(self):
+        for name, (queryset, allowed) in hot_queries().items():
+            plan = queryset.explain()
+            with self.subTest(query=name):
+                self.assertEqual(plan_problems(plan, allowed), [], f"{name} plan:\n{plan}")
@@ -18,5 +18,9 @@ urlpatterns = [
     path('purchase/', views.purchase_product, name='purchase_product'),
     path('purchase/records/', views.get_purchase_records, name='purchase_records'),
     path('purchase/stock/', views.purchase_stock, name='purchase_stock'),
+    path('recommendations/async/insurance/', views.async_insurance_recommendations, name='async_insurance_recommendations'),
+    path('recommendations/async/funds/', views.async_fund_recommendations, name='async_fund_recommendations'),
+    path('recommendations/async/stocks/', views.async_stock_recommendations, name='async_stock_recommendations'),
     path('mpt-suggestions/', views.get_mpt_suggestions, name='mpt_suggestions'),
+    path('metrics/', views.prometheus_metrics, name='metrics'),
 ]
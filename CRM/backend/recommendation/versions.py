@@ -0,0 +1,28 @@
+"""数据版本号
+
+目录、行情等进程内缓存通过Django缓存中的版本号判断是否过期。
+版本号在 Web 进程与导入命令之间共享（需使用文件/Redis等共享缓存后端）。
+"""
+import time
+
+from django.core.cache import cache
+
+
+def get_version(key):
+    """返回当前版本号，不存在时初始化"""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    """数据发生变化时递增版本号"""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # 缓存中没有版本号（首次使用或缓存被清空），用时间戳保证不与旧版本重复
+        version = time.time_ns()
+        cache.set(key, version, timeout=None)
+        return version
@@ -2,8 +2,12 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotAllowed, JsonResponse
 from rest_framework.permissions import IsAuthenticated
-from django.db import models
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.db import transaction
 from .models import Fund, InsuranceProduct, StockInfo, StockDailyData, User, PurchaseRecord
 from .serializers import (
     FundSerializer, InsuranceProductSerializer, 
@@ -12,6 +16,10 @@ from .serializers import (
     PurchaseRequestSerializer, StockPurchaseRequestSerializer
 )
 from .recommendation_algorithms import RecommendationEngine
+from .holdings import InsufficientHoldingError, apply_trade, signed_quantity
+from .market_data import get_quote_index
+from .fanout import run_in_pool
+from . import metrics
 
 class FundViewSet(viewsets.ModelViewSet):
     queryset = Fund.objects.all()
@@ -125,16 +133,18 @@ def purchase_product(request):
             'message': '产品不存在'
         }, status=status.HTTP_404_NOT_FOUND)
     
-    # 创建购买记录
-    purchase_record = PurchaseRecord.objects.create(
-        user=request.user,
-        purchase_type=product_type,
-        product_id=product_id,
-        product_name=product_name,
-        amount=amount,
-        quantity=quantity,
-        status='completed'
-    )
+    # 创建购买记录并在同一事务内更新持仓
+    with transaction.atomic():
+        purchase_record = PurchaseRecord.objects.create(
+            user=request.user,
+            purchase_type=product_type,
+            product_id=product_id,
+            product_name=product_name,
+            amount=amount,
+            quantity=quantity,
+            status='completed'
+        )
+        apply_trade(request.user.id, product_type, product_id, amount, quantity)
     
     # 更新用户总资产（这里简单处理，实际应该更复杂的逻辑）
     # request.user.total_assets -= amount
@@ -194,39 +204,34 @@ def purchase_stock(request):
             'message': '股票不存在'
         }, status=status.HTTP_404_NOT_FOUND)
     
-    # 获取最新股价（这里使用模拟数据，实际应该从数据库获取）
-    # 在实际应用中，应该从 StockDailyData 获取最新价格
-    current_price = 50.0  # 模拟价格，实际应该从数据库获取
+    # 获取最新股价（进程内最新报价索引，按最近交易日收盘价成交）
+    quote = get_quote_index().get(stock.ts_code)
+    if quote is None:
+        return Response({
+            'message': '暂无该股票行情，无法交易'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    current_price, price_date = quote
     
     # 计算交易金额
-    total_amount = quantity * current_price
+    total_amount = round(quantity * current_price, 2)
     
-    # 验证交易逻辑
-    if direction == 'sell':
-        # 检查用户是否持有足够的股票
-        # 这里简化处理，实际应该检查用户的持仓
-        user_holdings = PurchaseRecord.objects.filter(
-            user=request.user,
-            purchase_type='stock',
-            product_id=stock_id,
-            status='completed'
-        ).aggregate(total_quantity=models.Sum('quantity'))['total_quantity'] or 0
-        
-        if user_holdings < quantity:
-            return Response({
-                'message': f'持仓不足，当前持有{user_holdings}股，无法卖出{quantity}股'
-            }, status=status.HTTP_400_BAD_REQUEST)
-    
-    # 创建购买记录
-    purchase_record = PurchaseRecord.objects.create(
-        user=request.user,
-        purchase_type='stock',
-        product_id=stock_id,
-        product_name=f"{stock.name} ({stock.symbol})",
-        amount=total_amount,
-        quantity=quantity,
-        status='completed'
-    )
+    # 创建交易记录并在同一事务内更新持仓（卖出数量记为负数，持仓不足时整体回滚）
+    try:
+        with transaction.atomic():
+            apply_trade(request.user.id, 'stock', stock_id, total_amount, signed_quantity(quantity, direction))
+            purchase_record = PurchaseRecord.objects.create(
+                user=request.user,
+                purchase_type='stock',
+                product_id=stock_id,
+                product_name=f"{stock.name} ({stock.symbol})",
+                amount=total_amount,
+                quantity=signed_quantity(quantity, direction),
+                status='completed'
+            )
+    except InsufficientHoldingError as e:
+        return Response({
+            'message': f'持仓不足，当前持有{int(e.held_quantity)}股，无法卖出{quantity}股'
+        }, status=status.HTTP_400_BAD_REQUEST)
     
     purchase_serializer = PurchaseRecordSerializer(purchase_record)
     
@@ -239,6 +244,7 @@ def purchase_stock(request):
             'direction': direction,
             'quantity': quantity,
             'price': current_price,
+            'price_date': price_date,
             'total_amount': total_amount,
             'transaction_time': purchase_record.purchase_date
         },
@@ -296,3 +302,56 @@ def user_profile(request):
             'success': False,
             'message': serializer.errors
         }, status=status.HTTP_400_BAD_REQUEST)
+
+
+def prometheus_metrics(request):
+    """以 Prometheus 文本格式输出本进程的性能指标（只允许 METRICS_ALLOWED_IPS 中的地址访问）"""
+    allowed_ips = settings.METRICS_ALLOWED_IPS
+    if allowed_ips and request.META.get('REMOTE_ADDR') not in allowed_ips:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# 异步推荐接口（需以 ASGI 方式部署，见 financial_recommendation/asgi.py）：
+# DRF 视图只能同步执行，这里使用 Django 原生异步视图，由推荐引擎并发执行各推荐策略
+
+async def _jwt_user(request):
+    """在线程池中校验 JWT，返回用户；未携带或无效的令牌返回 None"""
+    try:
+        result = await run_in_pool(lambda: JWTAuthentication().authenticate(request))
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+async def _async_recommendations(request, recommend):
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    user = await _jwt_user(request)
+    if user is None:
+        return JsonResponse({
+            'success': False,
+            'message': '用户未登录'
+        }, status=status.HTTP_401_UNAUTHORIZED)
+    
+    recs = await recommend(RecommendationEngine(), user)
+    return JsonResponse(recs, safe=False)
+
+
+async def async_insurance_recommendations(request):
+    """保险推荐（异步，各策略并发执行）"""
+    return await _async_recommendations(request, lambda engine, user: engine.insurance_recommendation_async(user))
+
+
+async def async_fund_recommendations(request):
+    """基金推荐（异步，各策略并发执行）；可选参数 clicked_fund_id 启用基于点击的协同过滤"""
+    clicked_fund_id = request.GET.get('clicked_fund_id')
+    clicked_fund_id = int(clicked_fund_id) if clicked_fund_id and clicked_fund_id.isdigit() else None
+    return await _async_recommendations(
+        request, lambda engine, user: engine.fund_recommendation_async(user, clicked_fund_id)
+    )
+
+
+async def async_stock_recommendations(request):
+    """股票推荐（异步，各策略并发执行）"""
+    return await _async_recommendations(request, lambda engine, user: engine.stock_recommendation_async(user))